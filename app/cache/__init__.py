@@ -0,0 +1,14 @@
+from .codec import BinaryCodec, TextCodec, create_codec
+from .keys import schema_version
+from .redis_client import RedisCache, get_redis, provide_redis_cache, redis_lifespan
+
+__all__ = [
+    "BinaryCodec",
+    "RedisCache",
+    "TextCodec",
+    "create_codec",
+    "get_redis",
+    "provide_redis_cache",
+    "redis_lifespan",
+    "schema_version",
+]
@@ -0,0 +1,126 @@
+import logging
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class Permit(int, Enum):
+    """Ответ allow_request: ложен, если обращаться нельзя"""
+
+    DENIED = 0
+    ALLOWED = 1
+    PROBE = 2  # единственный пробный запрос в HALF_OPEN
+
+
+class CircuitBreaker:
+    """Автомат отключения внешней зависимости после серии ошибок.
+
+    CLOSED - запросы идут как обычно; после failure_threshold ошибок подряд
+    переходим в OPEN и recovery_timeout секунд не обращаемся к зависимости.
+    Затем HALF_OPEN: пропускаем один пробный запрос, по его результату
+    возвращаемся в CLOSED или снова в OPEN.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+
+        self._state = CircuitState.CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> Permit:
+        """Можно ли сейчас обращаться к зависимости.
+
+        Permit.PROBE - вызов занял пробный слот HALF_OPEN; если он завершится
+        без ответа зависимости, слот возвращают через release_probe(permit).
+        """
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return Permit.ALLOWED
+        if state is CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return Permit.PROBE
+        self.short_circuited += 1
+        return Permit.DENIED
+
+    def record_success(self) -> None:
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        if self._state is not CircuitState.CLOSED:
+            logger.info(f"🟢 [CIRCUIT CLOSED] {self.name} recovered")
+        self._state = CircuitState.CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        if (
+            self._state is CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def release_probe(self, permit: Permit) -> None:
+        """Запрос прерван без ответа зависимости (отмена задачи) - не ошибка.
+
+        Слот освобождается, только если этот запрос и был пробным.
+        """
+        if permit is Permit.PROBE:
+            self._probe_in_flight = False
+
+    def _open(self) -> None:
+        if self._state is not CircuitState.OPEN:
+            self.times_opened += 1
+            logger.warning(
+                f"🔴 [CIRCUIT OPEN] {self.name} disabled for {self.recovery_timeout}s "
+                f"after {self.consecutive_failures} failures"
+            )
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+            "short_circuited": self.short_circuited,
+            "times_opened": self.times_opened,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+        }
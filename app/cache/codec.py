@@ -0,0 +1,102 @@
+"""Кодеки значений кеша.
+
+В кеше лежит готовый JSON ответа (Decimal - строкой, даты - ISO), поэтому
+значение восстанавливается байт в байт. BinaryCodec упаковывает его в
+конверт: байт версии формата, байт флагов и данные - JSON как есть или
+msgpack - со сжатием zlib для длинных значений (например, продуктов с
+большим описанием). Значение с неизвестной версией считается промахом.
+"""
+
+import logging
+import zlib
+from typing import Optional, Union
+
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+CODEC_VERSION = 1
+
+FORMAT_JSON = 0
+FORMAT_MSGPACK = 1
+FLAG_ZLIB = 0x80
+
+_FORMATS = {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}
+
+
+class TextCodec:
+    """Значение хранится строкой без конверта (клиент с decode_responses=True)"""
+
+    binary = False
+    name = "text"
+
+    def encode(self, value: str) -> str:
+        return value
+
+    def decode(self, data: Union[str, bytes]) -> Optional[str]:
+        return data.decode() if isinstance(data, bytes) else data
+
+
+class BinaryCodec:
+    """Конверт [версия][флаги|формат][данные] для клиента с decode_responses=False"""
+
+    binary = True
+
+    def __init__(
+        self,
+        payload_format: str = "json",
+        compress_threshold: int = 1024,
+        compress_level: int = 6,
+    ) -> None:
+        if payload_format not in _FORMATS:
+            raise ValueError(f"Unknown cache payload format: {payload_format}")
+        self.name = f"binary-{payload_format}"
+        self.payload_format = _FORMATS[payload_format]
+        # 0 - не сжимать никогда
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.rejected = 0
+
+    def encode(self, value: str) -> bytes:
+        if self.payload_format == FORMAT_MSGPACK:
+            payload = msgspec.msgpack.encode(msgspec.json.decode(value))
+        else:
+            payload = value.encode()
+        flags = self.payload_format
+        if 0 < self.compress_threshold <= len(payload):
+            compressed = zlib.compress(payload, self.compress_level)
+            if len(compressed) < len(payload):
+                payload, flags = compressed, flags | FLAG_ZLIB
+        return bytes((CODEC_VERSION, flags)) + payload
+
+    def decode(self, data: Union[str, bytes]) -> Optional[str]:
+        """Строка JSON или None для записи старого/чужого формата"""
+        if isinstance(data, str) or len(data) < 2 or data[0] != CODEC_VERSION:
+            self.rejected += 1
+            return None
+        flags = data[1]
+        payload = data[2:]
+        try:
+            if flags & FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            if flags & ~FLAG_ZLIB == FORMAT_MSGPACK:
+                return msgspec.json.encode(msgspec.msgpack.decode(payload)).decode()
+            return payload.decode()
+        except (zlib.error, msgspec.DecodeError, UnicodeDecodeError) as e:
+            logger.warning(f"🔴 [CACHE CODEC] Corrupted value: {e}")
+            self.rejected += 1
+            return None
+
+
+CacheCodec = Union[TextCodec, BinaryCodec]
+
+
+def create_codec(
+    name: str, payload_format: str = "json", compress_threshold: int = 1024
+) -> CacheCodec:
+    """Кодек по имени из настроек: text или binary"""
+    if name == "text":
+        return TextCodec()
+    if name == "binary":
+        return BinaryCodec(payload_format, compress_threshold)
+    raise ValueError(f"Unknown cache codec: {name}")
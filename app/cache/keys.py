@@ -0,0 +1,39 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any
+
+import msgspec
+
+from app.schemas import OrderResponse, ProductResponse, UserResponse
+
+# Поколение каталога: любое изменение продуктов делает старые списки недостижимыми
+CATALOG_GENERATION_KEY = "product:catalog:generation"
+
+
+@lru_cache(maxsize=None)
+def schema_version(model: Any) -> str:
+    """Короткий хеш JSON-схемы ответа для ключей кеша.
+
+    В кеше лежит готовый JSON ответа, поэтому при изменении схемы меняется
+    и ключ - записи старого формата больше не читаются и истекают по TTL.
+    """
+    if hasattr(model, "model_json_schema"):
+        schema = model.model_json_schema()
+    else:
+        # Структуры msgspec и аннотации вроде List[ProductRead]
+        schema = msgspec.json.schema(model)
+    schema = json.dumps(schema, sort_keys=True)
+    return "v" + hashlib.sha1(schema.encode()).hexdigest()[:8]
+
+
+# Префиксы ключей ответов GET /{entity}/{id}: версия схемы в ключе,
+# записи старого формата не читаются
+PRODUCT_CACHE_PREFIX = f"product:{schema_version(ProductResponse)}:"
+USER_CACHE_PREFIX = f"user:{schema_version(UserResponse)}:"
+ORDER_CACHE_PREFIX = f"order:{schema_version(OrderResponse)}:"
+
+
+def product_cache_key(product_id: int) -> str:
+    """Ключ ответа GET /products/{id}; его удаляют и сервисы, меняющие остатки"""
+    return f"{PRODUCT_CACHE_PREFIX}{product_id}"
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, Union
+
+CacheValue = Union[str, bytes]
+
+
+class LocalCache:
+    """In-process LRU кеш с TTL и ограничением по числу записей и байтам.
+
+    Первый уровень перед Redis: горячие ключи отдаются без сетевого запроса.
+    Значения - уже сериализованные строки/байты из Redis, поэтому размер
+    записи известен точно.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 10 * 1024 * 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (value, expires_at, size)
+        self._data: "OrderedDict[str, Tuple[CacheValue, float, int]]" = OrderedDict()
+        self.size_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: CacheValue, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (value, self._clock() + ttl, size)
+        self.size_bytes += size
+        while len(self._data) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._remove(key):
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry[2]
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "size_bytes": self.size_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
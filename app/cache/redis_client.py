@@ -1,17 +1,471 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, Tuple
+
 import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from litestar import Litestar
+from litestar.datastructures import State
+
+from app.cache.circuit_breaker import CircuitBreaker
+from app.cache.codec import CacheCodec, TextCodec, create_codec
+from app.cache.local_cache import LocalCache
+from app.cache.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Модуль импортируется раньше app.database - .env читаем сами
+load_dotenv()
+
+# Настройки подключения берём из окружения (docker-compose / .env)
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+
+# Circuit breaker: после N ошибок подряд не ходим в Redis cooldown секунд
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", "5"))
+REDIS_BREAKER_COOLDOWN = float(os.getenv("REDIS_BREAKER_COOLDOWN", "30"))
+
+# In-process кеш первого уровня (0 в CACHE_L1_MAX_ENTRIES отключает его)
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000"))
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))
+# Канал pub/sub, по которому воркеры сообщают друг другу об инвалидации
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+# Защита от stampede: короткий межпроцессный лок на загрузку ключа
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", "5000"))
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", "1.0"))
+CACHE_LOCK_POLL = float(os.getenv("CACHE_LOCK_POLL", "0.02"))
+# Stale-while-revalidate: сколько секунд после TTL ещё отдаём устаревшее значение
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "0"))
+# Вероятностное раннее обновление (XFetch); 0 - выключено, 1.0 - типичное значение
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "0"))
+
+# Формат значений в Redis: binary (конверт с версией и сжатием) или text
+CACHE_CODEC = os.getenv("CACHE_CODEC", "binary")
+CACHE_CODEC_FORMAT = os.getenv("CACHE_CODEC_FORMAT", "json")
+# Значения длиннее порога сжимаются zlib (0 - не сжимать)
+CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "1024"))
+
+# Синхронный пул для скриптов и ручной проверки (test_redis.py)
+_sync_pool: Optional[redis.ConnectionPool] = None
 
 
 def get_redis():
-    """Возвращает подключение к Redis или None"""
-    try:
-        client = redis.Redis(
-            host="redis",
-            port=6379,
-            db=0,
+    """Возвращает синхронное подключение к Redis из общего пула или None"""
+    global _sync_pool  # pylint: disable=global-statement
+    if _sync_pool is None:
+        _sync_pool = redis.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD,
             decode_responses=True,
-            socket_connect_timeout=2,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
         )
+    try:
+        client = redis.Redis(connection_pool=_sync_pool)
         client.ping()
         return client
     except (redis.ConnectionError, redis.TimeoutError):
         return None
+
+
+def create_redis_client(decode_responses: bool = True) -> aioredis.Redis:
+    """Создаёт асинхронный клиент Redis поверх пула соединений"""
+    pool = aioredis.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD,
+        decode_responses=decode_responses,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+class RedisCache:
+    """Асинхронные операции кеша; ошибки Redis не пробрасываются наружу.
+
+    Все вызовы идут через circuit breaker: при недоступном Redis запросы
+    сразу получают промах кеша вместо ожидания таймаута соединения.
+    Перед Redis стоит in-process LocalCache; инвалидации рассылаются через
+    pub/sub, чтобы каждый воркер удалил свою локальную копию. Значения
+    проходят через codec: наружу всегда отдаётся строка JSON.
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        breaker: Optional[CircuitBreaker] = None,
+        local: Optional[LocalCache] = None,
+        invalidation_channel: str = CACHE_INVALIDATION_CHANNEL,
+        stale_ttl: int = CACHE_STALE_TTL,
+        early_refresh_beta: float = CACHE_EARLY_REFRESH_BETA,
+        codec: Optional[CacheCodec] = None,
+    ) -> None:
+        self.client = client
+        self.codec = codec or TextCodec()
+        self.breaker = breaker or CircuitBreaker(
+            "redis",
+            failure_threshold=REDIS_BREAKER_FAILURES,
+            recovery_timeout=REDIS_BREAKER_COOLDOWN,
+        )
+        self.local = local
+        self.invalidation_channel = invalidation_channel
+        self.stale_ttl = stale_ttl
+        self.early_refresh_beta = early_refresh_beta
+        self.single_flight = SingleFlight()
+
+        self.lock_waits = 0
+        self.lock_wait_hits = 0
+        self.stale_served = 0
+        self.early_refreshes = 0
+
+    async def _call(
+        self, operation: str, key: Any, call: Callable[[], Awaitable[Any]], default
+    ):
+        permit = self.breaker.allow_request()
+        if not permit:
+            return default
+        try:
+            result = await call()
+        except (redis.RedisError, OSError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure()
+            logger.warning(f"❌ [CACHE {operation} ERROR] {key}: {e}")
+            return default
+        except BaseException:
+            # Отмена задачи (клиент отключился, таймаут запроса) - не сбой Redis:
+            # освобождаем пробный слот, если он наш, состояние breaker не меняем
+            self.breaker.release_probe(permit)
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _decode(self, raw: Any) -> Optional[str]:
+        return None if raw is None else self.codec.decode(raw)
+
+    async def _get_raw(self, key: str) -> Optional[str]:
+        return self._decode(
+            await self._call("GET", key, lambda: self.client.get(key), None)
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        value = await self._get_raw(key)
+        if value is not None and self.local is not None:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> bool:
+        encoded = self.codec.encode(value)
+        result = await self._call(
+            "SET", key, lambda: self.client.set(key, encoded, ex=ttl), False
+        )
+        if result and self.local is not None:
+            self.local.set(key, value, ttl)
+        return bool(result)
+
+    async def delete(self, *keys: str) -> int:
+        """Удаляет ключи из Redis и из локальных кешей всех воркеров"""
+        if self.local is not None:
+            self.local.delete(*keys)
+        deleted = await self._call("DELETE", keys, lambda: self.client.delete(*keys), 0)
+        await self._call(
+            "PUBLISH",
+            keys,
+            lambda: self.client.publish(self.invalidation_channel, json.dumps(keys)),
+            0,
+        )
+        return deleted
+
+    # --- Счётчики поколений ---
+
+    async def generation(self, key: str) -> Optional[int]:
+        """Текущее поколение набора ключей или None, если Redis недоступен.
+
+        Читается мимо L1, чтобы bump из другого воркера был виден сразу.
+        """
+        unavailable = object()
+        value = await self._call("GET", key, lambda: self.client.get(key), unavailable)
+        if value is unavailable:
+            return None
+        try:
+            return int(value) if value is not None else 0
+        except ValueError:
+            return None
+
+    async def bump_generation(self, key: str) -> int:
+        """Новое поколение: все ключи прошлого становятся недостижимыми"""
+        return await self._call("INCR", key, lambda: self.client.incr(key), 0)
+
+    # --- Защита от cache stampede ---
+
+    @property
+    def _tracks_freshness(self) -> bool:
+        return self.stale_ttl > 0 or self.early_refresh_beta > 0
+
+    @staticmethod
+    def _meta_key(key: str) -> str:
+        return f"{key}:meta"
+
+    @staticmethod
+    def _lock_key(key: str) -> str:
+        return f"lock:{key}"
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[str]]],
+        ttl: int,
+    ) -> Optional[str]:
+        """Значение из кеша или из loader, но не более одной загрузки на ключ.
+
+        Внутри процесса одновременные промахи объединяются (SingleFlight),
+        между процессами загрузку выполняет владелец короткого Redis-лока.
+        loader возвращает сериализованное значение или None (не кешируется).
+        """
+        if not self._tracks_freshness:
+            value = await self.get(key)
+            if value is not None:
+                return value
+            return await self.single_flight.do(
+                key, lambda: self._load_with_lock(key, loader, ttl)
+            )
+
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        result = await self._call(
+            "MGET", key, lambda: self.client.mget(key, self._meta_key(key)), None
+        )
+        raw, meta = result if result else (None, None)
+        value = self._decode(raw)
+        if value is None:
+            return await self.single_flight.do(
+                key, lambda: self._load_with_lock(key, loader, ttl)
+            )
+
+        fresh_until, delta = self._parse_meta(meta)
+        now = time.time()
+        if now < fresh_until and not self._should_refresh_early(fresh_until, delta):
+            if self.local is not None:
+                self.local.set(key, value, fresh_until - now)
+            return value
+
+        # Значение устарело или выпал ранний refresh: обновляет один процесс,
+        # остальные продолжают получать текущее значение
+        if now >= fresh_until:
+            self.stale_served += 1
+        else:
+            self.early_refreshes += 1
+        token = await self._acquire_lock(key)
+        if token is None:
+            return value
+        try:
+            return await self.single_flight.do(
+                key, lambda: self._load_and_store(key, loader, ttl)
+            )
+        finally:
+            await self._release_lock(key, token)
+
+    @staticmethod
+    def _parse_meta(meta: Any) -> Tuple[float, float]:
+        if isinstance(meta, bytes):
+            meta = meta.decode()
+        try:
+            fresh_until, delta = meta.split(":")
+            return float(fresh_until), float(delta)
+        except (AttributeError, ValueError):
+            return 0.0, 0.0
+
+    def _should_refresh_early(self, fresh_until: float, delta: float) -> bool:
+        if self.early_refresh_beta <= 0 or delta <= 0:
+            return False
+        # XFetch: чем ближе истечение и дольше загрузка, тем выше шанс refresh
+        gap = -delta * self.early_refresh_beta * math.log(1.0 - random.random())
+        return time.time() + gap >= fresh_until
+
+    async def _load_with_lock(
+        self, key: str, loader: Callable[[], Awaitable[Optional[str]]], ttl: int
+    ) -> Optional[str]:
+        token = await self._acquire_lock(key)
+        if token is None:
+            # Ключ уже загружает другой процесс - ждём его результат
+            self.lock_waits += 1
+            deadline = time.monotonic() + CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(CACHE_LOCK_POLL)
+                value = await self._get_raw(key)
+                if value is not None:
+                    self.lock_wait_hits += 1
+                    return value
+            # Не дождались - загружаем сами, чтобы не зависнуть на чужом локе
+        try:
+            return await self._load_and_store(key, loader, ttl)
+        finally:
+            if token is not None:
+                await self._release_lock(key, token)
+
+    async def _load_and_store(
+        self, key: str, loader: Callable[[], Awaitable[Optional[str]]], ttl: int
+    ) -> Optional[str]:
+        started = time.monotonic()
+        value = await loader()
+        if value is None:
+            return None
+        if not self._tracks_freshness:
+            self._log_store(key, await self.set(key, value, ttl))
+            return value
+
+        delta = time.monotonic() - started
+        fresh_until = time.time() + ttl
+        physical_ttl = ttl + self.stale_ttl
+
+        encoded = self.codec.encode(value)
+
+        async def _store():
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(key, encoded, ex=physical_ttl)
+                pipe.set(self._meta_key(key), f"{fresh_until}:{delta}", ex=physical_ttl)
+                return await pipe.execute()
+
+        stored = bool(await self._call("SET", key, _store, None))
+        if stored and self.local is not None:
+            self.local.set(key, value, ttl)
+        self._log_store(key, stored)
+        return value
+
+    @staticmethod
+    def _log_store(key: str, stored: bool) -> None:
+        # По результату записи, а не по факту загрузки: breaker мог пропустить SET
+        if stored:
+            logger.info(f"💾 [CACHE SAVE] {key} saved to Redis")
+        else:
+            logger.info(f"⏭️ [CACHE SKIP] {key} loaded but not cached")
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Токен лока или None, если лок держит другой процесс.
+
+        При недоступном Redis лок считаем полученным - грузим сами.
+        """
+        token = uuid.uuid4().hex
+        acquired = await self._call(
+            "LOCK",
+            key,
+            lambda: self.client.set(
+                self._lock_key(key), token, nx=True, px=CACHE_LOCK_TTL_MS
+            ),
+            True,
+        )
+        return token if acquired else None
+
+    async def _release_lock(self, key: str, token: str) -> None:
+        lock_key = self._lock_key(key)
+        owner = await self._call(
+            "GET", lock_key, lambda: self.client.get(lock_key), None
+        )
+        if owner in (token, token.encode()):
+            await self._call(
+                "UNLOCK", lock_key, lambda: self.client.delete(lock_key), 0
+            )
+
+    async def listen_invalidations(self, retry_delay: float = 1.0) -> None:
+        """Фоновая задача: удаляет из LocalCache ключи, инвалидированные другими воркерами"""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                # Пока не были подписаны, могли пропустить сообщения
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        self.local.delete(*json.loads(message["data"]))
+                    except (json.JSONDecodeError, TypeError):
+                        logger.warning(f"Bad invalidation message: {message['data']!r}")
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"❌ [CACHE PUBSUB ERROR] {e}, retrying")
+                self.local.clear()
+                await asyncio.sleep(retry_delay)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "circuit_breaker": self.breaker.stats(),
+            "codec": {
+                "name": self.codec.name,
+                "rejected": getattr(self.codec, "rejected", 0),
+            },
+            "local": self.local.stats() if self.local is not None else None,
+            "single_flight": self.single_flight.stats(),
+            "stampede": {
+                "lock_waits": self.lock_waits,
+                "lock_wait_hits": self.lock_wait_hits,
+                "stale_served": self.stale_served,
+                "early_refreshes": self.early_refreshes,
+            },
+        }
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        await self.client.connection_pool.disconnect()
+
+
+@asynccontextmanager
+async def redis_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Создаёт общий клиент Redis на время жизни приложения"""
+    local = LocalCache(CACHE_L1_MAX_ENTRIES, CACHE_L1_MAX_BYTES, CACHE_L1_TTL)
+    codec = create_codec(CACHE_CODEC, CACHE_CODEC_FORMAT, CACHE_COMPRESS_THRESHOLD)
+    cache = RedisCache(
+        create_redis_client(decode_responses=not codec.binary),
+        local=local if local.enabled else None,
+        codec=codec,
+    )
+    app.state.redis_cache = cache
+    logger.info(
+        f"Redis pool configured: {REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}, "
+        f"max_connections={REDIS_MAX_CONNECTIONS}, codec={codec.name}"
+    )
+    listener = None
+    if cache.local is not None:
+        listener = asyncio.create_task(cache.listen_invalidations())
+    try:
+        yield
+    finally:
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        await cache.close()
+
+
+def provide_redis_cache(state: State) -> Optional[RedisCache]:
+    """Провайдер общего клиента кеша для сервисов"""
+    return state.get("redis_cache")
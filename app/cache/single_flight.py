@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _LeaderCancelled(Exception):
+    """Загрузку отменили вместе с ведущим запросом - ожидающие повторяют её"""
+
+
+class SingleFlight:
+    """Объединение одновременных загрузок одного ключа внутри процесса.
+
+    Первый запрос по ключу запускает loader, остальные ждут его результат,
+    поэтому при промахе кеша в БД уходит один запрос, а не N. Если
+    ведущий запрос отменён (клиент отключился), ожидающие не отменяются:
+    один из них становится ведущим и загружает значение заново.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.leader_cancellations = 0
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                return await self._lead(key, loader)
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                self.coalesced -= 1
+
+    async def _lead(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.loads += 1
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            # Общий future не отменяем: отменён только ведущий
+            self.leader_cancellations += 1
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получат ожидающие; если их нет - не логируем "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Доля запросов, обслуженных чужой загрузкой"""
+        return self.coalesced / self.requests if self.requests else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalescing_ratio, 4),
+            "leader_cancellations": self.leader_cancellations,
+        }
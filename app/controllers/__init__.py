@@ -1,5 +1,6 @@
+from .health_controller import HealthController
 from .order_controller import OrderController
 from .product_controller import ProductController
 from .user_controller import UserController
 
-__all__ = ["UserController", "ProductController", "OrderController"]
+__all__ = ["UserController", "ProductController", "OrderController", "HealthController"]
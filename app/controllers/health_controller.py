@@ -0,0 +1,32 @@
+from typing import Optional
+
+from litestar import Controller, get
+
+from app.cache.redis_client import RedisCache
+from app.database import db_stats
+from app.messaging.outbox import relay as outbox_relay
+from app.messaging.producer import connection
+
+
+class HealthController(Controller):
+    path = "/health"
+
+    @get("/cache")
+    async def cache_health(self, redis_cache: Optional[RedisCache]) -> dict:
+        """Состояние circuit breaker кеша и счётчики для алертов"""
+        if redis_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **redis_cache.stats()}
+
+    @get("/db")
+    async def db_health(self) -> dict:
+        """Ленивые сессии, ожидание/удержание соединений пулов и реплики"""
+        return db_stats()
+
+    @get("/messaging")
+    async def messaging_health(self) -> dict:
+        """Подключение к брокеру и relay outbox"""
+        return {
+            "broker": connection.stats(),
+            "outbox": outbox_relay.stats(),
+        }
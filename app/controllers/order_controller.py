@@ -1,11 +1,23 @@
-from typing import List
+from typing import List, Optional, Union
 
-from litestar import Controller, delete, get, post, put
-from litestar.exceptions import NotFoundException
+from litestar import Controller, MediaType, Request, Response, delete, get, post, put
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.openapi import ResponseSpec
 from litestar.params import Body, Parameter
-from sqlalchemy.orm import Session
 
-from app.schemas import OrderCreate, OrderResponse, OrderUpdate
+from app.database import DbSession
+from app.http_cache import conditional_json
+from app.pagination import InvalidCursorError
+from app.read_models import OrderPage, OrderRead
+from app.schemas import (
+    OrderBatchCreate,
+    OrderBatchItemResult,
+    OrderBatchResponse,
+    OrderCreate,
+    OrderResponse,
+    OrderSort,
+    OrderUpdate,
+)
 from app.services.order_service import OrderService
 
 
@@ -16,43 +28,106 @@ class OrderController(Controller):
     async def create_order(
         self,
         order_service: OrderService,
-        session: Session,
+        session: DbSession,
         data: OrderCreate = Body(),
     ) -> OrderResponse:
         """Создать заказ (отправляет событие в RabbitMQ)"""
         order = await order_service.create_order(session, data)
         return OrderResponse.model_validate(order)
 
-    @get("/{order_id:int}")
+    @post("/batch")
+    async def create_orders_batch(
+        self,
+        order_service: OrderService,
+        session: DbSession,
+        data: OrderBatchCreate = Body(),
+        chunk_size: Optional[int] = Parameter(default=None, gt=0, le=1000),
+    ) -> OrderBatchResponse:
+        """Создать пачку заказов; ошибки возвращаются по каждому заказу"""
+        kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+        results = await order_service.create_orders_batch(
+            session, data.orders, **kwargs
+        )
+        items = [
+            (
+                OrderBatchItemResult(index=index, error=str(result))
+                if isinstance(result, Exception)
+                else OrderBatchItemResult(
+                    index=index, order=OrderResponse.model_validate(result)
+                )
+            )
+            for index, result in enumerate(results)
+        ]
+        failed = sum(1 for item in items if item.error)
+        return OrderBatchResponse(
+            created=len(items) - failed, failed=failed, results=items
+        )
+
+    @get(
+        "/{order_id:int}",
+        responses={
+            200: ResponseSpec(
+                OrderResponse, generate_examples=False, description="Order"
+            )
+        },
+    )
     async def get_order(
         self,
+        request: Request,
         order_service: OrderService,
-        session: Session,
+        session: DbSession,
         order_id: int = Parameter(),
-    ) -> OrderResponse:
-        """Получить заказ по ID"""
-        order = await order_service.get_order(session, order_id)
-        if not order:
+    ) -> Response[bytes]:
+        """Получить заказ по ID (ETag/Last-Modified, 304 для актуальной версии)"""
+        # Из кеша приходит готовый JSON ответа - отдаём его без сериализации
+        body = await order_service.get_order_json(session, order_id)
+        if body is None:
             raise NotFoundException(detail=f"Order {order_id} not found")
-        return OrderResponse.model_validate(order)
+        return conditional_json(request.headers, OrderResponse, body)
 
-    @get()
+    @get(
+        responses={
+            200: ResponseSpec(
+                Union[List[OrderRead], OrderPage],
+                generate_examples=False,
+                description="Orders",
+            )
+        }
+    )
     async def get_orders(
         self,
         order_service: OrderService,
-        session: Session,
+        session: DbSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
-    ) -> List[OrderResponse]:
-        """Список заказов"""
-        orders = await order_service.list_orders(session, count=count, page=page)
-        return [OrderResponse.model_validate(order) for order in orders]
+        user_id: Optional[int] = Parameter(default=None, gt=0),
+        sort: OrderSort = Parameter(
+            default="id", description="id, -id (сначала новые)"
+        ),
+        cursor: Optional[str] = Parameter(
+            default=None,
+            description="Курсор keyset-пагинации; пустое значение - первая страница",
+        ),
+    ) -> Response[bytes]:
+        """Список заказов; последние заказы пользователя (sort=-id) кешируются"""
+        try:
+            body = await order_service.list_orders_json(
+                session,
+                count=count,
+                page=page,
+                cursor=cursor,
+                user_id=user_id,
+                sort=sort,
+            )
+        except InvalidCursorError as e:
+            raise ValidationException(detail=str(e)) from e
+        return Response(content=body, media_type=MediaType.JSON)
 
     @put("/{order_id:int}")
     async def update_order(
         self,
         order_service: OrderService,
-        session: Session,
+        session: DbSession,
         order_id: int = Parameter(),
         data: OrderUpdate = Body(),  # ← Используем схему
     ) -> OrderResponse:
@@ -70,7 +145,7 @@ class OrderController(Controller):
     async def delete_order(
         self,
         order_service: OrderService,
-        session: Session,
+        session: DbSession,
         order_id: int = Parameter(),
     ) -> None:
         """Удалить заказ"""
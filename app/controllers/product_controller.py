@@ -1,11 +1,25 @@
-from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Union
 
-from litestar import Controller, delete, get, post, put
-from litestar.exceptions import NotFoundException
+from litestar import Controller, MediaType, Request, Response, delete, get, post, put
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.openapi import ResponseSpec
 from litestar.params import Body, Parameter
-from sqlalchemy.orm import Session
 
-from app.schemas import ProductCreate, ProductResponse, ProductUpdate
+from app.database import DbSession
+from app.http_cache import conditional_json
+from app.pagination import InvalidCursorError
+from app.read_models import ProductPage, ProductRead
+from app.schemas import (
+    ImportResult,
+    ProductCreate,
+    ProductFilter,
+    ProductResponse,
+    ProductSort,
+    ProductUpdate,
+)
+from app.services.import_service import ImportService
 from app.services.product_service import ProductService
 
 
@@ -16,50 +30,100 @@ class ProductController(Controller):
     async def create_product(
         self,
         product_service: ProductService,
-        session: Session,
+        session: DbSession,
         data: ProductCreate = Body(),
     ) -> ProductResponse:
         product = await product_service.create_product(session, data)
         return ProductResponse.model_validate(product)
 
-    @get("/{product_id:int}")
+    @post("/import", request_max_body_size=None)
+    async def import_products(
+        self,
+        request: Request,
+        import_service: ImportService,
+        session: DbSession,
+    ) -> ImportResult:
+        """Потоковый импорт продуктов из NDJSON (по умолчанию) или CSV (text/csv)"""
+        fmt = "csv" if request.content_type[0] == "text/csv" else "ndjson"
+        return await import_service.import_products(session, request.stream(), fmt)
+
+    @get(
+        "/{product_id:int}",
+        responses={
+            200: ResponseSpec(
+                ProductResponse, generate_examples=False, description="Product"
+            )
+        },
+    )
     async def get_product(
         self,
+        request: Request,
         product_service: ProductService,
-        session: Session,
+        session: DbSession,
         product_id: int = Parameter(),
-    ) -> ProductResponse:
-        product = await product_service.get_product(session, product_id)
-        if not product:
+    ) -> Response[bytes]:
+        """Продукт с ETag/Last-Modified; 304, если у клиента актуальная версия"""
+        # Из кеша приходит готовый JSON ответа - отдаём его без сериализации
+        body = await product_service.get_product_json(session, product_id)
+        if body is None:
             raise NotFoundException(detail=f"Product {product_id} not found")
-        return ProductResponse.model_validate(product)
+        return conditional_json(request.headers, ProductResponse, body)
 
-    @get()
+    @get(
+        responses={
+            200: ResponseSpec(
+                Union[List[ProductRead], ProductPage],
+                generate_examples=False,
+                description="Products",
+            )
+        }
+    )
     async def get_products(
         self,
         product_service: ProductService,
-        session: Session,
+        session: DbSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
         name: Optional[str] = Parameter(default=None),
-        min_price: Optional[float] = Parameter(default=None),
-        max_price: Optional[float] = Parameter(default=None),
-    ) -> List[ProductResponse]:
-        products = await product_service.list_products(
-            session,
-            count=count,
-            page=page,
+        min_price: Optional[Decimal] = Parameter(default=None),
+        max_price: Optional[Decimal] = Parameter(default=None),
+        min_stock: Optional[int] = Parameter(default=None),
+        max_stock: Optional[int] = Parameter(default=None),
+        created_from: Optional[datetime] = Parameter(default=None),
+        created_to: Optional[datetime] = Parameter(default=None),
+        sort: ProductSort = Parameter(
+            default="id", description="id, price, -price, created_at, -created_at"
+        ),
+        cursor: Optional[str] = Parameter(
+            default=None,
+            description="Курсор keyset-пагинации; пустое значение - первая страница",
+        ),
+    ) -> Response[bytes]:
+        """Список продуктов; результат кешируется до изменения каталога"""
+        filters = ProductFilter(
             name=name,
             min_price=min_price,
             max_price=max_price,
+            min_stock=min_stock,
+            max_stock=max_stock,
+            created_from=created_from,
+            created_to=created_to,
+            sort=sort,
         )
-        return [ProductResponse.model_validate(product) for product in products]
+
+        try:
+            body = await product_service.list_products_json(
+                session, count=count, page=page, cursor=cursor, filters=filters
+            )
+        except InvalidCursorError as e:
+            raise ValidationException(detail=str(e)) from e
+        return Response(content=body, media_type=MediaType.JSON)
 
     @put("/{product_id:int}")
     async def update_product(
         self,
         product_service: ProductService,
-        session: Session,
+        session: DbSession,
         product_id: int = Parameter(),
         data: ProductUpdate = Body(),
     ) -> ProductResponse:
@@ -72,7 +136,7 @@ class ProductController(Controller):
     async def delete_product(
         self,
         product_service: ProductService,
-        session: Session,
+        session: DbSession,
         product_id: int = Parameter(),
     ) -> None:
         success = await product_service.delete_product(session, product_id)
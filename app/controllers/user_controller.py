@@ -1,62 +1,101 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from litestar import Controller, delete, get, post, put
-from litestar.exceptions import NotFoundException
+from litestar import Controller, Request, Response, delete, get, post, put
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.openapi import ResponseSpec
 from litestar.params import Body, Parameter
-from sqlalchemy.orm import Session
 
-from app.schemas import UserCreate, UserResponse, UserUpdate
+from app.database import DbSession
+from app.http_cache import conditional_json
+from app.pagination import InvalidCursorError
+from app.read_models import UserPage, UserRead
+from app.schemas import ImportResult, UserCreate, UserResponse, UserUpdate
+from app.services.import_service import ImportService
 from app.services.user_service import UserService
 
 
 class UserController(Controller):
     path = "/users"
 
-    @get("/{user_id:int}")
+    @get(
+        "/{user_id:int}",
+        responses={
+            200: ResponseSpec(UserResponse, generate_examples=False, description="User")
+        },
+    )
     async def get_user_by_id(
-        self, user_service: UserService, session: Session, user_id: int = Parameter()
-    ) -> UserResponse:
-        user = await user_service.get_by_id(session, user_id)
-        if not user:
+        self,
+        request: Request,
+        user_service: UserService,
+        session: DbSession,
+        user_id: int = Parameter(),
+    ) -> Response[bytes]:
+        """Пользователь с ETag/Last-Modified; 304, если у клиента актуальная версия"""
+        # Из кеша приходит готовый JSON ответа - отдаём его без сериализации
+        body = await user_service.get_by_id_json(session, user_id)
+        if body is None:
             raise NotFoundException(detail=f"User with ID {user_id} not found")
-        return UserResponse.model_validate(user)
+        return conditional_json(request.headers, UserResponse, body)
 
     @get()
     async def get_all_users(
         self,
         user_service: UserService,
-        session: Session,
+        session: DbSession,
         count: int = Parameter(gt=0, le=100, default=10),
         page: int = Parameter(ge=1, default=1),
         username: Optional[str] = Parameter(default=None),
         email: Optional[str] = Parameter(default=None),
-    ) -> List[UserResponse]:
+        cursor: Optional[str] = Parameter(
+            default=None,
+            description="Курсор keyset-пагинации; пустое значение - первая страница",
+        ),
+    ) -> Union[List[UserRead], UserPage]:
         filters = {}
         if username:
             filters["username"] = username
         if email:
             filters["email"] = email
 
-        users = await user_service.get_by_filter(
+        if cursor is not None:
+            try:
+                result = await user_service.get_page(
+                    session, count=count, cursor=cursor, **filters
+                )
+            except InvalidCursorError as e:
+                raise ValidationException(detail=str(e)) from e
+            return UserPage(items=result.items, next_cursor=result.next_cursor)
+
+        return await user_service.get_by_filter(
             session, count=count, page=page, **filters
         )
-        return [UserResponse.model_validate(user) for user in users]
 
     @post()
     async def create_user(
         self,
         user_service: UserService,
-        session: Session,
+        session: DbSession,
         data: UserCreate = Body(),
     ) -> UserResponse:
         user = await user_service.create(session, data)
         return UserResponse.model_validate(user)
 
+    @post("/import", request_max_body_size=None)
+    async def import_users(
+        self,
+        request: Request,
+        import_service: ImportService,
+        session: DbSession,
+    ) -> ImportResult:
+        """Потоковый импорт пользователей из NDJSON (по умолчанию) или CSV (text/csv)"""
+        fmt = "csv" if request.content_type[0] == "text/csv" else "ndjson"
+        return await import_service.import_users(session, request.stream(), fmt)
+
     @put("/{user_id:int}")
     async def update_user(
         self,
         user_service: UserService,
-        session: Session,
+        session: DbSession,
         user_id: int = Parameter(),
         data: UserUpdate = Body(),
     ) -> UserResponse:
@@ -69,7 +108,7 @@ class UserController(Controller):
     async def delete_user(
         self,
         user_service: UserService,
-        session: Session,
+        session: DbSession,
         user_id: int = Parameter(),
     ) -> None:
         await user_service.delete(session, user_id)
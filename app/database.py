@@ -0,0 +1,237 @@
+import logging
+import os
+import traceback
+from contextlib import contextmanager
+from typing import (
+    Annotated,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Iterator,
+    Optional,
+    Union,
+)
+
+from dotenv import load_dotenv
+from litestar import Request
+from litestar.params import Dependency
+from sqlalchemy import Connection, create_engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.db_metrics import PoolMetrics, SessionMetrics, metered_pool_class
+from app.replicas import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Сессия может быть как синхронной, так и асинхронной - репозитории умеют обе
+AnySession = Union[Session, AsyncSession]
+
+# Тип для внедрения сессии в обработчики (Litestar не валидирует union из двух классов)
+DbSession = Annotated[AnySession, Dependency(skip_validation=True)]
+
+# Настройка базы данных: драйвер (sqlite / sqlite+aiosqlite) определяет режим движка
+DB_URL = os.getenv("DB_URL", "sqlite+aiosqlite:///./lab3.db")
+DB_ECHO = os.getenv("DB_ECHO", "true").lower() == "true"
+# Размер пула на движок: соединение занимается только запросами, которые
+# реально идут в БД, поэтому пул может быть меньше числа одновременных запросов
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Реплики для чтения через запятую (локально - копии SQLite-файла,
+# например sqlite:///file:replica1.db?mode=ro&uri=true)
+DB_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()
+]
+DB_REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")
+DB_REPLICA_FAILURES = int(os.getenv("DB_REPLICA_FAILURES", "1"))
+DB_REPLICA_COOLDOWN = float(os.getenv("DB_REPLICA_COOLDOWN", "10"))
+# Сколько секунд после записи клиент читает с primary (read-your-writes)
+DB_READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+
+def is_async_url(url: str) -> bool:
+    """Проверяет, использует ли URL асинхронный драйвер"""
+    return bool(make_url(url).get_dialect().is_async)
+
+
+IS_ASYNC = is_async_url(DB_URL)
+
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+session_metrics = SessionMetrics()
+
+
+def _create_engine(url: str, name: str, **kwargs):
+    if is_async_url(url) != IS_ASYNC:
+        raise ValueError(f"Replica driver mode must match DB_URL: {url}")
+    metrics = pool_metrics[name] = PoolMetrics(name)
+    poolclass = metered_pool_class(url, metrics)
+    if issubclass(poolclass, QueuePool):
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    create = create_async_engine if IS_ASYNC else create_engine
+    engine = create(url, echo=DB_ECHO, poolclass=poolclass, **kwargs)
+    metrics.attach(engine)
+    return engine
+
+
+engine = _create_engine(DB_URL, "primary")
+
+replica_router = ReplicaRouter(
+    [
+        (
+            make_url(url).render_as_string(hide_password=True),
+            _create_engine(url, f"replica-{number}", pool_pre_ping=True),
+        )
+        for number, url in enumerate(DB_REPLICA_URLS, start=1)
+    ],
+    strategy=DB_REPLICA_STRATEGY,
+    failure_threshold=DB_REPLICA_FAILURES,
+    recovery_timeout=DB_REPLICA_COOLDOWN,
+)
+
+
+class RoutingSession(Session):
+    """Сессия, которая выбирает движок только при первом обращении к БД.
+
+    Создание сессии ничего не берёт из пула: если обработчик обошёлся кешем,
+    соединение не занимается вовсе. Чтение (info["read_only"]) при первом
+    запросе уходит на реплику, остальное - на primary. Если реплика не
+    отдала соединение, сессия прозрачно переключается на primary.
+    Внутри primary_reads() запросы идут на primary в любом случае.
+    """
+
+    def get_bind(self, mapper=None, **kwargs):
+        if "bind" not in self.info:
+            self.info["bind"] = self._route() or super().get_bind(mapper, **kwargs)
+        if self.info.get("primary_reads") and "replica" in self.info:
+            return super().get_bind(mapper, **kwargs)
+        return self.info["bind"]
+
+    def _route(self) -> Optional[Connection]:
+        if not self.info.get("read_only") or self.info.get("primary_reads"):
+            return None
+        replica = replica_router.acquire()
+        if replica is None:
+            return None
+        try:
+            connection = getattr(replica.bind, "sync_engine", replica.bind).connect()
+        except OperationalError as e:
+            replica_router.fallback(replica, e)
+            return None
+        self.info["replica"] = replica
+        return connection
+
+
+@contextmanager
+def primary_reads(session: AnySession) -> Iterator[None]:
+    """Чтения внутри блока идут на primary, даже если запрос обслуживает реплика.
+
+    Нужно загрузчикам кеша: значение попадает в общий кеш, и отставшая
+    реплика не должна заполнить его устаревшими данными.
+    """
+    previous = session.info.get("primary_reads", False)
+    session.info["primary_reads"] = True
+    try:
+        yield
+    finally:
+        session.info["primary_reads"] = previous
+
+
+if IS_ASYNC:
+    session_factory = async_sessionmaker(
+        engine, expire_on_commit=False, sync_session_class=RoutingSession
+    )
+else:
+    session_factory = sessionmaker(
+        engine, class_=RoutingSession, expire_on_commit=False
+    )
+
+
+def _open_session(request: Request) -> AnySession:
+    session = session_factory()
+    session.info["read_only"] = replica_router.can_use_replica(
+        request.method, request.cookies, request.headers
+    )
+    session_metrics.sessions += 1
+    return session
+
+
+def _finish_session(session: AnySession, ok: bool) -> None:
+    if "bind" in session.info:
+        session_metrics.sessions_with_db += 1
+    replica = session.info.get("replica")
+    if replica is not None:
+        replica_router.release(replica, ok)
+
+
+def _replica_connection(session: AnySession) -> Optional[Connection]:
+    """Соединение с репликой, которое сессия не закрывает сама"""
+    if session.info.get("replica") is None:
+        return None
+    return session.info["bind"]
+
+
+def _provide_sync_session(request: Request) -> Generator[Session, None, None]:
+    """Провайдер синхронной сессии: соединение берётся при первом запросе к БД"""
+    session = _open_session(request)
+    ok = True
+    try:
+        yield session
+    except Exception as e:
+        # Ошибка соединения с репликой выключает её через circuit breaker
+        ok = not isinstance(e, OperationalError)
+        logger.error(f"Session error: {e}")
+        logger.error(traceback.format_exc())
+        raise
+    finally:
+        session.close()
+        connection = _replica_connection(session)
+        if connection is not None:
+            connection.close()
+        _finish_session(session, ok)
+
+
+async def _provide_async_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """Провайдер асинхронной сессии: соединение берётся при первом запросе к БД"""
+    session = _open_session(request)
+    ok = True
+    try:
+        yield session
+    except Exception as e:
+        # Ошибка соединения с репликой выключает её через circuit breaker
+        ok = not isinstance(e, OperationalError)
+        logger.error(f"Session error: {e}")
+        logger.error(traceback.format_exc())
+        raise
+    finally:
+        await session.close()
+        connection = _replica_connection(session)
+        if connection is not None:
+            # Синхронное соединение async-движка закрывается внутри greenlet
+            await session.run_sync(lambda _: connection.close())
+        _finish_session(session, ok)
+
+
+def db_stats() -> dict:
+    """Метрики сессий, пулов и маршрутизации по репликам для /health/db"""
+    return {
+        "sessions": session_metrics.stats(),
+        "pools": [metrics.stats() for metrics in pool_metrics.values()],
+        "replicas_enabled": bool(replica_router.replicas),
+        "routing": replica_router.stats(),
+    }
+
+
+provide_session = _provide_async_session if IS_ASYNC else _provide_sync_session
@@ -0,0 +1,101 @@
+import time
+from typing import Any, Callable, Dict, Type
+
+from sqlalchemy import event, make_url
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Время ожидания и удержания соединений пула одного движка.
+
+    wait - сколько запрос ждал соединение из пула (растёт, когда пул исчерпан),
+    hold - сколько соединение было занято от checkout до возврата в пул.
+    """
+
+    def __init__(self, name: str, clock: Callable[[], float] = time.perf_counter):
+        self.name = name
+        self._clock = clock
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.checkins = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def on_checkout(self, dbapi_connection, record, proxy) -> None:
+        record.info["checked_out_at"] = self._clock()
+
+    def on_checkin(self, dbapi_connection, record) -> None:
+        started = record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = self._clock() - started
+        self.checkins += 1
+        self.in_use = max(self.in_use - 1, 0)
+        self.hold_total += held
+        self.hold_max = max(self.hold_max, held)
+
+    def attach(self, engine: Any) -> None:
+        """Подписка на события пула (переживает пересоздание пула в dispose())"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "checkout", self.on_checkout)
+        event.listen(sync_engine, "checkin", self.on_checkin)
+
+    def stats(self) -> dict:
+        def ms(value: float) -> float:
+            return round(value * 1000, 3)
+
+        return {
+            "name": self.name,
+            "checkouts": self.checkouts,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "wait_avg_ms": (
+                ms(self.wait_total / self.checkouts) if self.checkouts else 0
+            ),
+            "wait_max_ms": ms(self.wait_max),
+            "hold_avg_ms": ms(self.hold_total / self.checkins) if self.checkins else 0,
+            "hold_max_ms": ms(self.hold_max),
+        }
+
+
+def metered_pool_class(url: str, metrics: PoolMetrics) -> Type[Pool]:
+    """Пул диалекта по умолчанию, замеряющий ожидание соединения в connect()"""
+    parsed = make_url(url)
+    base = parsed.get_dialect().get_pool_class(parsed)
+
+    def connect(self):
+        started = metrics._clock()
+        connection = base.connect(self)
+        metrics.record_wait(metrics._clock() - started)
+        return connection
+
+    return type(f"Metered{base.__name__}", (base,), {"connect": connect})
+
+
+class SessionMetrics:
+    """Сколько сессий запросов реально обратилось к БД"""
+
+    def __init__(self) -> None:
+        self.sessions = 0
+        self.sessions_with_db = 0
+
+    def stats(self) -> Dict[str, Any]:
+        without_db = self.sessions - self.sessions_with_db
+        return {
+            "sessions": self.sessions,
+            "sessions_with_db": self.sessions_with_db,
+            "sessions_without_db": without_db,
+            "lazy_skip_ratio": (
+                round(without_db / self.sessions, 4) if self.sessions else 0.0
+            ),
+        }
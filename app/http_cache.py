@@ -0,0 +1,107 @@
+"""Условные GET-запросы: ETag/Last-Modified и ответ 304 Not Modified.
+
+Валидаторы строятся из id и updated_at сущности плюс версия схемы ответа,
+поэтому после изменения формата ответа старые ETag клиентов не совпадут.
+Для закешированного JSON id и updated_at читаются из самого тела - строку
+из БД для ответа 304 загружать не нужно.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Type
+
+import msgspec
+from litestar import MediaType, Response
+from litestar.status_codes import HTTP_304_NOT_MODIFIED
+from pydantic import BaseModel
+
+from app.cache.keys import schema_version
+
+
+class EntityVersion(msgspec.Struct):
+    """Поля ответа, из которых строятся валидаторы (остальные пропускаются)"""
+
+    id: int
+    updated_at: datetime
+
+
+_version_decoder = msgspec.json.Decoder(EntityVersion)
+
+
+def body_version(body: bytes) -> EntityVersion:
+    """id и updated_at из готового JSON ответа без разбора остальных полей"""
+    return _version_decoder.decode(body)
+
+
+def _utc(value: datetime) -> datetime:
+    # updated_at хранится как локальное время без зоны (datetime.now)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(model: Type[BaseModel], entity_id: int, updated_at: datetime) -> str:
+    stamp = int(_utc(updated_at).timestamp() * 1_000_000)
+    return f'"{schema_version(model)}-{entity_id}-{stamp}"'
+
+
+def is_not_modified(headers: Any, etag: str, updated_at: datetime) -> bool:
+    """Проверка If-None-Match, а без него - If-Modified-Since (RFC 9110)"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = (tag.strip() for tag in if_none_match.split(","))
+        # Для GET сравнение слабое: W/"x" совпадает с "x"
+        return etag in (tag.removeprefix("W/") for tag in candidates)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # Last-Modified передаётся с точностью до секунды
+    return _utc(updated_at).replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, updated_at: datetime) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(_utc(updated_at), usegmt=True),
+        # Клиент может хранить ответ, но перед использованием обязан уточнить
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified(etag: str, updated_at: datetime) -> Response:
+    return Response(
+        content=None,
+        status_code=HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, updated_at),
+    )
+
+
+def conditional_response(
+    headers: Any,
+    model: Type[BaseModel],
+    content: Any,
+    entity_id: int,
+    updated_at: datetime,
+) -> Response:
+    """Ответ с валидаторами или 304, если у клиента актуальная версия"""
+    etag = make_etag(model, entity_id, updated_at)
+    if is_not_modified(headers, etag, updated_at):
+        return not_modified(etag, updated_at)
+    return Response(
+        content=content,
+        media_type=MediaType.JSON,
+        headers=validator_headers(etag, updated_at),
+    )
+
+
+def conditional_json(headers: Any, model: Type[BaseModel], body: bytes) -> Response:
+    """conditional_response для готового JSON (например, из кеша)"""
+    version = body_version(body)
+    return conditional_response(headers, model, body, version.id, version.updated_at)
@@ -1,16 +1,22 @@
 import logging
-import os
-import traceback
+from typing import Optional
 
-from dotenv import load_dotenv
 from litestar import Litestar
 from litestar.di import Provide
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
 
-from app.controllers import OrderController, ProductController, UserController
+from app.cache.redis_client import RedisCache, provide_redis_cache, redis_lifespan
+from app.controllers import (
+    HealthController,
+    OrderController,
+    ProductController,
+    UserController,
+)
+from app.database import DB_READ_YOUR_WRITES_SECONDS, provide_session, replica_router
+from app.messaging.outbox import outbox_lifespan
+from app.messaging.producer import broker_lifespan
+from app.replicas import read_your_writes_middleware
 from app.repositories import OrderRepository, ProductRepository, UserRepository
-from app.services import OrderService, ProductService, UserService
+from app.services import ImportService, OrderService, ProductService, UserService
 
 # Включаем подробное логирование
 logging.basicConfig(
@@ -18,30 +24,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
-# Настройка базы данных
-DB_URL = os.getenv("DB_URL", "sqlite:///./lab3.db")
-
-# Создаем синхронный движок
-engine = create_engine(DB_URL, echo=True)
-
-# Создаем фабрику для синхронных сессий
-session_factory = sessionmaker(engine, expire_on_commit=False)
-
-
-def provide_session() -> Session:
-    """Провайдер сессии базы данных"""
-    session = session_factory()
-    try:
-        yield session
-    except Exception as e:
-        logger.error(f"Session error: {e}")
-        logger.error(traceback.format_exc())
-        raise
-    finally:
-        session.close()
-
 
 def provide_user_repository() -> UserRepository:
     return UserRepository()
@@ -55,33 +37,62 @@ def provide_product_repository() -> ProductRepository:
     return ProductRepository()
 
 
-def provide_user_service(user_repository: UserRepository) -> UserService:
-    return UserService(user_repository)
+def provide_user_service(
+    user_repository: UserRepository, redis_cache: Optional[RedisCache]
+) -> UserService:
+    return UserService(user_repository, redis_cache)
 
 
 def provide_order_service(
     order_repository: OrderRepository,
     product_repository: ProductRepository,
     user_repository: UserRepository,
+    redis_cache: Optional[RedisCache],
 ) -> OrderService:
-    return OrderService(order_repository, product_repository, user_repository)
+    return OrderService(
+        order_repository, product_repository, user_repository, redis_cache
+    )
+
+
+def provide_product_service(
+    product_repository: ProductRepository, redis_cache: Optional[RedisCache]
+) -> ProductService:
+    return ProductService(product_repository, redis_cache)
 
 
-def provide_product_service(product_repository: ProductRepository) -> ProductService:
-    return ProductService(product_repository)
+def provide_import_service(
+    product_repository: ProductRepository,
+    user_repository: UserRepository,
+    redis_cache: Optional[RedisCache],
+) -> ImportService:
+    return ImportService(product_repository, user_repository, redis_cache)
 
 
 app = Litestar(
-    route_handlers=[UserController, OrderController, ProductController],
+    route_handlers=[
+        UserController,
+        OrderController,
+        ProductController,
+        HealthController,
+    ],
     dependencies={
         "session": Provide(provide_session),
+        "redis_cache": Provide(provide_redis_cache, sync_to_thread=False),
         "user_repository": Provide(provide_user_repository),
         "user_service": Provide(provide_user_service),
         "order_service": Provide(provide_order_service),
         "order_repository": Provide(provide_order_repository),
         "product_repository": Provide(provide_product_repository),
         "product_service": Provide(provide_product_service),
+        "import_service": Provide(provide_import_service),
     },
+    # Cookie read-your-writes нужна только когда чтение уходит на реплики
+    middleware=(
+        [read_your_writes_middleware(DB_READ_YOUR_WRITES_SECONDS)]
+        if replica_router.replicas
+        else []
+    ),
+    lifespan=[redis_lifespan, broker_lifespan, outbox_lifespan],
     debug=True,
 )
 
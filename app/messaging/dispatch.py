@@ -0,0 +1,100 @@
+"""Параллельная и пакетная обработка сообщений подписчиком.
+
+aio-pika запускает обработчик в отдельной задаче на каждое доставленное
+сообщение, поэтому одновременно выполняется до prefetch обработчиков.
+make_dispatcher ограничивает их число семафором, а в пакетном режиме
+собирает сообщения в списки для обработчика пачки. Сообщение
+подтверждается только после обработки его пачки: ошибка пачки
+возвращается каждому сообщению, и брокер поступает с ними как с
+ошибкой одиночного обработчика.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Awaitable[Any]]
+BatchHandler = Callable[[List[Any]], Awaitable[Any]]
+
+
+class BatchCollector:
+    """Собирает сообщения в пачки до batch_size, недобранную - через linger секунд"""
+
+    def __init__(self, handler: BatchHandler, batch_size: int, linger: float) -> None:
+        self._handler = handler
+        self.batch_size = batch_size
+        self.linger = linger
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.failed_batches = 0
+
+    async def submit(self, item: Any) -> None:
+        """Добавить сообщение и дождаться обработки его пачки"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        try:
+            await self._handler([item for item, _ in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"❌ [CONSUMER] Batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+def make_dispatcher(
+    handler: Handler,
+    batch_handler: Optional[BatchHandler] = None,
+    max_in_flight: int = 10,
+    batch_size: int = 0,
+    linger: float = 0.1,
+) -> Handler:
+    """Обработчик одного сообщения для подписчика.
+
+    Не больше max_in_flight одновременных вызовов handler, а при
+    batch_size > 1 - одновременных вызовов batch_handler с пачками.
+    """
+    limiter = asyncio.Semaphore(max_in_flight)
+
+    async def limited(function: Callable[[Any], Awaitable[Any]], arg: Any) -> None:
+        async with limiter:
+            await function(arg)
+
+    if batch_handler is not None and batch_size > 1:
+        collector = BatchCollector(
+            lambda items: limited(batch_handler, items), batch_size, linger
+        )
+        return collector.submit
+
+    async def dispatch(message: Any) -> None:
+        await limited(handler, message)
+
+    return dispatch
@@ -0,0 +1,44 @@
+"""Сообщения доменных событий для RabbitMQ: (имя очереди, тело).
+
+Репозитории вызывают построители в транзакции изменения и пишут событие
+в outbox; relay публикует сообщение без изменений.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Tuple
+
+# (имя очереди, сообщение)
+Event = Tuple[str, dict]
+
+ORDER_QUEUE = "order"
+PRODUCT_QUEUE = "products"
+# Очереди событий: durable, их объявляют и продюсер, и consumer
+QUEUES = (ORDER_QUEUE, PRODUCT_QUEUE)
+
+
+def order_created(
+    order_id: int, user_id: int, total_amount: Decimal, status: str = "created"
+) -> Event:
+    return (
+        ORDER_QUEUE,
+        {
+            "order_id": order_id,
+            "user_id": user_id,
+            "status": status,
+            "total_amount": str(total_amount),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+    )
+
+
+def product_created(product_id: int, name: str, price: Decimal) -> Event:
+    return (
+        PRODUCT_QUEUE,
+        {
+            "product_id": product_id,
+            "name": name,
+            "price": str(price),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+    )
@@ -0,0 +1,279 @@
+"""Идемпотентная обработка сообщений: повторная доставка не запускает обработчик.
+
+Ключ - очередь, id сущности (order_id / product_id) и AMQP message_id
+события (у событий outbox - "outbox-<id>"). Перед обработкой ключ
+захватывается в хранилище (Redis SET NX или таблица SQLite) со статусом
+processing на время lease, после успеха помечается done на ttl, после
+ошибки освобождается - повторная доставка обработается заново. Дубликат
+уже обработанного (done) события подтверждается брокеру без вызова
+обработчика; такие ключи дополнительно хранятся в ограниченном in-process
+кеше и отсеиваются без запроса к хранилищу. Захват processing мог
+остаться от упавшего воркера, поэтому такое сообщение не подтверждается:
+run бросает InProgressError, и consumer возвращает его в очередь, пока
+lease не истечёт или обработка не завершится.
+
+При недоступном хранилище (circuit breaker) сообщение обрабатывается без
+проверки: повтор лучше потери события.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from app.cache.circuit_breaker import CircuitBreaker, Permit
+from app.cache.local_cache import LocalCache
+from app.cache.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Хранилище ключей: redis, sqlite (общий файл для воркеров одной машины) или none
+CONSUMER_DEDUP_BACKEND = os.getenv("CONSUMER_DEDUP_BACKEND", "redis")
+CONSUMER_DEDUP_SQLITE_PATH = os.getenv(
+    "CONSUMER_DEDUP_SQLITE_PATH", "consumer_dedup.db"
+)
+# Сколько помнить обработанные события и сколько держать захват обработки
+CONSUMER_DEDUP_TTL = int(os.getenv("CONSUMER_DEDUP_TTL", "86400"))
+CONSUMER_DEDUP_LEASE = int(os.getenv("CONSUMER_DEDUP_LEASE", "300"))
+CONSUMER_DEDUP_LOCAL_ENTRIES = int(os.getenv("CONSUMER_DEDUP_LOCAL_ENTRIES", "10000"))
+# Пауза перед возвратом в очередь сообщения, ключ которого ещё обрабатывается
+CONSUMER_DEDUP_REQUEUE_DELAY = float(os.getenv("CONSUMER_DEDUP_REQUEUE_DELAY", "1"))
+
+PROCESSING = "processing"
+DONE = "done"
+
+
+class InProgressError(Exception):
+    """Ключ события захвачен обработкой (возможно, упавшего воркера)"""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"Event {key} is being processed")
+        self.key = key
+
+
+def dedup_key(queue: str, entity_id: int, event_id: Optional[str] = None) -> str:
+    """Ключ события; без message_id событие определяется сущностью"""
+    key = f"dedup:{queue}:{entity_id}"
+    return f"{key}:{event_id}" if event_id else key
+
+
+class RedisDedupStore:
+    """Ключи в Redis: SET NX EX - захват, общий для всех воркеров и машин"""
+
+    name = "redis"
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    async def claim(self, key: str, lease: int) -> Optional[str]:
+        """None - ключ захвачен; иначе текущий статус (дубликат)"""
+        if await self.client.set(key, PROCESSING, ex=lease, nx=True):
+            return None
+        state = await self.client.get(key)
+        return state.decode() if isinstance(state, bytes) else state or PROCESSING
+
+    async def complete(self, key: str, ttl: int) -> None:
+        await self.client.set(key, DONE, ex=ttl)
+
+    async def release(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SqliteDedupStore:
+    """Ключи в локальной таблице SQLite: общий файл для воркеров одной машины"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, purge_every: int = 1000) -> None:
+        self._connection = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS consumer_dedup ("
+            "key TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.purge_every = purge_every
+        self._claims = 0
+
+    def _execute(self, sql: str, *params: Any) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection.execute(sql, params)
+
+    def _claim(self, key: str, lease: int) -> Optional[str]:
+        now = time.time()
+        self._claims += 1
+        if self._claims % self.purge_every == 0:
+            self._execute("DELETE FROM consumer_dedup WHERE expires_at <= ?", now)
+        # Вставка или перезахват просроченного ключа одним запросом
+        cursor = self._execute(
+            "INSERT INTO consumer_dedup (key, state, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state = excluded.state, "
+            "expires_at = excluded.expires_at WHERE consumer_dedup.expires_at <= ?",
+            key,
+            PROCESSING,
+            now + lease,
+            now,
+        )
+        if cursor.rowcount:
+            return None
+        row = self._execute(
+            "SELECT state FROM consumer_dedup WHERE key = ?", key
+        ).fetchone()
+        return row[0] if row else PROCESSING
+
+    async def claim(self, key: str, lease: int) -> Optional[str]:
+        return await asyncio.to_thread(self._claim, key, lease)
+
+    async def complete(self, key: str, ttl: int) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE consumer_dedup SET state = ?, expires_at = ? WHERE key = ?",
+            DONE,
+            time.time() + ttl,
+            key,
+        )
+
+    async def release(self, key: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM consumer_dedup WHERE key = ?", key
+        )
+
+    async def close(self) -> None:
+        self._connection.close()
+
+
+class Idempotency:
+    """Запуск обработчика не больше одного раза на ключ события"""
+
+    def __init__(
+        self,
+        store: Any,
+        ttl: int = CONSUMER_DEDUP_TTL,
+        lease: int = CONSUMER_DEDUP_LEASE,
+        local_entries: int = CONSUMER_DEDUP_LOCAL_ENTRIES,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.lease = lease
+        self.local = LocalCache(local_entries, local_entries * len(DONE), ttl)
+        self.breaker = breaker or CircuitBreaker(f"dedup:{store.name}")
+
+        self.processed = 0
+        self.duplicates = 0
+        self.in_progress = 0
+        self.unchecked = 0
+
+    async def _store_call(
+        self, call: Awaitable[Any], permit: Permit = Permit.ALLOWED
+    ) -> Any:
+        try:
+            result = await call
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Отмена задачи - не сбой хранилища
+            self.breaker.release_probe(permit)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def run(
+        self, key: str, handler: Callable[[Any], Awaitable[Any]], message: Any
+    ) -> bool:
+        """True - обработчик выполнен; False - дубликат, обработчик не вызывался.
+
+        InProgressError - ключ захвачен другой обработкой: сообщение нужно
+        вернуть в очередь, а не подтверждать.
+        """
+        if self.local.get(key) is not None:
+            self.duplicates += 1
+            return False
+
+        permit = self.breaker.allow_request()
+        checked = bool(permit)
+        if checked:
+            try:
+                state = await self._store_call(
+                    self.store.claim(key, self.lease), permit
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ [DEDUP] Store unavailable, processing {key}: {e}")
+                checked = False
+            else:
+                if state == DONE:
+                    self.duplicates += 1
+                    self.local.set(key, DONE)
+                    logger.info(f"♻️ [DEDUP] Duplicate {key}, acknowledged")
+                    return False
+                if state is not None:
+                    self.in_progress += 1
+                    raise InProgressError(key)
+        if not checked:
+            self.unchecked += 1
+
+        try:
+            await handler(message)
+        except Exception:
+            if checked:
+                await self._finish(self.store.release(key))
+            raise
+
+        self.processed += 1
+        self.local.set(key, DONE)
+        if checked:
+            await self._finish(self.store.complete(key, self.ttl))
+        return True
+
+    async def _finish(self, call: Awaitable[Any]) -> None:
+        # Ошибку отметки не пробрасываем: обработка уже состоялась
+        try:
+            await self._store_call(call)
+        except Exception as e:
+            logger.warning(f"⚠️ [DEDUP] Failed to update store: {e}")
+
+    async def close(self) -> None:
+        await self.store.close()
+
+    def stats(self) -> dict:
+        return {
+            "store": self.store.name,
+            "processed": self.processed,
+            "duplicates": self.duplicates,
+            "in_progress": self.in_progress,
+            "unchecked": self.unchecked,
+            "local_entries": len(self.local),
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+
+class NoDedup:
+    """Проверка выключена (CONSUMER_DEDUP_BACKEND=none)"""
+
+    async def run(
+        self, key: str, handler: Callable[[Any], Awaitable[Any]], message: Any
+    ) -> bool:
+        await handler(message)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+def create_idempotency(backend: str = CONSUMER_DEDUP_BACKEND) -> Any:
+    if backend == "none":
+        return NoDedup()
+    if backend == "redis":
+        return Idempotency(RedisDedupStore(create_redis_client()))
+    if backend == "sqlite":
+        return Idempotency(SqliteDedupStore(CONSUMER_DEDUP_SQLITE_PATH))
+    raise ValueError(f"Unknown dedup backend: {backend}")
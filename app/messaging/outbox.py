@@ -0,0 +1,283 @@
+"""Transactional outbox: доставка событий из таблицы outbox_events в RabbitMQ.
+
+Репозитории пишут событие в той же транзакции, что и заказ/продукт, поэтому
+событие есть тогда и только тогда, когда изменение зафиксировано. Relay
+забирает неотправленные события пачками (один SELECT), публикует пачку с
+подтверждениями брокера и отмечает отправленные одним UPDATE.
+
+Доставка at-least-once: если процесс упал между публикацией и отметкой,
+пачка уйдёт повторно, поэтому у сообщения стабильный message_id
+"outbox-<id>" для отсева повторов получателем. Порядок событий
+сохраняется, пока брокер доступен; неотправленное событие повторяется
+следующими пачками и может прийти позже более новых.
+
+Недоступность брокера (обрыв соединения, таймаут) останавливает relay с
+растущей паузой. Событие, которое брокер отклоняет само по себе (nack или
+возврат неразмещённого сообщения - PublishError), повторяется, пока не наберёт OUTBOX_MAX_ATTEMPTS отказов, и затем
+откладывается в dead letter (dead_at), не задерживая остальные.
+
+Relay запускается вместе с приложением (OUTBOX_RELAY_ENABLED) или отдельным
+процессом: python -m app.messaging.outbox
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Awaitable, Callable, List, Optional, Tuple
+
+from aio_pika.exceptions import ChannelInvalidStateError
+from litestar import Litestar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AnySession, session_factory
+from app.messaging.events import Event
+from app.messaging.producer import publish_batch
+from app.repositories.outbox_repository import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+# Как часто проверять outbox, если новых событий не было (в процессе
+# приложения relay будят сервисы сразу после записи)
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+# Пауза после ошибки брокера/БД растёт вдвое до этого предела
+OUTBOX_MAX_RETRY_DELAY = float(os.getenv("OUTBOX_MAX_RETRY_DELAY", "30"))
+# После стольких отказов брокера событие откладывается в dead letter
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+# Сколько хранить отправленные события и как часто их чистить
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+OUTBOX_PURGE_INTERVAL = float(os.getenv("OUTBOX_PURGE_INTERVAL", "300"))
+OUTBOX_SHUTDOWN_TIMEOUT = float(os.getenv("OUTBOX_SHUTDOWN_TIMEOUT", "10"))
+
+# Ошибки доступности брокера, а не конкретного события: повторяются без счёта
+BROKER_UNAVAILABLE = (
+    ConnectionError,
+    OSError,
+    asyncio.TimeoutError,
+    ChannelInvalidStateError,
+)
+
+Sender = Callable[[List[Event], List[str]], Awaitable[List[Optional[BaseException]]]]
+
+
+async def publish_persistent(
+    events: List[Event], message_ids: List[str]
+) -> List[Optional[BaseException]]:
+    """Публикация с подтверждением; сообщения переживают перезапуск RabbitMQ"""
+    return await publish_batch(events, message_ids, persist=True)
+
+
+def message_id(event_id: int) -> str:
+    return f"outbox-{event_id}"
+
+
+class OutboxRelay:
+    """Фоновая задача, перекладывающая outbox в RabbitMQ пачками до batch_size"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AnySession],
+        send: Sender = publish_persistent,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = OUTBOX_MAX_RETRY_DELAY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        retention: timedelta = timedelta(hours=OUTBOX_RETENTION_HOURS),
+        purge_interval: float = OUTBOX_PURGE_INTERVAL,
+    ) -> None:
+        self._session_factory = session_factory
+        self._send = send
+        self.repository = OutboxRepository()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+        self._last_purge: Optional[datetime] = None
+
+        self.published = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.batches = 0
+        self.purged = 0
+        self.broker_unavailable = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def notify(self) -> None:
+        """Разбудить relay: в outbox зафиксированы новые события"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    async def _close(session: AnySession) -> None:
+        if isinstance(session, AsyncSession):
+            await session.close()
+        else:
+            session.close()
+
+    async def relay_once(self) -> Tuple[int, int]:
+        """Одна пачка: (сколько событий выбрано, сколько отправлено).
+
+        broker_unavailable после вызова - была ли ошибка доступности брокера.
+        """
+        session = self._session_factory()
+        try:
+            rows = await self.repository.fetch_pending(session, self.batch_size)
+            if not rows:
+                self.broker_unavailable = False
+                return 0, 0
+            try:
+                results = await self._send(
+                    [(row.queue, row.payload) for row in rows],
+                    [message_id(row.id) for row in rows],
+                )
+            except Exception as e:
+                results = [e] * len(rows)
+            sent = [row.id for row, error in zip(rows, results) if error is None]
+            errors = [error for error in results if error is not None]
+            # Отказ по самому событию считается попыткой, недоступность брокера - нет
+            rejected = {
+                row.id: repr(error)
+                for row, error in zip(rows, results)
+                if error is not None and not isinstance(error, BROKER_UNAVAILABLE)
+            }
+            dead = await self.repository.mark_sent(
+                session, sent, rejected, self.max_attempts
+            )
+        finally:
+            await self._close(session)
+
+        self.batches += 1
+        self.published += len(sent)
+        self.failed += len(errors)
+        self.dead_lettered += dead
+        self.broker_unavailable = len(errors) > len(rejected)
+        if errors:
+            self.last_error = repr(errors[0])
+            logger.warning(f"⚠️ [OUTBOX] {len(errors)} events not sent: {errors[0]}")
+        if dead:
+            logger.error(
+                f"☠️ [OUTBOX] {dead} events moved to dead letter after "
+                f"{self.max_attempts} rejections"
+            )
+        return len(rows), len(sent)
+
+    async def purge(self) -> int:
+        session = self._session_factory()
+        try:
+            purged = await self.repository.purge_sent(
+                session, datetime.now() - self.retention
+            )
+        finally:
+            await self._close(session)
+        self.purged += purged
+        return purged
+
+    async def _purge_if_due(self) -> None:
+        now = datetime.now()
+        if self._last_purge and (now - self._last_purge).total_seconds() < (
+            self.purge_interval
+        ):
+            return
+        self._last_purge = now
+        purged = await self.purge()
+        if purged:
+            logger.info(f"🧹 [OUTBOX] Purged {purged} sent events")
+
+    async def _wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def run(self) -> None:
+        """Цикл relay: полные пачки подряд, иначе ожидание notify() или опроса"""
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        delay = self.retry_delay
+        while not self._closing:
+            try:
+                fetched, _ = await self.relay_once()
+                # Отклонённые события не тормозят остальные - пауза нужна,
+                # только когда недоступен сам брокер
+                ok = not self.broker_unavailable
+                await self._purge_if_due()
+            except Exception as e:  # БД недоступна - relay не должен умирать
+                logger.error(f"❌ [OUTBOX] Relay failed: {e}")
+                self.last_error = repr(e)
+                ok = False
+            if not ok:
+                await self._wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+            if fetched < self.batch_size:
+                await self._wait(self.poll_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = OUTBOX_SHUTDOWN_TIMEOUT) -> None:
+        """Дождаться текущей пачки и остановить задачу.
+
+        Неотправленные события остаются в БД и уйдут после перезапуска.
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        self.notify()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error("❌ [OUTBOX] Shutdown timeout, relay cancelled")
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "published": self.published,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "broker_unavailable": self.broker_unavailable,
+            "batches": self.batches,
+            "purged": self.purged,
+            "last_error": self.last_error,
+        }
+
+
+relay = OutboxRelay(session_factory)
+
+
+@asynccontextmanager
+async def outbox_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Relay outbox в процессе приложения (если не вынесен в отдельный процесс)"""
+    if OUTBOX_RELAY_ENABLED:
+        relay.start()
+    app.state.outbox_relay = relay
+    try:
+        yield
+    finally:
+        await relay.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("📤 Outbox relay starting...")
+    try:
+        asyncio.run(relay.run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,168 @@
+"""Версионные миграции схемы без пересоздания таблиц.
+
+Текущая версия хранится в таблице schema_version. Каждая миграция
+идемпотентна (IF NOT EXISTS / checkfirst), поэтому базы, созданные раньше
+через Base.metadata.create_all без таблицы версий, тоже доводятся до
+актуальной схемы без потери данных.
+
+Запуск: python -m app.migrations [--url URL] [--target N]
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateTable
+
+from app.database import is_async_url
+from app.models import Base
+
+logger = logging.getLogger(__name__)
+
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+)
+
+
+def _create_tables(conn: Connection) -> None:
+    """Таблицы моделей без вторичных индексов (исходная схема)"""
+    for table in Base.metadata.sorted_tables:
+        conn.execute(CreateTable(table, if_not_exists=True))
+
+
+def _create_indexes(*names: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection) -> None:
+        indexes = {
+            index.name: index
+            for table in Base.metadata.sorted_tables
+            for index in table.indexes
+        }
+        for name in names:
+            indexes[name].create(conn, checkfirst=True)
+
+    return upgrade
+
+
+def _create_table(name: str, *indexes: str) -> Callable[[Connection], None]:
+    """Новая таблица и её индексы (на свежей базе таблицу уже создала миграция 1)"""
+    create_indexes = _create_indexes(*indexes)
+
+    def upgrade(conn: Connection) -> None:
+        conn.execute(CreateTable(Base.metadata.tables[name], if_not_exists=True))
+        create_indexes(conn)
+
+    return upgrade
+
+
+def _add_columns(name: str, *columns: str) -> Callable[[Connection], None]:
+    """Новые nullable-колонки таблицы (на свежей базе их уже создала миграция 1)"""
+
+    def upgrade(conn: Connection) -> None:
+        table = Base.metadata.tables[name]
+        existing = {column["name"] for column in inspect(conn).get_columns(name)}
+        for column in columns:
+            if column in existing:
+                continue
+            column_type = table.c[column].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {name} ADD COLUMN {column} {column_type}"))
+
+    return upgrade
+
+
+# (версия, описание, функция обновления) - только добавлять в конец
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial tables", _create_tables),
+    (
+        2,
+        "product filter and sort indexes",
+        _create_indexes(
+            "ix_products_name", "ix_products_price", "ix_products_created_at"
+        ),
+    ),
+    (
+        3,
+        "foreign key and order filter indexes",
+        _create_indexes(
+            "ix_addresses_user_id",
+            "ix_orders_user_id",
+            "ix_orders_status_created_at",
+            "ix_order_items_order_id",
+            "ix_order_items_product_id",
+        ),
+    ),
+    (
+        4,
+        "transactional outbox",
+        _create_table("outbox_events", "ix_outbox_events_sent_at_id"),
+    ),
+    (5, "outbox dead letter", _add_columns("outbox_events", "dead_at", "last_error")),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    _version_metadata.create_all(conn)
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def migrate(conn: Connection, target: Optional[int] = None) -> int:
+    """Применяет миграции выше текущей версии вплоть до target (по умолчанию HEAD)"""
+    target = HEAD if target is None else target
+    version = current_version(conn)
+    for number, description, upgrade in MIGRATIONS:
+        if version < number <= target:
+            logger.info(f"🛠️ [MIGRATE] {number}: {description}")
+            upgrade(conn)
+            conn.execute(schema_version.insert().values(version=number))
+            version = number
+    return version
+
+
+async def run_migrations(engine, target: Optional[int] = None) -> int:
+    """Миграции в одной транзакции для синхронного или асинхронного движка"""
+    if isinstance(engine, AsyncEngine):
+        async with engine.begin() as conn:
+            return await conn.run_sync(migrate, target)
+    with engine.begin() as conn:
+        return migrate(conn, target)
+
+
+async def _main(url: str, target: Optional[int]) -> None:
+    engine = create_async_engine(url) if is_async_url(url) else create_engine(url)
+    try:
+        version = await run_migrations(engine, target)
+        print(f"✅ Схема БД на версии {version}")
+    finally:
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    from app.database import DB_URL
+
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--url", default=DB_URL)
+    parser.add_argument("--target", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args.url, args.target))
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """Курсор повреждён или выдан для другой сортировки"""
+
+
+@dataclass
+class CursorPage(Generic[T]):
+    """Страница keyset-пагинации: элементы и курсор следующей страницы"""
+
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, python_type: type) -> Any:
+    if value is None:
+        return None
+    if python_type is Decimal:
+        return Decimal(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Непрозрачный токен: позиция последней строки страницы"""
+    payload = json.dumps(
+        {"s": sort, "v": [_to_json(value) for value in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str, python_types: List[type]) -> List[Any]:
+    """Разбирает токен из encode_cursor и приводит значения к типам колонок"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        if payload["s"] != sort or len(values) != len(python_types):
+            raise InvalidCursorError("Cursor does not match the requested sort")
+        return [_from_json(v, t) for v, t in zip(values, python_types)]
+    except InvalidCursorError:
+        raise
+    except (
+        binascii.Error,
+        UnicodeDecodeError,
+        json.JSONDecodeError,
+        KeyError,
+        TypeError,
+        ValueError,
+        ArithmeticError,
+    ) as e:
+        raise InvalidCursorError("Invalid cursor") from e
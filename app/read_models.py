@@ -0,0 +1,67 @@
+"""Лёгкие модели чтения для списков.
+
+Списки строятся напрямую из строк Core select() только по нужным
+колонкам - без ORM-объектов, identity map и model_validate на каждую
+строку. Имена полей совпадают с колонками моделей, поэтому репозиторий
+выбирает колонки по __struct_fields__, а Litestar сериализует структуры
+msgspec напрямую в тот же JSON, что и схемы *Response.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+import msgspec
+
+
+class UserRead(msgspec.Struct, frozen=True):
+    id: int
+    username: str
+    email: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProductRead(msgspec.Struct, frozen=True):
+    id: int
+    name: str
+    description: Optional[str]
+    price: Decimal
+    stock_quantity: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class OrderItemRead(msgspec.Struct, frozen=True):
+    id: int
+    product_id: int
+    quantity: int
+    price_at_purchase: Decimal
+    total_price: Decimal
+
+
+class OrderRead(msgspec.Struct, frozen=True):
+    id: int
+    user_id: int
+    address_id: int
+    status: str
+    total_amount: Decimal
+    created_at: datetime
+    updated_at: datetime
+    items: List[OrderItemRead]
+
+
+class UserPage(msgspec.Struct, frozen=True):
+    items: List[UserRead]
+    next_cursor: Optional[str] = None
+
+
+class ProductPage(msgspec.Struct, frozen=True):
+    items: List[ProductRead]
+    next_cursor: Optional[str] = None
+
+
+class OrderPage(msgspec.Struct, frozen=True):
+    items: List[OrderRead]
+    next_cursor: Optional[str] = None
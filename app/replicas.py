@@ -0,0 +1,163 @@
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Методы, которые можно обслужить с реплики
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Cookie, закрепляющая клиента за primary после записи (read-your-writes)
+PRIMARY_PIN_COOKIE = "db_primary"
+# Заголовок, которым клиент без cookie может явно запросить чтение с primary
+PRIMARY_HEADER = "x-db-primary"
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+
+
+class Replica:
+    """Реплика для чтения: движок, здоровье и нагрузка"""
+
+    def __init__(self, name: str, bind: Any, breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.bind = bind
+        self.breaker = breaker
+        self.in_flight = 0
+        self.sessions = 0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": self.in_flight,
+            "sessions": self.sessions,
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+
+class ReplicaRouter:
+    """Выбор источника сессии: реплика для чтения или primary.
+
+    Запись, запросы закреплённых за primary клиентов и чтение при
+    недоступности всех реплик идут на primary. Реплика с серией ошибок
+    выключается своим circuit breaker на recovery_timeout секунд.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Tuple[str, Any]] = (),
+        strategy: str = ROUND_ROBIN,
+        failure_threshold: int = 1,
+        recovery_timeout: float = 10.0,
+    ) -> None:
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.strategy = strategy
+        self.replicas: List[Replica] = [
+            Replica(
+                name,
+                bind,
+                CircuitBreaker(
+                    f"db-replica:{name}",
+                    failure_threshold=failure_threshold,
+                    recovery_timeout=recovery_timeout,
+                ),
+            )
+            for name, bind in replicas
+        ]
+        self._counter = itertools.count()
+        self.pinned_reads = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def wants_primary(method: str, cookies: dict, headers: Any) -> bool:
+        if method.upper() not in READ_METHODS:
+            return True
+        return bool(cookies.get(PRIMARY_PIN_COOKIE) or headers.get(PRIMARY_HEADER))
+
+    def _candidates(self) -> List[Replica]:
+        if self.strategy == LEAST_LOADED:
+            return sorted(self.replicas, key=lambda replica: replica.in_flight)
+        start = next(self._counter) % len(self.replicas)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def can_use_replica(self, method: str, cookies: dict, headers: Any) -> bool:
+        """Можно ли обслужить запрос с реплики (чтение без закрепления за primary)"""
+        if not self.replicas:
+            return False
+        if self.wants_primary(method, cookies, headers):
+            if method.upper() in READ_METHODS:
+                self.pinned_reads += 1
+            return False
+        return True
+
+    def acquire(self) -> Optional[Replica]:
+        """Здоровая реплика для чтения или None - тогда читаем с primary"""
+        for replica in self._candidates():
+            if replica.breaker.allow_request():
+                replica.in_flight += 1
+                replica.sessions += 1
+                return replica
+        self.fallbacks += 1
+        logger.warning("⚠️ [DB REPLICA] all replicas unavailable, reading from primary")
+        return None
+
+    def release(self, replica: Replica, ok: bool = True) -> None:
+        replica.in_flight -= 1
+        if ok:
+            replica.breaker.record_success()
+        else:
+            replica.breaker.record_failure()
+
+    def fallback(self, replica: Replica, error: Exception) -> None:
+        """Реплика не отдала соединение - чтение уходит на primary"""
+        self.release(replica, ok=False)
+        self.fallbacks += 1
+        logger.warning(f"⚠️ [DB REPLICA] {replica.name} failed, using primary: {error}")
+
+    def stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "pinned_reads": self.pinned_reads,
+            "fallbacks": self.fallbacks,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+
+def read_your_writes_middleware(
+    max_age: int,
+) -> Callable[[ASGIApp], ASGIApp]:
+    """ASGI middleware: после успешной записи клиент max_age секунд читает с primary.
+
+    Пока реплика догоняет primary, следующий GET того же клиента иначе мог бы
+    не увидеть только что созданные или изменённые данные.
+    """
+
+    def middleware(app: ASGIApp) -> ASGIApp:
+        async def wrapped(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope["method"] in READ_METHODS:
+                await app(scope, receive, send)
+                return
+
+            async def send_with_pin(message: Message) -> None:
+                if message["type"] == "http.response.start" and (
+                    message["status"] < 400
+                ):
+                    cookie = (
+                        f"{PRIMARY_PIN_COOKIE}=1; Max-Age={max_age}; Path=/; "
+                        "HttpOnly; SameSite=Lax"
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"set-cookie", cookie.encode()),
+                    ]
+                await send(message)
+
+            await app(scope, receive, send_with_pin)
+
+        return wrapped
+
+    return middleware
@@ -1,5 +1,6 @@
 from .order_repository import OrderRepository
+from .outbox_repository import OutboxRepository
 from .product_repository import ProductRepository
 from .user_repository import UserRepository
 
-__all__ = ["UserRepository", "ProductRepository", "OrderRepository"]
+__all__ = ["UserRepository", "ProductRepository", "OrderRepository", "OutboxRepository"]
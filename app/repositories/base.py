@@ -0,0 +1,207 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Select, and_, insert, or_, select, update
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AnySession
+from app.messaging.events import Event
+from app.models import OutboxEvent
+from app.pagination import CursorPage, decode_cursor, encode_cursor
+
+
+class BaseRepository:
+    """Общие операции над сессией для Session и AsyncSession.
+
+    Запросы строятся через select()/update()/delete(), поэтому один и тот же
+    код репозитория работает и с синхронным, и с асинхронным движком.
+    """
+
+    model: Any
+    # Структура app.read_models для списков (поля = имена колонок модели)
+    read_model: Any = None
+    # Колонки, по которым разрешена keyset-пагинация (ключ - имя сортировки)
+    sort_columns: Dict[str, Any] = {}
+
+    @staticmethod
+    async def _execute(session: AnySession, statement: Any, *args) -> Result:
+        if isinstance(session, AsyncSession):
+            return await session.execute(statement, *args)
+        return session.execute(statement, *args)
+
+    @staticmethod
+    async def _flush(session: AnySession) -> None:
+        if isinstance(session, AsyncSession):
+            await session.flush()
+        else:
+            session.flush()
+
+    @staticmethod
+    async def _commit(session: AnySession) -> None:
+        if isinstance(session, AsyncSession):
+            await session.commit()
+        else:
+            session.commit()
+
+    @staticmethod
+    async def _rollback(session: AnySession) -> None:
+        if isinstance(session, AsyncSession):
+            await session.rollback()
+        else:
+            session.rollback()
+
+    @staticmethod
+    async def _delete(session: AnySession, instance: Any) -> None:
+        if isinstance(session, AsyncSession):
+            await session.delete(instance)
+        else:
+            session.delete(instance)
+
+    async def _insert_returning(
+        self, session: AnySession, values: dict, commit: bool = True
+    ) -> Any:
+        """INSERT ... RETURNING: строка с серверными значениями без refresh()"""
+        result = await self._execute(
+            session, insert(self.model).values(**values).returning(self.model)
+        )
+        instance = result.scalar_one()
+        if commit:
+            await self._commit(session)
+        return instance
+
+    async def _add_events(self, session: AnySession, events: List[Event]) -> None:
+        """Запись событий в outbox в текущей транзакции (коммитит вызывающий).
+
+        Событие уходит в RabbitMQ, только если транзакция изменения
+        зафиксирована, и не теряется, если брокер недоступен.
+        """
+        if events:
+            await self._execute(
+                session,
+                insert(OutboxEvent),
+                [{"queue": queue, "payload": message} for queue, message in events],
+            )
+
+    async def _update_returning(
+        self, session: AnySession, instance_id: int, values: dict, *options
+    ) -> Optional[Any]:
+        """UPDATE ... RETURNING: изменение и чтение результата одним запросом.
+
+        Вместо SELECT + UPDATE + SELECT (refresh) - один запрос; None, если
+        строки с таким id нет. Пустые изменения строку не трогают.
+        """
+        if values:
+            statement = (
+                update(self.model)
+                .where(self.model.id == instance_id)
+                .values(**values)
+                .returning(self.model)
+            )
+        else:
+            statement = select(self.model).where(self.model.id == instance_id)
+        result = await self._execute(session, statement.options(*options))
+        instance = result.scalars().first()
+        if values:
+            await self._commit(session)
+        return instance
+
+    async def insert_many(self, session: AnySession, rows: List[dict]) -> int:
+        """Вставка пачки строк одним executemany и одной транзакцией.
+
+        При нарушении ограничений транзакция откатывается, IntegrityError
+        пробрасывается вызывающему.
+        """
+        if not rows:
+            return 0
+        try:
+            await self._execute(session, insert(self.model), rows)
+            await self._commit(session)
+        except IntegrityError:
+            await self._rollback(session)
+            raise
+        return len(rows)
+
+    def _select_read(self) -> Select:
+        """SELECT только колонок модели чтения - без ORM-сущностей"""
+        columns = self.model.__table__.c
+        return select(
+            *(
+                getattr(self.model, name)
+                for name in self.read_model.__struct_fields__
+                if name in columns
+            )
+        )
+
+    async def _to_read_models(self, session: AnySession, rows: List[Any]) -> List[Any]:
+        """Строки _select_read() -> неизменяемые структуры модели чтения"""
+        return [self.read_model(*row) for row in rows]
+
+    async def _read_list(self, session: AnySession, query: Select) -> List[Any]:
+        result = await self._execute(session, query)
+        return await self._to_read_models(session, result.all())
+
+    def _sort_spec(self, sort: str):
+        """Колонка сортировки и направление: "-price" - по убыванию цены"""
+        descending = sort.startswith("-")
+        return self.sort_columns[sort.lstrip("-")], descending
+
+    def _order_by(self, query: Select, sort: str = "id") -> Select:
+        sort_column, descending = self._sort_spec(sort)
+        columns = [sort_column]
+        if sort_column is not self.model.id:
+            columns.append(self.model.id)
+        if descending:
+            columns = [column.desc() for column in columns]
+        return query.order_by(*columns)
+
+    async def _keyset_page(
+        self,
+        session: AnySession,
+        query: Select,
+        count: int,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+    ) -> CursorPage:
+        """Keyset-пагинация: WHERE (sort, id) > (последняя строка) ORDER BY sort, id.
+
+        query строится от _select_read(), элементы страницы - модели чтения.
+
+        В отличие от OFFSET стоимость страницы не растёт с её номером,
+        а id в ключе делает порядок детерминированным при равных значениях.
+        Для сортировки по убыванию сравнения и ORDER BY разворачиваются.
+        """
+        id_column = self.model.id
+        sort_column, descending = self._sort_spec(sort)
+        columns = [id_column] if sort_column is id_column else [sort_column, id_column]
+
+        if cursor:
+            values = decode_cursor(
+                cursor, sort, [column.type.python_type for column in columns]
+            )
+
+            def after(column, value):
+                return column < value if descending else column > value
+
+            if len(columns) == 1:
+                query = query.where(after(id_column, values[0]))
+            else:
+                query = query.where(
+                    or_(
+                        after(sort_column, values[0]),
+                        and_(sort_column == values[0], after(id_column, values[1])),
+                    )
+                )
+
+        query = self._order_by(query, sort).limit(count + 1)
+        rows = (await self._execute(session, query)).all()
+
+        next_cursor = None
+        if len(rows) > count:
+            rows = rows[:count]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                sort, [getattr(last, column.key) for column in columns]
+            )
+        items = await self._to_read_models(session, rows)
+        return CursorPage(items=items, next_cursor=next_cursor)
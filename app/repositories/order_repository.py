@@ -1,104 +1,348 @@
+from collections import defaultdict
+from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Row, bindparam, insert, select, update
+from sqlalchemy.orm import selectinload
 
+from app.database import AnySession
+from app.messaging.events import order_created
 from app.models import Order, OrderItem, Product
+from app.pagination import CursorPage
+from app.read_models import OrderItemRead, OrderRead
+from app.repositories.base import BaseRepository
 from app.schemas import OrderCreate, OrderUpdate
 
 
-class OrderRepository:
+class OrderRepository(BaseRepository):
     def __init__(self):
         self.model = Order
+        self.read_model = OrderRead
+        self.sort_columns = {"id": Order.id}
 
-    async def get(self, session: Session, order_id: int) -> Optional[Order]:
-        return (
-            session.query(self.model)
-            .options(selectinload(Order.items).selectinload(OrderItem.product))
-            .filter(self.model.id == order_id)
-            .first()
+    def _select_with_items(self):
+        # Продукты позиций в ответ не входят - грузим только сами позиции
+        return select(self.model).options(selectinload(Order.items))
+
+    async def get(self, session: AnySession, order_id: int) -> Optional[Order]:
+        # populate_existing - чтобы после commit связи items были загружены заново,
+        # а не подгружались лениво (в AsyncSession ленивая загрузка невозможна)
+        query = (
+            self._select_with_items()
+            .where(self.model.id == order_id)
+            .execution_options(populate_existing=True)
+        )
+        result = await self._execute(session, query)
+        return result.scalars().first()
+
+    async def get_owner_and_products(
+        self, session: AnySession, order_id: int
+    ) -> Optional[Tuple[int, List[int]]]:
+        """Владелец заказа и продукты его позиций (для инвалидации кеша)"""
+        result = await self._execute(
+            session,
+            select(self.model.user_id, OrderItem.product_id)
+            .outerjoin(OrderItem, OrderItem.order_id == self.model.id)
+            .where(self.model.id == order_id),
         )
+        rows = result.all()
+        if not rows:
+            return None
+        return rows[0].user_id, [row.product_id for row in rows if row.product_id]
 
     async def list(
         self,
-        session: Session,
+        session: AnySession,
         count: int = 10,
         page: int = 1,
         user_id: Optional[int] = None,
-    ) -> List[Order]:
-        query = session.query(self.model).options(
-            selectinload(Order.items).selectinload(OrderItem.product)
-        )
+        sort: str = "id",
+    ) -> List[OrderRead]:
+        """Legacy-пагинация по номеру страницы (OFFSET); "-id" - от новых к старым"""
+        query = self._select_read()
+
+        if user_id:
+            query = query.where(self.model.user_id == user_id)
+
+        query = self._order_by(query, sort).offset((page - 1) * count).limit(count)
+        return await self._read_list(session, query)
 
+    async def get_page(
+        self,
+        session: AnySession,
+        count: int = 10,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        sort: str = "id",
+    ) -> CursorPage:
+        """Keyset-пагинация по непрозрачному курсору (экспорт заказов и т.п.)"""
+        query = self._select_read()
         if user_id:
-            query = query.filter(self.model.user_id == user_id)
+            query = query.where(self.model.user_id == user_id)
+        return await self._keyset_page(session, query, count, cursor, sort)
+
+    async def _to_read_models(
+        self, session: AnySession, rows: List[Row]
+    ) -> List[OrderRead]:
+        """Позиции всех заказов страницы одним запросом WHERE order_id IN (...)"""
+        if not rows:
+            return []
+        item_columns = [
+            getattr(OrderItem, name) for name in OrderItemRead.__struct_fields__
+        ]
+        result = await self._execute(
+            session,
+            select(OrderItem.order_id, *item_columns)
+            .where(OrderItem.order_id.in_([row.id for row in rows]))
+            .order_by(OrderItem.id),
+        )
+        items: Dict[int, List[OrderItemRead]] = defaultdict(list)
+        for order_id, *values in result:
+            items[order_id].append(OrderItemRead(*values))
+        return [OrderRead(*row, items=items[row.id]) for row in rows]
+
+    async def _load_products(
+        self, session: AnySession, product_ids: Iterable[int]
+    ) -> Dict[int, Row]:
+        """Цены и остатки всех продуктов заказа одним запросом WHERE id IN (...)"""
+        result = await self._execute(
+            session,
+            select(
+                Product.id, Product.name, Product.price, Product.stock_quantity
+            ).where(Product.id.in_(set(product_ids))),
+        )
+        return {row.id: row for row in result}
+
+    async def _change_stock(
+        self, session: AnySession, quantities: Dict[int, int], sign: int
+    ) -> int:
+        """Атомарно меняет остатки; при списании - только если остатка хватает.
+
+        Возвращает число обновлённых строк: если оно меньше числа продуктов,
+        какой-то из них уже распродан (в т.ч. конкурентным заказом).
+        """
+        if not quantities:
+            return 0
+        products = Product.__table__
+        statement = update(products).where(products.c.id == bindparam("pid"))
+        if sign < 0:
+            statement = statement.where(products.c.stock_quantity >= bindparam("qty"))
+        statement = statement.values(
+            stock_quantity=products.c.stock_quantity + sign * bindparam("qty"),
+            updated_at=datetime.now(),
+        )
+        params = [{"pid": pid, "qty": qty} for pid, qty in quantities.items()]
+        if session.get_bind().dialect.supports_sane_multi_rowcount:
+            result = await self._execute(session, statement, params)
+            return result.rowcount
+        updated = 0
+        for param in params:
+            result = await self._execute(session, statement, param)
+            updated += result.rowcount
+        return updated
 
-        return query.offset((page - 1) * count).limit(count).all()
+    async def create(self, session: AnySession, order_data: OrderCreate) -> Order:
+        quantities: Dict[int, int] = defaultdict(int)
+        for item_data in order_data.items:
+            quantities[item_data.product_id] += item_data.quantity
+
+        products = await self._load_products(session, quantities)
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if not product:
+                raise ValueError(f"Product with ID {product_id} not found")
+            if product.stock_quantity < quantity:
+                raise ValueError(f"Insufficient stock for {product.name}")
+
+        items = []
+        total_amount = Decimal("0")
+        for item_data in order_data.items:
+            price = products[item_data.product_id].price
+            item_total = price * item_data.quantity
+            items.append(
+                {
+                    "product_id": item_data.product_id,
+                    "quantity": item_data.quantity,
+                    "price_at_purchase": price,
+                    "total_price": item_total,
+                }
+            )
+            total_amount += item_total
 
-    async def create(self, session: Session, order_data: OrderCreate) -> Order:
         order = self.model(
             user_id=order_data.user_id,
             address_id=order_data.address_id,
             status=order_data.status or "pending",
+            total_amount=total_amount,
         )
         session.add(order)
-        session.flush()  # Получаем ID без коммита
+        await self._flush(session)  # Получаем ID без коммита
 
-        total_amount = Decimal("0")
+        # Списание остатков условным UPDATE: без read-modify-write и overselling
+        if await self._change_stock(session, quantities, -1) < len(quantities):
+            await self._rollback(session)
+            raise ValueError("Insufficient stock for one of the products")
 
-        for item_data in order_data.items:
-            product = (
-                session.query(Product)
-                .filter(Product.id == item_data.product_id)
-                .first()
+        for item in items:
+            item["order_id"] = order.id
+        await self._execute(session, insert(OrderItem), items)
+        await self._add_events(
+            session,
+            [order_created(order.id, order.user_id, total_amount, order.status)],
+        )
+
+        await self._commit(session)
+        return await self.get(session, order.id)
+
+    async def create_many(
+        self, session: AnySession, orders: List[OrderCreate], chunk_size: int = 500
+    ) -> List[Union[Order, ValueError]]:
+        """Пакетное создание заказов.
+
+        Продукты всех заказов читаются одним запросом, остатки резервируются
+        по снимку в памяти по порядку заказов. Каждый чанк - одна транзакция:
+        INSERT заказов с RETURNING id, один условный UPDATE остатков и один
+        INSERT позиций. Результат выровнен по входному списку: Order или
+        ValueError с причиной отказа.
+        """
+        results: List[Union[Order, ValueError, None]] = [None] * len(orders)
+        products = await self._load_products(
+            session,
+            (item.product_id for order_data in orders for item in order_data.items),
+        )
+        stock = {pid: product.stock_quantity for pid, product in products.items()}
+
+        for start in range(0, len(orders), chunk_size):
+            chunk = list(enumerate(orders[start : start + chunk_size], start))
+            accepted = []
+            reserved: Dict[int, int] = defaultdict(int)
+
+            for index, order_data in chunk:
+                quantities: Dict[int, int] = defaultdict(int)
+                for item in order_data.items:
+                    quantities[item.product_id] += item.quantity
+                error = self._check_items(order_data, quantities, products, stock)
+                if error:
+                    results[index] = ValueError(error)
+                    continue
+                for pid, quantity in quantities.items():
+                    stock[pid] -= quantity
+                    reserved[pid] += quantity
+                accepted.append((index, order_data))
+
+            if not accepted:
+                continue
+
+            if await self._change_stock(session, reserved, -1) < len(reserved):
+                # Остатки изменил конкурентный заказ - отклоняем чанк целиком
+                await self._rollback(session)
+                for index, _ in accepted:
+                    results[index] = ValueError(
+                        "Insufficient stock (changed concurrently), retry the order"
+                    )
+                # Снимок остатков устарел - перечитываем для следующих чанков
+                products = await self._load_products(session, products.keys())
+                stock = {pid: p.stock_quantity for pid, p in products.items()}
+                continue
+
+            order_rows = []
+            for _, order_data in accepted:
+                order_rows.append(
+                    {
+                        "user_id": order_data.user_id,
+                        "address_id": order_data.address_id,
+                        "status": order_data.status or "pending",
+                        "total_amount": sum(
+                            (
+                                products[item.product_id].price * item.quantity
+                                for item in order_data.items
+                            ),
+                            Decimal("0"),
+                        ),
+                    }
+                )
+            result = await self._execute(
+                session,
+                insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                order_rows,
             )
-            if not product:
-                raise ValueError(f"Product with ID {item_data.product_id} not found")
+            order_ids = list(result.scalars().all())
 
-            if product.stock_quantity < item_data.quantity:
-                raise ValueError(f"Insufficient stock for {product.name}")
+            item_rows = []
+            for order_id, (_, order_data) in zip(order_ids, accepted):
+                for item in order_data.items:
+                    price = products[item.product_id].price
+                    item_rows.append(
+                        {
+                            "order_id": order_id,
+                            "product_id": item.product_id,
+                            "quantity": item.quantity,
+                            "price_at_purchase": price,
+                            "total_price": price * item.quantity,
+                        }
+                    )
+            await self._execute(session, insert(OrderItem), item_rows)
+            await self._add_events(
+                session,
+                [
+                    order_created(
+                        order_id, row["user_id"], row["total_amount"], row["status"]
+                    )
+                    for order_id, row in zip(order_ids, order_rows)
+                ],
+            )
+            await self._commit(session)
 
-            item_total = product.price * item_data.quantity
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data.product_id,
-                quantity=item_data.quantity,
-                price_at_purchase=product.price,
-                total_price=item_total,
+            created = await self._execute(
+                session,
+                select(Order)
+                .options(selectinload(Order.items))
+                .where(Order.id.in_(order_ids)),
             )
-            session.add(order_item)
+            by_id = {order.id: order for order in created.scalars().all()}
+            for order_id, (index, _) in zip(order_ids, accepted):
+                results[index] = by_id[order_id]
 
-            total_amount += item_total
-            product.stock_quantity -= item_data.quantity
+        return results
 
-        order.total_amount = total_amount
-        session.commit()
-        session.refresh(order)
-        return order
+    @staticmethod
+    def _check_items(
+        order_data: OrderCreate,
+        quantities: Dict[int, int],
+        products: Dict[int, Row],
+        stock: Dict[int, int],
+    ) -> Optional[str]:
+        if not order_data.items:
+            return "Order items cannot be empty"
+        for product_id, quantity in quantities.items():
+            if product_id not in products:
+                return f"Product with ID {product_id} not found"
+            if stock[product_id] < quantity:
+                return f"Insufficient stock for {products[product_id].name}"
+        return None
 
     async def update_status(
-        self, session: Session, order_id: int, status: str
+        self, session: AnySession, order_id: int, status: str
     ) -> Optional[Order]:
-        order = await self.get(session, order_id)
-        if not order:
-            return None
-        order.status = status
-        session.commit()
-        session.refresh(order)
-        return order
+        # Для ответа нужны позиции заказа, но не продукты - один selectinload
+        return await self._update_returning(
+            session,
+            order_id,
+            {"status": status},
+            selectinload(Order.items),
+        )
 
-    async def delete(self, session: Session, order_id: int) -> bool:
+    async def delete(self, session: AnySession, order_id: int) -> bool:
         order = await self.get(session, order_id)
         if not order:
             return False
 
+        quantities: Dict[int, int] = defaultdict(int)
         for item in order.items:
-            product = (
-                session.query(Product).filter(Product.id == item.product_id).first()
-            )
-            if product:
-                product.stock_quantity += item.quantity
+            quantities[item.product_id] += item.quantity
+        await self._change_stock(session, quantities, +1)
 
-        session.delete(order)
-        session.commit()
+        await self._delete(session, order)
+        await self._commit(session)
         return True
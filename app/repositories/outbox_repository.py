@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Iterable, List, Mapping, Optional
+
+from sqlalchemy import Row, bindparam, delete, select, update
+
+from app.database import AnySession
+from app.models import OutboxEvent
+from app.repositories.base import BaseRepository
+
+
+class OutboxRepository(BaseRepository):
+    """Чтение и отметка событий outbox пачками для app.messaging.outbox"""
+
+    def __init__(self):
+        self.model = OutboxEvent
+
+    async def fetch_pending(self, session: AnySession, limit: int) -> List[Row]:
+        """Самые старые неотправленные события одним запросом.
+
+        Отложенные в dead letter (dead_at) не выбираются. FOR UPDATE SKIP
+        LOCKED (там, где СУБД его поддерживает) позволяет нескольким relay
+        разбирать outbox параллельно без двойной отправки.
+        """
+        result = await self._execute(
+            session,
+            select(self.model.id, self.model.queue, self.model.payload)
+            .where(self.model.sent_at.is_(None), self.model.dead_at.is_(None))
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True),
+        )
+        return list(result.all())
+
+    async def mark_sent(
+        self,
+        session: AnySession,
+        sent_ids: Iterable[int],
+        rejected: Optional[Mapping[int, str]] = None,
+        max_attempts: int = 0,
+    ) -> int:
+        """Отметка пачки: отправленные - sent_at, отклонённые - attempts + 1.
+
+        rejected - id события и текст ошибки. Событие, отклонённое
+        max_attempts раз (0 - без предела), получает dead_at и больше не
+        выбирается; вернуть его в отправку - сбросить dead_at и attempts.
+        Возвращает число событий, отложенных в dead letter.
+        """
+        sent_ids = list(sent_ids)
+        now = datetime.now()
+        if sent_ids:
+            await self._execute(
+                session,
+                update(self.model)
+                .where(self.model.id.in_(sent_ids))
+                .values(sent_at=now),
+            )
+        dead = 0
+        if rejected:
+            events = self.model.__table__
+            await self._execute(
+                session,
+                update(events)
+                .where(events.c.id == bindparam("event_id"))
+                .values(attempts=events.c.attempts + 1, last_error=bindparam("error")),
+                [
+                    {"event_id": event_id, "error": error[:500]}
+                    for event_id, error in rejected.items()
+                ],
+            )
+            if max_attempts > 0:
+                result = await self._execute(
+                    session,
+                    update(self.model)
+                    .where(
+                        self.model.id.in_(list(rejected)),
+                        self.model.attempts >= max_attempts,
+                    )
+                    .values(dead_at=now),
+                )
+                dead = result.rowcount
+        await self._commit(session)
+        return dead
+
+    async def purge_sent(self, session: AnySession, before: datetime) -> int:
+        """Удаление событий, отправленных раньше before"""
+        result = await self._execute(
+            session,
+            delete(self.model).where(self.model.sent_at < before),
+        )
+        await self._commit(session)
+        return result.rowcount
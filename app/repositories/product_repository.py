@@ -1,76 +1,132 @@
 from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 
-from app.models import Product, OrderItem
-from app.schemas import ProductCreate, ProductUpdate
+from app.database import AnySession
+from app.messaging.events import product_created
+from app.models import OrderItem, Product
+from app.pagination import CursorPage
+from app.read_models import ProductRead
+from app.repositories.base import BaseRepository
+from app.schemas import ProductCreate, ProductFilter, ProductUpdate
 
 
-class ProductRepository:
+class ProductRepository(BaseRepository):
     def __init__(self):
         self.model = Product
+        self.read_model = ProductRead
+        self.sort_columns = {
+            "id": Product.id,
+            "price": Product.price,
+            "created_at": Product.created_at,
+        }
 
-    async def get_by_id(self, session: Session, product_id: int) -> Optional[Product]:
-        return session.query(self.model).filter(self.model.id == product_id).first()
+    async def get_by_id(
+        self, session: AnySession, product_id: int
+    ) -> Optional[Product]:
+        result = await self._execute(
+            session, select(self.model).where(self.model.id == product_id)
+        )
+        return result.scalars().first()
 
-    async def get_list(
-        self, session: Session, count: int = 10, page: int = 1, **filters
-    ) -> List[Product]:
-        query = session.query(self.model)
-        for attr, value in filters.items():
+    def _filtered(self, filters: Optional[ProductFilter] = None):
+        query = self._select_read()
+        if filters is None:
+            return query
+        conditions = [
+            (filters.name, lambda v: self.model.name == v),
+            (filters.min_price, lambda v: self.model.price >= v),
+            (filters.max_price, lambda v: self.model.price <= v),
+            (filters.min_stock, lambda v: self.model.stock_quantity >= v),
+            (filters.max_stock, lambda v: self.model.stock_quantity <= v),
+            (filters.created_from, lambda v: self.model.created_at >= v),
+            (filters.created_to, lambda v: self.model.created_at <= v),
+        ]
+        for value, condition in conditions:
             if value is not None:
-                query = query.filter(getattr(self.model, attr) == value)
-        return query.offset((page - 1) * count).limit(count).all()
+                query = query.where(condition(value))
+        return query
+
+    async def get_list(
+        self,
+        session: AnySession,
+        count: int = 10,
+        page: int = 1,
+        filters: Optional[ProductFilter] = None,
+    ) -> List[ProductRead]:
+        """Legacy-пагинация по номеру страницы (OFFSET)"""
+        sort = filters.sort if filters else "id"
+        query = (
+            self._order_by(self._filtered(filters), sort)
+            .offset((page - 1) * count)
+            .limit(count)
+        )
+        return await self._read_list(session, query)
+
+    async def get_page(
+        self,
+        session: AnySession,
+        count: int = 10,
+        cursor: Optional[str] = None,
+        filters: Optional[ProductFilter] = None,
+    ) -> CursorPage:
+        """Keyset-пагинация по непрозрачному курсору"""
+        sort = filters.sort if filters else "id"
+        return await self._keyset_page(
+            session, self._filtered(filters), count, cursor, sort
+        )
 
-    async def create(self, session: Session, product_data: ProductCreate) -> Product:
-        product = self.model(
-            name=product_data.name,
-            description=product_data.description,
-            price=product_data.price,
-            stock_quantity=product_data.stock_quantity or 0,
+    async def create(self, session: AnySession, product_data: ProductCreate) -> Product:
+        product = await self._insert_returning(
+            session,
+            {
+                "name": product_data.name,
+                "description": product_data.description,
+                "price": product_data.price,
+                "stock_quantity": product_data.stock_quantity or 0,
+            },
+            commit=False,
         )
-        session.add(product)
-        session.commit()
-        session.refresh(product)
+        await self._add_events(
+            session, [product_created(product.id, product.name, product.price)]
+        )
+        await self._commit(session)
         return product
 
     async def update(
-        self, session: Session, product_id: int, product_data: ProductUpdate
+        self, session: AnySession, product_id: int, product_data: ProductUpdate
     ) -> Optional[Product]:
-        product = session.query(self.model).filter(self.model.id == product_id).first()
-        if not product:
-            return None
-        data = product_data.model_dump(exclude_unset=True)
-        for k, v in data.items():
-            setattr(product, k, v)
-        session.commit()
-        session.refresh(product)
-        return product
+        return await self._update_returning(
+            session, product_id, product_data.model_dump(exclude_unset=True)
+        )
 
-    async def delete(self, session: Session, product_id: int) -> bool:
-        product = session.query(self.model).filter(self.model.id == product_id).first()
+    async def delete(self, session: AnySession, product_id: int) -> bool:
+        product = await self.get_by_id(session, product_id)
         if not product:
             return False
 
-        order_items = (
-            session.query(OrderItem).filter(OrderItem.product_id == product_id).count()
+        result = await self._execute(
+            session,
+            select(func.count())
+            .select_from(OrderItem)
+            .where(OrderItem.product_id == product_id),
         )
+        order_items = result.scalar_one()
         if order_items > 0:
             raise ValueError(
                 f"Cannot delete product {product_id} - it has {order_items} order items"
             )
 
-        session.delete(product)
-        session.commit()
+        await self._delete(session, product)
+        await self._commit(session)
         return True
 
     async def update_stock(
-        self, session: Session, product_id: int, quantity_change: int
+        self, session: AnySession, product_id: int, quantity_change: int
     ) -> Optional[Product]:
-        product = session.query(self.model).filter(self.model.id == product_id).first()
-        if not product:
-            return None
-        product.stock_quantity += quantity_change
-        session.commit()
-        session.refresh(product)
-        return product
+        # Инкремент на стороне БД - без гонки read-modify-write
+        return await self._update_returning(
+            session,
+            product_id,
+            {"stock_quantity": self.model.stock_quantity + quantity_change},
+        )
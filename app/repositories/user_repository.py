@@ -1,52 +1,83 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
+from app.database import AnySession
 from app.models import User
+from app.pagination import CursorPage
+from app.read_models import UserRead
+from app.repositories.base import BaseRepository
 from app.schemas import UserCreate, UserUpdate
 
 
-class UserRepository:
+class UserRepository(BaseRepository):
     def __init__(self):
         self.model = User
+        self.read_model = UserRead
+        self.sort_columns = {"id": User.id}
 
-    async def get_by_id(self, session: Session, user_id: int) -> Optional[User]:
-        return session.query(self.model).filter(self.model.id == user_id).first()
+    async def get_by_id(self, session: AnySession, user_id: int) -> Optional[User]:
+        result = await self._execute(
+            session, select(self.model).where(self.model.id == user_id)
+        )
+        return result.scalars().first()
 
-    async def get_by_filter(
-        self, session: Session, count: int = 10, page: int = 1, **kwargs
-    ) -> List[User]:
-        query = session.query(self.model)
+    async def get_existing_ids(
+        self, session: AnySession, user_ids: Iterable[int]
+    ) -> Set[int]:
+        """Какие из переданных ID существуют - одним запросом"""
+        result = await self._execute(
+            session, select(self.model.id).where(self.model.id.in_(set(user_ids)))
+        )
+        return set(result.scalars().all())
+
+    def _filtered(self, **kwargs):
+        query = self._select_read()
         for attr, value in kwargs.items():
-            query = query.filter(getattr(self.model, attr) == value)
-        return query.offset((page - 1) * count).limit(count).all()
-
-    async def create(self, session: Session, user_data: UserCreate) -> User:
-        user = self.model(
-            username=user_data.username,
-            email=user_data.email,
-            description=user_data.description or "",
+            query = query.where(getattr(self.model, attr) == value)
+        return query
+
+    async def get_by_filter(
+        self, session: AnySession, count: int = 10, page: int = 1, **kwargs
+    ) -> List[UserRead]:
+        """Legacy-пагинация по номеру страницы (OFFSET)"""
+        query = (
+            self._filtered(**kwargs)
+            .order_by(self.model.id)
+            .offset((page - 1) * count)
+            .limit(count)
+        )
+        return await self._read_list(session, query)
+
+    async def get_page(
+        self,
+        session: AnySession,
+        count: int = 10,
+        cursor: Optional[str] = None,
+        **kwargs,
+    ) -> CursorPage:
+        """Keyset-пагинация по непрозрачному курсору"""
+        return await self._keyset_page(session, self._filtered(**kwargs), count, cursor)
+
+    async def create(self, session: AnySession, user_data: UserCreate) -> User:
+        return await self._insert_returning(
+            session,
+            {
+                "username": user_data.username,
+                "email": user_data.email,
+                "description": user_data.description or "",
+            },
         )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        return user
 
     async def update(
-        self, session: Session, user_id: int, user_data: UserUpdate
+        self, session: AnySession, user_id: int, user_data: UserUpdate
     ) -> Optional[User]:
-        user = session.query(self.model).filter(self.model.id == user_id).first()
-        if not user:
-            return None
-        data = user_data.model_dump(exclude_unset=True)
-        for k, v in data.items():
-            setattr(user, k, v)
-        session.commit()
-        session.refresh(user)
-        return user
-
-    async def delete(self, session: Session, user_id: int) -> None:
-        user = session.query(self.model).filter(self.model.id == user_id).first()
+        return await self._update_returning(
+            session, user_id, user_data.model_dump(exclude_unset=True)
+        )
+
+    async def delete(self, session: AnySession, user_id: int) -> None:
+        user = await self.get_by_id(session, user_id)
         if user:
-            session.delete(user)
-            session.commit()
+            await self._delete(session, user)
+            await self._commit(session)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -74,6 +74,25 @@ class ProductResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+ProductSort = Literal["id", "price", "-price", "created_at", "-created_at"]
+
+
+class ProductFilter(BaseModel):
+    """Фильтры и сортировка списка продуктов (применяются в SQL)"""
+
+    name: Optional[str] = None
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    min_stock: Optional[int] = None
+    max_stock: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    sort: ProductSort = "id"
+
+
+OrderSort = Literal["id", "-id"]
+
+
 # Order Item Schemas
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -115,6 +134,22 @@ class OrderResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class OrderBatchItemResult(BaseModel):
+    index: int
+    order: Optional[OrderResponse] = None
+    error: Optional[str] = None
+
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchItemResult]
+
+
 class AddressCreate(BaseModel):
     user_id: int
     street: str = Field(..., max_length=200)
@@ -140,6 +175,19 @@ class AddressResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    total: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+
 class OrderMessage(BaseModel):
     order_id: int
     user_id: int
@@ -1,5 +1,6 @@
+from .import_service import ImportService
 from .order_service import OrderService
 from .product_service import ProductService
 from .user_service import UserService
 
-__all__ = ["UserService", "OrderService", "ProductService"]
+__all__ = ["UserService", "OrderService", "ProductService", "ImportService"]
@@ -0,0 +1,273 @@
+import csv
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.cache.keys import CATALOG_GENERATION_KEY
+from app.cache.redis_client import RedisCache
+from app.database import AnySession
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.schemas import ImportResult, ImportRowError, ProductCreate, UserCreate
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк вставляется одним executemany и одной транзакцией
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Сколько ошибок возвращаем в ответе (остальные только считаем)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+# Предел длины строки NDJSON и записи CSV: длиннее - ошибка строки, а не буфер
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+
+
+def _decode_line(raw: bytes) -> Tuple[str, Optional[str]]:
+    try:
+        return raw.decode("utf-8").rstrip("\r"), None
+    except UnicodeDecodeError as e:
+        text = raw.decode("utf-8", errors="replace").rstrip("\r")
+        return text, f"Invalid UTF-8 at byte {e.start}"
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """(строка, ошибка декодирования или None) из потока байт.
+
+    В памяти не больше одного сетевого чанка и одной незавершённой строки.
+    Байт перевода строки не встречается внутри многобайтовых символов UTF-8,
+    поэтому поток режется по нему до декодирования, а битая
+    последовательность портит только свою строку, а не весь импорт.
+    Строка длиннее IMPORT_MAX_LINE_BYTES не копится: её остаток пропускается
+    до перевода строки, а сама она приходит ошибкой.
+    """
+    max_line = IMPORT_MAX_LINE_BYTES
+    too_long = f"Line exceeds {max_line} bytes"
+    # Куски незавершённой строки: join один раз на строку, без tail + chunk
+    parts: List[bytes] = []
+    size = 0
+    overflow = False
+    async for chunk in stream:
+        *lines, last = chunk.split(b"\n")
+        for piece in lines:
+            if overflow or size + len(piece) > max_line:
+                yield "", too_long
+            else:
+                parts.append(piece)
+                yield _decode_line(b"".join(parts))
+            parts, size, overflow = [], 0, False
+        if overflow:
+            continue
+        size += len(last)
+        if size > max_line:
+            parts, overflow = [], True
+        elif last:
+            parts.append(last)
+    if overflow:
+        yield "", too_long
+    elif size:
+        yield _decode_line(b"".join(parts))
+
+
+async def iter_records(
+    stream: AsyncIterator[bytes], fmt: str
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(номер строки, запись или None, ошибка разбора или None) для NDJSON/CSV"""
+    header: Optional[List[str]] = None
+    # Строки CSV-записи с полем в кавычках и чётность кавычек в них
+    pending: List[str] = []
+    pending_size = 0
+    quotes = 0
+    pending_error: Optional[str] = None
+    line_no = 0
+    record_line = 0
+    async for line, decode_error in iter_lines(stream):
+        line_no += 1
+        if fmt == "csv":
+            # Поле в кавычках может содержать перевод строки - копим до парной
+            # кавычки, но не больше IMPORT_MAX_LINE_BYTES на запись
+            record_line = record_line or line_no
+            quotes += line.count('"')
+            pending_error = pending_error or decode_error
+            pending_size += len(line.encode()) + 1
+            if pending_size > IMPORT_MAX_LINE_BYTES:
+                pending = []
+                pending_error = f"Record exceeds {IMPORT_MAX_LINE_BYTES} bytes"
+            elif pending_error is None:
+                pending.append(line)
+            if quotes % 2:
+                continue
+            text = "\n".join(pending)
+            error, start = pending_error, record_line
+            pending, pending_size, quotes = [], 0, 0
+            pending_error, record_line = None, 0
+            if error is not None:
+                yield start, None, error
+                continue
+            if not text.strip():
+                continue
+            values = next(csv.reader([text]))
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            if len(values) != len(header):
+                yield start, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Пустые ячейки CSV считаем отсутствующими полями
+            yield start, {k: v for k, v in zip(header, values) if v != ""}, None
+        else:
+            if decode_error is not None:
+                yield line_no, None, decode_error
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "Expected a JSON object"
+                continue
+            yield line_no, record, None
+    if record_line:
+        yield record_line, None, pending_error or "Unterminated quoted field"
+
+
+class ImportService:
+    """Потоковый импорт каталога: валидация схемами и вставка чанками"""
+
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        user_repository: UserRepository,
+        cache: Optional[RedisCache] = None,
+    ) -> None:
+        self.product_repository = product_repository
+        self.user_repository = user_repository
+        self.cache = cache
+
+    async def import_products(
+        self,
+        session: AnySession,
+        stream: AsyncIterator[bytes],
+        fmt: str = "ndjson",
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> ImportResult:
+        def to_row(product: ProductCreate) -> dict:
+            return {
+                "name": product.name,
+                "description": product.description,
+                "price": product.price,
+                "stock_quantity": product.stock_quantity or 0,
+            }
+
+        result = await self._import(
+            session,
+            stream,
+            fmt,
+            chunk_size,
+            ProductCreate,
+            to_row,
+            self.product_repository.insert_many,
+        )
+        if result.inserted and self.cache:
+            # Новые продукты должны появиться в закешированных списках
+            await self.cache.bump_generation(CATALOG_GENERATION_KEY)
+        return result
+
+    async def import_users(
+        self,
+        session: AnySession,
+        stream: AsyncIterator[bytes],
+        fmt: str = "ndjson",
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> ImportResult:
+        def to_row(user: UserCreate) -> dict:
+            return {
+                "username": user.username,
+                "email": user.email,
+                "description": user.description or "",
+            }
+
+        return await self._import(
+            session,
+            stream,
+            fmt,
+            chunk_size,
+            UserCreate,
+            to_row,
+            self.user_repository.insert_many,
+        )
+
+    async def _import(
+        self,
+        session: AnySession,
+        stream: AsyncIterator[bytes],
+        fmt: str,
+        chunk_size: int,
+        schema: Type[BaseModel],
+        to_row,
+        insert_many,
+    ) -> ImportResult:
+        result = ImportResult()
+        chunk: List[Tuple[int, Dict]] = []
+
+        async def flush() -> None:
+            await self._insert_chunk(session, chunk, insert_many, result)
+            chunk.clear()
+
+        async for line_no, record, error in iter_records(stream, fmt):
+            result.total += 1
+            if error is None:
+                try:
+                    chunk.append((line_no, to_row(schema.model_validate(record))))
+                except ValidationError as e:
+                    error = "; ".join(
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                        for err in e.errors()
+                    )
+            if error is not None:
+                self._add_error(result, line_no, error)
+            if len(chunk) >= chunk_size:
+                await flush()
+
+        if chunk:
+            await flush()
+        logger.info(
+            f"📥 [IMPORT] {schema.__name__}: {result.inserted} inserted, "
+            f"{result.failed} failed"
+        )
+        return result
+
+    async def _insert_chunk(
+        self,
+        session: AnySession,
+        chunk: List[Tuple[int, Dict]],
+        insert_many,
+        result: ImportResult,
+    ) -> None:
+        try:
+            result.inserted += await insert_many(session, [row for _, row in chunk])
+            return
+        except IntegrityError:
+            pass
+
+        # Чанк нарушил ограничение (например, дубликат email) - вставляем
+        # построчно, чтобы отклонить только конфликтующие строки
+        for line_no, row in chunk:
+            try:
+                result.inserted += await insert_many(session, [row])
+            except IntegrityError as e:
+                self._add_error(result, line_no, f"Constraint violation: {e.orig}")
+
+    @staticmethod
+    def _add_error(result: ImportResult, line_no: int, error: str) -> None:
+        result.failed += 1
+        if len(result.errors) < IMPORT_MAX_ERRORS:
+            result.errors.append(ImportRowError(line=line_no, error=error))
+        else:
+            result.errors_truncated = True
@@ -1,20 +1,35 @@
 import logging
-from typing import List, Optional
+import os
+from typing import Any, Iterable, List, Optional, Union
 
-from sqlalchemy.orm import Session
+import msgspec
 
-from aio_pika.exceptions import AMQPError
-
-from app.messaging.producer import publish_order_created
+from app.cache.keys import (
+    CATALOG_GENERATION_KEY,
+    ORDER_CACHE_PREFIX,
+    product_cache_key,
+    schema_version,
+)
+from app.cache.redis_client import RedisCache
+from app.database import AnySession, primary_reads
+from app.messaging.outbox import relay as outbox_relay
 from app.models import Order
+from app.pagination import CursorPage
+from app.read_models import OrderPage, OrderRead
 from app.repositories.order_repository import OrderRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
-from app.schemas import OrderCreate
-
+from app.schemas import OrderCreate, OrderResponse, OrderSort
 
 logger = logging.getLogger(__name__)
 
+# Сколько заказов пакетного запроса вставляется в одной транзакции
+ORDER_BATCH_CHUNK_SIZE = int(os.getenv("ORDER_BATCH_CHUNK_SIZE", "500"))
+# Кеш заказа (ответ GET /orders/{id}) и последних заказов пользователя
+ORDER_CACHE_TTL = int(os.getenv("ORDER_CACHE_TTL", "600"))
+ORDER_RECENT_CACHE_TTL = int(os.getenv("ORDER_RECENT_CACHE_TTL", "60"))
+ORDER_RECENT_CACHE_MAX_COUNT = int(os.getenv("ORDER_RECENT_CACHE_MAX_COUNT", "50"))
+
 
 class OrderService:
     def __init__(
@@ -22,12 +37,61 @@ class OrderService:
         order_repository: OrderRepository,
         product_repository: ProductRepository,
         user_repository: UserRepository,
+        cache: Optional[RedisCache] = None,
     ) -> None:
         self.order_repository = order_repository
         self.product_repository = product_repository
         self.user_repository = user_repository
+        self.cache = cache
+        self.cache_prefix = ORDER_CACHE_PREFIX
+
+    def _cache_key(self, order_id: int) -> str:
+        return f"{self.cache_prefix}{order_id}"
+
+    @staticmethod
+    def _recent_generation_key(user_id: int) -> str:
+        return f"order:user:{user_id}:generation"
+
+    @staticmethod
+    def _recent_cache_key(user_id: int, generation: int, count: int) -> str:
+        version = schema_version(List[OrderRead])
+        return f"order:recent:{version}:{user_id}:g{generation}:{count}"
+
+    def _encode(self, order: Order) -> str:
+        """Готовый JSON ответа GET /orders/{id} - в таком виде он лежит в кеше"""
+        return OrderResponse.model_validate(order).model_dump_json()
+
+    async def _invalidate(
+        self,
+        order_id: Optional[int] = None,
+        user_ids: Iterable[int] = (),
+        product_ids: Iterable[int] = (),
+    ) -> None:
+        """Удаление заказа из кеша и новое поколение последних заказов пользователей.
+
+        Заказ меняет остатки своих продуктов - их ответы и списки каталога
+        тоже устаревают.
+        """
+        if not self.cache:
+            return
+        if order_id is not None:
+            logger.info(f"🗑️ [CACHE INVALIDATE] Deleting cache for order {order_id}")
+            await self.cache.delete(self._cache_key(order_id))
+        for user_id in set(user_ids):
+            await self.cache.bump_generation(self._recent_generation_key(user_id))
+        product_keys = [product_cache_key(pid) for pid in set(product_ids)]
+        if product_keys:
+            logger.info(
+                f"🗑️ [CACHE INVALIDATE] Stock changed for {len(product_keys)} products"
+            )
+            await self.cache.delete(*product_keys)
+            await self.cache.bump_generation(CATALOG_GENERATION_KEY)
+
+    @staticmethod
+    def _product_ids(orders: Iterable[Order]) -> List[int]:
+        return [item.product_id for order in orders for item in order.items]
 
-    async def create_order(self, session: Session, order_data: OrderCreate) -> Order:
+    async def create_order(self, session: AnySession, order_data: OrderCreate) -> Order:
         user = await self.user_repository.get_by_id(session, order_data.user_id)
         if not user:
             raise ValueError("User not found")
@@ -35,41 +99,180 @@ class OrderService:
         if not order_data.items:
             raise ValueError("Order items cannot be empty")
 
+        # Событие записано в outbox в транзакции заказа - relay отправит его
         order = await self.order_repository.create(session, order_data)
+        outbox_relay.notify()
 
-        # Отправка события в RabbitMQ
-        try:
-            logger.info(f"📤 Sending RabbitMQ event for order {order.id}")
-            await publish_order_created(
-                order_id=order.id,
-                user_id=order.user_id,
-                total_amount=order.total_amount,
-                status=order.status,
-            )
-            logger.info(f"✅ RabbitMQ event sent for order {order.id}")
-        except (ConnectionError, AMQPError, TimeoutError) as e:
-            logger.error(f"RabbitMQ connection error: {e}")
-
+        await self._invalidate(
+            user_ids=[order.user_id], product_ids=self._product_ids([order])
+        )
         return order
 
-    async def get_order(self, session: Session, order_id: int) -> Optional[Order]:
+    async def create_orders_batch(
+        self,
+        session: AnySession,
+        orders: List[OrderCreate],
+        chunk_size: int = ORDER_BATCH_CHUNK_SIZE,
+    ) -> List[Union[Order, ValueError]]:
+        """Пакетное создание заказов: Order или ValueError для каждого входного"""
+        existing_users = await self.user_repository.get_existing_ids(
+            session, (order_data.user_id for order_data in orders)
+        )
+
+        results: List[Union[Order, ValueError, None]] = [None] * len(orders)
+        valid = []
+        for index, order_data in enumerate(orders):
+            if order_data.user_id not in existing_users:
+                results[index] = ValueError("User not found")
+            else:
+                valid.append((index, order_data))
+
+        created = await self.order_repository.create_many(
+            session, [order_data for _, order_data in valid], chunk_size
+        )
+        for (index, _), result in zip(valid, created):
+            results[index] = result
+
+        created_orders = [result for result in results if isinstance(result, Order)]
+        await self._invalidate(
+            user_ids=[order.user_id for order in created_orders],
+            product_ids=self._product_ids(created_orders),
+        )
+        if created_orders:
+            outbox_relay.notify()
+
+        return results
+
+    async def get_order(self, session: AnySession, order_id: int) -> Optional[Order]:
         return await self.order_repository.get(session, order_id)
 
+    async def get_order_json(
+        self, session: AnySession, order_id: int
+    ) -> Optional[bytes]:
+        """Заказ как готовый JSON ответа; попадание в кеш отдаётся без разбора"""
+        if not self.cache:
+            order = await self.get_order(session, order_id)
+            return self._encode(order).encode() if order else None
+
+        loaded = False
+
+        async def _load() -> Optional[str]:
+            nonlocal loaded
+            logger.info(f"📊 [DB QUERY] Fetching order {order_id} from database")
+            order = await self.get_order(session, order_id)
+            if not order:
+                return None
+            loaded = True
+            return self._encode(order)
+
+        # Промах кеша читается с primary: отставшая реплика не попадёт в кеш
+        with primary_reads(session):
+            cached_data = await self.cache.get_or_load(
+                self._cache_key(order_id), _load, ORDER_CACHE_TTL
+            )
+        if cached_data is None:
+            return None
+        if not loaded:
+            logger.info(f"🟢 [CACHE HIT] Order {order_id} found in cache")
+        return cached_data.encode()
+
     async def list_orders(
         self,
-        session: Session,
+        session: AnySession,
         count: int = 10,
         page: int = 1,
         user_id: Optional[int] = None,
-    ) -> List[Order]:
+        sort: OrderSort = "id",
+    ) -> List[OrderRead]:
         return await self.order_repository.list(
-            session, count=count, page=page, user_id=user_id
+            session, count=count, page=page, user_id=user_id, sort=sort
         )
 
+    async def list_orders_page(
+        self,
+        session: AnySession,
+        count: int = 10,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        sort: OrderSort = "id",
+    ) -> CursorPage:
+        return await self.order_repository.get_page(
+            session, count=count, cursor=cursor, user_id=user_id, sort=sort
+        )
+
+    async def list_orders_json(
+        self,
+        session: AnySession,
+        count: int = 10,
+        page: int = 1,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        sort: OrderSort = "id",
+    ) -> bytes:
+        """Готовый JSON ответа GET /orders.
+
+        sort одинаково действует на страницы по номеру и по курсору. Первая
+        страница заказов пользователя от новых к старым (sort="-id") - последние
+        заказы - кешируется: её постоянно опрашивает страница отслеживания.
+        """
+
+        async def _load() -> Any:
+            if cursor is not None:
+                result = await self.list_orders_page(
+                    session, count=count, cursor=cursor, user_id=user_id, sort=sort
+                )
+                return OrderPage(items=result.items, next_cursor=result.next_cursor)
+            return await self.list_orders(
+                session, count=count, page=page, user_id=user_id, sort=sort
+            )
+
+        recent = (
+            user_id is not None
+            and sort == "-id"
+            and cursor is None
+            and page == 1
+            and count <= ORDER_RECENT_CACHE_MAX_COUNT
+        )
+        if not self.cache or not recent:
+            return msgspec.json.encode(await _load())
+
+        generation = await self.cache.generation(self._recent_generation_key(user_id))
+        if generation is None:
+            return msgspec.json.encode(await _load())
+        loaded = False
+
+        async def _load_json() -> str:
+            nonlocal loaded
+            loaded = True
+            logger.info(f"📊 [DB QUERY] Fetching recent orders of user {user_id}")
+            return msgspec.json.encode(await _load()).decode()
+
+        with primary_reads(session):
+            cached_data = await self.cache.get_or_load(
+                self._recent_cache_key(user_id, generation, count),
+                _load_json,
+                ORDER_RECENT_CACHE_TTL,
+            )
+        if not loaded:
+            logger.info(f"🟢 [CACHE HIT] Recent orders of user {user_id}")
+        return cached_data.encode()
+
     async def update_status(
-        self, session: Session, order_id: int, status: str
+        self, session: AnySession, order_id: int, status: str
     ) -> Optional[Order]:
-        return await self.order_repository.update_status(session, order_id, status)
+        """Изменить статус и инвалидировать кеш заказа"""
+        order = await self.order_repository.update_status(session, order_id, status)
+        if order:
+            await self._invalidate(order_id, user_ids=[order.user_id])
+        return order
 
-    async def delete_order(self, session: Session, order_id: int) -> bool:
-        return await self.order_repository.delete(session, order_id)
+    async def delete_order(self, session: AnySession, order_id: int) -> bool:
+        """Удалить заказ и инвалидировать кеш"""
+        owner = await self.order_repository.get_owner_and_products(session, order_id)
+        if owner is None:
+            return False
+        user_id, product_ids = owner
+        # Удаление возвращает остатки - инвалидируем и продукты заказа
+        deleted = await self.order_repository.delete(session, order_id)
+        await self._invalidate(order_id, user_ids=[user_id], product_ids=product_ids)
+        return deleted
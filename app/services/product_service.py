@@ -1,148 +1,209 @@
+import hashlib
 import json
 import logging
-from datetime import datetime
-from typing import List, Optional
+import os
+from typing import Any, Awaitable, Callable, List, Optional, Union
 
-import redis
-from aio_pika.exceptions import AMQPError
-from sqlalchemy.orm import Session
+import msgspec
 
-from app.cache.redis_client import get_redis
-from app.messaging.producer import publish_product_created
+from app.cache.keys import CATALOG_GENERATION_KEY, PRODUCT_CACHE_PREFIX, schema_version
+from app.cache.redis_client import RedisCache
+from app.database import AnySession, primary_reads
+from app.messaging.outbox import relay as outbox_relay
 from app.models import Product
+from app.pagination import CursorPage
+from app.read_models import ProductPage, ProductRead
 from app.repositories.product_repository import ProductRepository
-from app.schemas import ProductCreate, ProductUpdate
+from app.schemas import ProductCreate, ProductFilter, ProductResponse, ProductUpdate
 
 logger = logging.getLogger(__name__)
 
+# Кеш списков /products: TTL и максимальный размер кешируемой страницы
+PRODUCT_LIST_CACHE_TTL = int(os.getenv("PRODUCT_LIST_CACHE_TTL", "60"))
+PRODUCT_LIST_CACHE_MAX_COUNT = int(os.getenv("PRODUCT_LIST_CACHE_MAX_COUNT", "50"))
+
 
 class ProductService:
-    def __init__(self, product_repository: ProductRepository) -> None:
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        cache: Optional[RedisCache] = None,
+    ) -> None:
         self.product_repository = product_repository
-        self.cache_prefix = "product:"
+        self.cache = cache
+        self.cache_prefix = PRODUCT_CACHE_PREFIX
 
     def _cache_key(self, product_id: int) -> str:
         return f"{self.cache_prefix}{product_id}"
 
-    def _product_to_dict(self, product: Product) -> dict:
-        """Преобразование Product в словарь для JSON"""
-        return {
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": float(product.price),  # Decimal -> float для JSON
-            "stock_quantity": product.stock_quantity,
-            "created_at": (
-                product.created_at.isoformat() if product.created_at else None
-            ),
-            "updated_at": (
-                product.updated_at.isoformat() if product.updated_at else None
-            ),
-        }
-
-    def _dict_to_product(self, data: dict) -> Product:
-        """Создание Product из словаря (только для кеша)"""
-        product_data = data.copy()
-
-        # Конвертация строк обратно в datetime
-        if product_data.get("created_at"):
-            product_data["created_at"] = datetime.fromisoformat(
-                product_data["created_at"]
+    @staticmethod
+    def _list_cache_key(generation: int, params: dict) -> str:
+        """Ключ списка: версия схемы, поколение каталога и хеш параметров запроса"""
+        version = schema_version(Union[List[ProductRead], ProductPage])
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        return f"product:list:{version}:g{generation}:{digest}"
+
+    async def _bump_catalog(self) -> None:
+        """Новое поколение каталога вместо поиска и удаления ключей списков"""
+        if self.cache:
+            generation = await self.cache.bump_generation(CATALOG_GENERATION_KEY)
+            logger.info(
+                f"🗑️ [CACHE INVALIDATE] Product lists, catalog gen {generation}"
             )
-        if product_data.get("updated_at"):
-            product_data["updated_at"] = datetime.fromisoformat(
-                product_data["updated_at"]
+
+    def _encode(self, product: Product) -> str:
+        """Готовый JSON ответа GET /products/{id} - в таком виде он лежит в кеше"""
+        return ProductResponse.model_validate(product).model_dump_json()
+
+    async def _invalidate(self, product_id: int) -> None:
+        """Инвалидация кеша продукта"""
+        if not self.cache:
+            logger.info(
+                f"🔵 [NO REDIS] Redis not available, cache not invalidated for product {product_id}"
             )
+            return
 
-        # Конвертация float обратно (SQLAlchemy сам конвертирует в Decimal)
-        return Product(**product_data)
+        logger.info(f"🗑️ [CACHE INVALIDATE] Deleting cache for product {product_id}")
+        if await self.cache.delete(self._cache_key(product_id)):
+            logger.info(f"✅ [CACHE DELETED] Cache for product {product_id} removed")
+        else:
+            logger.info(f"ℹ️ [NO CACHE] No cache found for product {product_id}")
 
     async def create_product(
-        self, session: Session, product_data: ProductCreate
+        self, session: AnySession, product_data: ProductCreate
     ) -> Product:
+        # Событие записано в outbox в транзакции продукта - relay отправит его
         product = await self.product_repository.create(session, product_data)
+        outbox_relay.notify()
 
-        try:
-            await publish_product_created(
-                product_id=product.id, name=product.name, price=product.price
-            )
-        except (ConnectionError, AMQPError, TimeoutError) as e:
-            logger.error(f"RabbitMQ connection error: {e}")
-
+        await self._bump_catalog()
         return product
 
-    async def get_product(self, session: Session, product_id: int) -> Optional[Product]:
-        """Получить продукт по ID с кешированием на 10 минут"""
-        redis_client = get_redis()
-
-        # Пробуем получить из кеша
-        if redis_client:
-            cached_data = redis_client.get(self._cache_key(product_id))
-            if cached_data:
-                logger.info(f"🟢 [CACHE HIT] Product {product_id} found in Redis")
-                try:
-                    data = json.loads(cached_data)
-                    return self._dict_to_product(data)
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.warning(
-                        f"🔴 [CACHE ERROR] Invalid cache for product {product_id}: {e}"
-                    )
-                    # Удаляем повреждённый кеш
-                    try:
-                        redis_client.delete(self._cache_key(product_id))
-                    except (json.JSONDecodeError, ValueError):
-                        pass
-            else:
-                logger.info(f"🟡 [CACHE MISS] Product {product_id} not in Redis")
-        else:
+    async def get_product_json(
+        self, session: AnySession, product_id: int
+    ) -> Optional[bytes]:
+        """Продукт как готовый JSON ответа с кешированием на 10 минут.
+
+        Попадание в кеш отдаётся без разбора; ORM-объект продукта читается
+        напрямую из репозитория.
+        """
+        loaded = False
+
+        async def _load() -> Optional[str]:
+            # Одновременные промахи по ключу ждут одну загрузку (single-flight)
+            nonlocal loaded
+            logger.info(f"📊 [DB QUERY] Fetching product {product_id} from database")
+            product = await self.product_repository.get_by_id(session, product_id)
+            if not product:
+                return None
+            loaded = True
+            return self._encode(product)
+
+        if not self.cache:
             logger.info(f"🔵 [NO REDIS] Redis not available for product {product_id}")
-
-        # Получаем из БД
-        logger.info(f"📊 [DB QUERY] Fetching product {product_id} from database")
-        product = await self.product_repository.get_by_id(session, product_id)
-
-        # Сохраняем в кеш
-        if product and redis_client:
-            logger.info(f"💾 [CACHE SAVE] Saving product {product_id} to Redis")
-            try:
-                data = self._product_to_dict(product)
-                redis_client.setex(
-                    self._cache_key(product_id), 600, json.dumps(data)
-                )  # 10 минут
-                logger.info(f"✅ [CACHE SAVED] Product {product_id} cached for 600s")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.warning(
-                    f"❌ [CACHE FAILED] Failed to cache product {product_id}: {e}"
-                )
-
-        return product
+            body = await _load()
+            return body.encode() if body is not None else None
+
+        # Промах кеша читается с primary: отставшая реплика не попадёт в кеш
+        with primary_reads(session):
+            cached_data = await self.cache.get_or_load(
+                self._cache_key(product_id), _load, 600
+            )  # 10 минут
+        if cached_data is None:
+            return None
+        if not loaded:
+            logger.info(f"🟢 [CACHE HIT] Product {product_id} found in cache")
+        return cached_data.encode()
 
     async def list_products(
         self,
-        session: Session,
+        session: AnySession,
         count: int = 10,
         page: int = 1,
-        name: Optional[str] = None,
-        min_price: Optional[float] = None,
-        max_price: Optional[float] = None,
-    ) -> List[Product]:
-        filters = {}
-        if name:
-            filters["name"] = name
-
-        products = await self.product_repository.get_list(
-            session, count=count, page=page, **filters
+        filters: Optional[ProductFilter] = None,
+    ) -> List[ProductRead]:
+        return await self.product_repository.get_list(
+            session, count=count, page=page, filters=filters
         )
 
-        if min_price is not None:
-            products = [p for p in products if float(p.price) >= min_price]
-        if max_price is not None:
-            products = [p for p in products if float(p.price) <= max_price]
+    async def list_products_page(
+        self,
+        session: AnySession,
+        count: int = 10,
+        cursor: Optional[str] = None,
+        filters: Optional[ProductFilter] = None,
+    ) -> CursorPage:
+        """Список продуктов с keyset-пагинацией"""
+        return await self.product_repository.get_page(
+            session, count=count, cursor=cursor, filters=filters
+        )
 
-        return products
+    async def list_products_json(
+        self,
+        session: AnySession,
+        count: int = 10,
+        page: int = 1,
+        cursor: Optional[str] = None,
+        filters: Optional[ProductFilter] = None,
+    ) -> bytes:
+        """Готовый JSON ответа GET /products с кешем по нормализованным параметрам.
+
+        С cursor - страница keyset-пагинации, иначе legacy-список по page.
+        """
+
+        async def _load() -> Any:
+            if cursor is not None:
+                result = await self.list_products_page(
+                    session, count=count, cursor=cursor, filters=filters
+                )
+                return ProductPage(items=result.items, next_cursor=result.next_cursor)
+            return await self.list_products(
+                session, count=count, page=page, filters=filters
+            )
+
+        params = (filters or ProductFilter()).model_dump(mode="json", exclude_none=True)
+        params["count"] = count
+        if cursor is not None:
+            params["cursor"] = cursor
+        else:
+            params["page"] = page
+        return await self._cached_list(session, params, count, _load)
+
+    async def _cached_list(
+        self,
+        session: AnySession,
+        params: dict,
+        count: int,
+        load: Callable[[], Awaitable[Any]],
+    ) -> bytes:
+        if not self.cache or count > PRODUCT_LIST_CACHE_MAX_COUNT:
+            return msgspec.json.encode(await load())
+
+        generation = await self.cache.generation(CATALOG_GENERATION_KEY)
+        if generation is None:
+            # Без поколения нельзя отличить актуальный список от устаревшего
+            return msgspec.json.encode(await load())
+        key = self._list_cache_key(generation, params)
+        loaded = False
+
+        async def _load() -> str:
+            nonlocal loaded
+            loaded = True
+            logger.info(f"📊 [DB QUERY] Fetching product list {params}")
+            return msgspec.json.encode(await load()).decode()
+
+        with primary_reads(session):
+            cached_data = await self.cache.get_or_load(
+                key, _load, PRODUCT_LIST_CACHE_TTL
+            )
+        if not loaded:
+            logger.info(f"🟢 [CACHE HIT] Product list {params}")
+        return cached_data.encode()
 
     async def update_product(
-        self, session: Session, product_id: int, product_data: ProductUpdate
+        self, session: AnySession, product_id: int, product_data: ProductUpdate
     ) -> Optional[Product]:
         """Обновить продукт и инвалидировать кеш"""
         product = await self.product_repository.update(
@@ -150,63 +211,30 @@ class ProductService:
         )
 
         # Удаляем кеш при обновлении
-        redis_client = get_redis()
-        if redis_client:
-            logger.info(f"🗑️ [CACHE INVALIDATE] Deleting cache for product {product_id}")
-            try:
-                deleted = redis_client.delete(self._cache_key(product_id))
-                if deleted:
-                    logger.info(
-                        f"✅ [CACHE DELETED] Cache for product {product_id} removed"
-                    )
-                else:
-                    logger.info(f"ℹ️ [NO CACHE] No cache found for product {product_id}")
-            except redis.RedisError as e:
-                logger.warning(
-                    f"❌ [CACHE DELETE ERROR] Failed to delete cache for product {product_id}: {e}"
-                )
-        else:
-            logger.info(
-                f"🔵 [NO REDIS] Redis not available, cache not invalidated for product {product_id}"
-            )
+        await self._invalidate(product_id)
+        await self._bump_catalog()
 
         return product
 
-    async def delete_product(self, session: Session, product_id: int) -> bool:
+    async def delete_product(self, session: AnySession, product_id: int) -> bool:
         """Удалить продукт и инвалидировать кеш"""
         # Сначала удаляем кеш
-        redis_client = get_redis()
-        if redis_client:
-            logger.info(
-                f"🗑️ [CACHE INVALIDATE] Deleting cache before removing product {product_id}"
-            )
-            try:
-                deleted = redis_client.delete(self._cache_key(product_id))
-                if deleted:
-                    logger.info(
-                        f"✅ [CACHE DELETED] Cache for product {product_id} removed before deletion"
-                    )
-                else:
-                    logger.info(f"ℹ️ [NO CACHE] No cache found for product {product_id}")
-            except redis.RedisError as e:
-                logger.warning(
-                    f"❌ [CACHE DELETE ERROR] Failed to delete cache for product {product_id}: {e}"
-                )
-        else:
-            logger.info(
-                f"🔵 [NO REDIS] Redis not available, cache not invalidated for product {product_id}"
-            )
+        await self._invalidate(product_id)
 
         # Удаляем из БД
         logger.info(f"🗑️ [DB DELETE] Removing product {product_id} from database")
         result = await self.product_repository.delete(session, product_id)
         logger.info(f"✅ [DB DELETED] Product {product_id} removed from database")
+        await self._bump_catalog()
 
         return result
 
     async def update_stock(
-        self, session: Session, product_id: int, quantity_change: int
+        self, session: AnySession, product_id: int, quantity_change: int
     ) -> Optional[Product]:
-        return await self.product_repository.update_stock(
+        product = await self.product_repository.update_stock(
             session, product_id, quantity_change
         )
+        await self._invalidate(product_id)
+        await self._bump_catalog()
+        return product
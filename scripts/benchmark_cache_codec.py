@@ -0,0 +1,126 @@
+"""Кодеки кеша: время encode/decode и размер значения на ключ.
+
+Сравнивает прежний формат (json.dumps словаря с price как float и разбор
+обратно в Product) с текущими кодеками app.cache.codec для продукта с
+коротким и длинным описанием. С --redis-url дополнительно пишет значения
+в Redis и печатает MEMORY USAGE ключа.
+
+Запуск: python -m scripts.benchmark_cache_codec [--iterations N] [--redis-url URL]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from app.cache.codec import BinaryCodec, TextCodec
+from app.models import Product
+from app.schemas import ProductResponse
+
+
+def legacy_encode(product: Product) -> str:
+    return json.dumps(
+        {
+            "id": product.id,
+            "name": product.name,
+            "description": product.description,
+            "price": float(product.price),
+            "stock_quantity": product.stock_quantity,
+            "created_at": product.created_at.isoformat(),
+            "updated_at": product.updated_at.isoformat(),
+        }
+    )
+
+
+def legacy_decode(data: str) -> Product:
+    values = json.loads(data)
+    values["created_at"] = datetime.fromisoformat(values["created_at"])
+    values["updated_at"] = datetime.fromisoformat(values["updated_at"])
+    return Product(**values)
+
+
+def make_product(description_repeat: int) -> Product:
+    now = datetime.now()
+    return Product(
+        id=42,
+        name="Товар с описанием",
+        description="Подробное описание товара. " * description_repeat,
+        price=Decimal("1234.10"),
+        stock_quantity=7,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def timed(call, iterations: int) -> float:
+    call()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    client = None
+    if args.redis_url:
+        import redis
+
+        client = redis.Redis.from_url(args.redis_url)
+
+    codecs = {
+        "text (response JSON)": TextCodec(),
+        "binary-json": BinaryCodec("json"),
+        "binary-msgpack": BinaryCodec("msgpack"),
+    }
+
+    for label, repeat in (("short description", 1), ("long description", 200)):
+        product = make_product(repeat)
+        response = ProductResponse.model_validate(product).model_dump_json()
+        print(f"\n=== {label} ({len(response.encode())} bytes of JSON) ===")
+        print(f"{'codec':24} {'encode us':>10} {'decode us':>10} {'bytes':>7}", end="")
+        print(f" {'redis':>7}" if client else "")
+
+        legacy = legacy_encode(product)
+        rows = [
+            (
+                "legacy dict + float",
+                timed(lambda: legacy_encode(product), args.iterations),
+                timed(lambda: legacy_decode(legacy), args.iterations),
+                legacy.encode(),
+            )
+        ]
+        for name, codec in codecs.items():
+            encoded = codec.encode(response)
+            assert codec.decode(encoded) == response
+            rows.append(
+                (
+                    name,
+                    timed(lambda: codec.encode(response), args.iterations),
+                    timed(lambda: codec.decode(encoded), args.iterations),
+                    encoded if isinstance(encoded, bytes) else encoded.encode(),
+                )
+            )
+
+        for name, encode_us, decode_us, stored in rows:
+            line = f"{name:24} {encode_us:10.2f} {decode_us:10.2f} {len(stored):7}"
+            if client:
+                key = f"benchmark:codec:{name}"
+                client.set(key, stored)
+                line += f" {client.memory_usage(key):7}"
+                client.delete(key)
+            print(line)
+
+        print(
+            f"legacy price round-trip: {product.price} -> "
+            f"{legacy_decode(legacy).price!r} (float, scale lost)"
+        )
+
+
+if __name__ == "__main__":
+    main()
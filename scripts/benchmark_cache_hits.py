@@ -0,0 +1,82 @@
+"""Обработка попадания в кеш GET /products/{id}: разбор в ORM против готового JSON.
+
+Прежний путь: json.loads, transient Product (разбор дат и Decimal),
+ProductResponse.model_validate и повторная сериализация ответа. Новый путь
+отдаёт закешированную строку как байты. Время Redis не входит - печатается
+только накладная часть приложения на одно попадание.
+
+Запуск: python -m scripts.benchmark_cache_hits [--hits N]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import msgspec
+
+from app.models import Product
+from app.schemas import ProductResponse
+from app.services.product_service import ProductService
+
+
+def legacy_product(data: dict) -> Product:
+    """Сборка Product из закешированного словаря, как делал прежний сервис"""
+    data = data.copy()
+    for field in ("created_at", "updated_at"):
+        if data.get(field):
+            data[field] = datetime.fromisoformat(data[field])
+    data["price"] = Decimal(data["price"])
+    return Product(**data)
+
+
+def legacy_hit(service: ProductService, cached: str) -> bytes:
+    product = legacy_product(json.loads(cached))
+    # Так Litestar сериализует pydantic-модель из обработчика
+    return msgspec.json.encode(
+        ProductResponse.model_validate(product).model_dump(mode="json")
+    )
+
+
+def raw_hit(service: ProductService, cached: str) -> bytes:
+    return cached.encode()
+
+
+def measure(name: str, hit, service: ProductService, cached: str, hits: int) -> bytes:
+    body = hit(service, cached)
+    started = time.perf_counter()
+    for _ in range(hits):
+        hit(service, cached)
+    per_hit = (time.perf_counter() - started) / hits * 1_000_000
+    print(f"{name:28} {per_hit:8.2f} us/hit")
+    return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hits", type=int, default=20000)
+    args = parser.parse_args()
+
+    service = ProductService(product_repository=None)
+    now = datetime.now()
+    product = Product(
+        id=1,
+        name="Product",
+        description="Описание товара " * 5,
+        price=Decimal("12.50"),
+        stock_quantity=100,
+        created_at=now,
+        updated_at=now,
+    )
+    cached = service._encode(product)
+
+    before = measure(
+        "json.loads + ORM + pydantic", legacy_hit, service, cached, args.hits
+    )
+    after = measure("raw cached JSON", raw_hit, service, cached, args.hits)
+    assert json.loads(before) == json.loads(after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Планы запросов и время до/после вторичных индексов (миграция 3).
+
+Генерирует данные во временной SQLite-базе на схеме версии 2, снимает
+EXPLAIN QUERY PLAN и время горячих запросов, затем применяет миграции до
+HEAD и повторяет замеры.
+
+Запуск: python -m scripts.benchmark_indexes [--users N] [--orders N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+
+from app.migrations import HEAD, run_migrations
+from app.models import Address, Order, OrderItem, Product, User
+
+STATUSES = ["pending", "paid", "shipped", "delivered", "cancelled"]
+
+# Запросы репозиториев, которые раньше шли полным сканированием
+QUERIES = {
+    "orders by user (OrderRepository.list)": (
+        "SELECT id FROM orders WHERE user_id = :user_id ORDER BY id LIMIT 10",
+        lambda args: {"user_id": random.randint(1, args.users)},
+    ),
+    "items of orders (selectinload(Order.items))": (
+        "SELECT * FROM order_items WHERE order_id IN (:a, :b, :c, :d, :e)",
+        lambda args: {
+            key: random.randint(1, args.orders) for key in ("a", "b", "c", "d", "e")
+        },
+    ),
+    "items of product (ProductRepository.delete)": (
+        "SELECT count(*) FROM order_items WHERE product_id = :product_id",
+        lambda args: {"product_id": random.randint(1, args.products)},
+    ),
+    "addresses of user": (
+        "SELECT * FROM addresses WHERE user_id = :user_id",
+        lambda args: {"user_id": random.randint(1, args.users)},
+    ),
+    "recent orders by status": (
+        "SELECT id FROM orders WHERE status = :status "
+        "ORDER BY created_at DESC LIMIT 20",
+        lambda args: {"status": random.choice(STATUSES)},
+    ),
+}
+
+
+def generate(conn, args) -> None:
+    start = datetime(2024, 1, 1)
+    conn.execute(
+        insert(User),
+        [
+            {"username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(1, args.users + 1)
+        ],
+    )
+    conn.execute(
+        insert(Address),
+        [
+            {"user_id": i, "street": f"Street {i}", "city": "City", "country": "RU"}
+            for i in range(1, args.users + 1)
+        ],
+    )
+    conn.execute(
+        insert(Product),
+        [
+            {"name": f"Product {i}", "price": random.randint(1, 1000)}
+            for i in range(1, args.products + 1)
+        ],
+    )
+    orders, items = [], []
+    for order_id in range(1, args.orders + 1):
+        user_id = random.randint(1, args.users)
+        orders.append(
+            {
+                "user_id": user_id,
+                "address_id": user_id,
+                "status": random.choice(STATUSES),
+                "total_amount": 0,
+                "created_at": start + timedelta(minutes=order_id),
+            }
+        )
+        for _ in range(args.items_per_order):
+            items.append(
+                {
+                    "order_id": order_id,
+                    "product_id": random.randint(1, args.products),
+                    "quantity": 1,
+                    "price_at_purchase": 1,
+                    "total_price": 1,
+                }
+            )
+    conn.execute(insert(Order), orders)
+    conn.execute(insert(OrderItem), items)
+
+
+def measure(engine, args, label: str) -> None:
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        for name, (sql, make_params) in QUERIES.items():
+            plan = conn.execute(
+                text(f"EXPLAIN QUERY PLAN {sql}"), make_params(args)
+            ).all()
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                conn.execute(text(sql), make_params(args)).all()
+            elapsed = (time.perf_counter() - started) / args.repeat * 1000
+            print(f"{name}: {elapsed:.3f} ms/query")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        asyncio.run(run_migrations(engine, target=2))
+        with engine.begin() as conn:
+            generate(conn, args)
+        print(
+            f"📦 {args.users} users, {args.products} products, "
+            f"{args.orders} orders, {args.orders * args.items_per_order} items"
+        )
+
+        measure(engine, args, "schema v2 (without secondary indexes)")
+        started = time.perf_counter()
+        asyncio.run(run_migrations(engine))
+        print(f"\n🛠️ migrated to v{HEAD} in {time.perf_counter() - started:.2f} s")
+        measure(engine, args, f"schema v{HEAD} (with secondary indexes)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Страница списка из 100 элементов: ORM + model_validate против Core + msgspec.
+
+Для /products и /orders сравнивает прежний путь (ORM-сущности с identity map,
+для заказов ещё selectinload продуктов, затем *Response.model_validate и
+JSON) с моделями чтения из app.read_models: время на страницу и пик памяти.
+
+Запуск: python -m scripts.benchmark_read_models [--pages N]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import msgspec
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.migrations import run_migrations
+from app.models import Address, Order, OrderItem, Product, User
+from app.repositories import OrderRepository, ProductRepository
+from app.schemas import OrderResponse, ProductResponse
+
+PAGE_SIZE = 100
+
+
+def seed(engine, orders: int) -> None:
+    asyncio.run(run_migrations(engine))
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(username="bench", email="b@example.com"))
+        conn.execute(
+            insert(Address).values(user_id=1, street="S", city="C", country="RU")
+        )
+        conn.execute(
+            insert(Product),
+            [
+                {
+                    "name": f"Product {i}",
+                    "description": "Описание товара " * 5,
+                    "price": 10 + i % 100,
+                    "stock_quantity": 100,
+                }
+                for i in range(1, 1001)
+            ],
+        )
+        conn.execute(
+            insert(Order),
+            [{"user_id": 1, "address_id": 1, "total_amount": 30}] * orders,
+        )
+        conn.execute(
+            insert(OrderItem),
+            [
+                {
+                    "order_id": order_id,
+                    "product_id": (order_id * 7 + k) % 1000 + 1,
+                    "quantity": 1,
+                    "price_at_purchase": 10,
+                    "total_price": 10,
+                }
+                for order_id in range(1, orders + 1)
+                for k in range(3)
+            ],
+        )
+
+
+def encode_models(models) -> bytes:
+    # Так Litestar сериализует pydantic-модели в ответе
+    return msgspec.json.encode([model.model_dump(mode="json") for model in models])
+
+
+async def orm_products(session: Session, offset: int) -> bytes:
+    products = session.scalars(
+        select(Product).order_by(Product.id).offset(offset).limit(PAGE_SIZE)
+    ).all()
+    return encode_models(ProductResponse.model_validate(p) for p in products)
+
+
+async def orm_orders(session: Session, offset: int) -> bytes:
+    orders = session.scalars(
+        select(Order)
+        .options(selectinload(Order.items).selectinload(OrderItem.product))
+        .order_by(Order.id)
+        .offset(offset)
+        .limit(PAGE_SIZE)
+    ).all()
+    return encode_models(OrderResponse.model_validate(o) for o in orders)
+
+
+async def lean_products(session: Session, offset: int) -> bytes:
+    page = offset // PAGE_SIZE + 1
+    rows = await ProductRepository().get_list(session, PAGE_SIZE, page)
+    return msgspec.json.encode(rows)
+
+
+async def lean_orders(session: Session, offset: int) -> bytes:
+    page = offset // PAGE_SIZE + 1
+    rows = await OrderRepository().list(session, PAGE_SIZE, page)
+    return msgspec.json.encode(rows)
+
+
+async def measure(engine, name: str, render, pages: int) -> bytes:
+    # Новая сессия на страницу, как в запросе - identity map не переиспользуется
+    async def one_pass():
+        for page in range(pages):
+            with Session(engine) as session:
+                body = await render(session, page % 10 * PAGE_SIZE)
+        return body
+
+    await one_pass()  # прогрев
+    started = time.perf_counter()
+    body = await one_pass()
+    per_page = (time.perf_counter() - started) / pages * 1000
+
+    tracemalloc.start()
+    with Session(engine) as session:
+        await render(session, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:28} {per_page:7.2f} ms/page, peak {peak / 1024:8.1f} KiB")
+    return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.orders)
+
+    for entity, orm, lean in (
+        ("products", orm_products, lean_products),
+        ("orders", orm_orders, lean_orders),
+    ):
+        print(f"\n=== GET /{entity}?count={PAGE_SIZE} ===")
+        before = asyncio.run(measure(engine, "ORM + model_validate", orm, args.pages))
+        after = asyncio.run(measure(engine, "Core select + msgspec", lean, args.pages))
+        assert msgspec.json.decode(before) == msgspec.json.decode(after)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Латентность PUT/POST: старый путь (SELECT + commit + refresh) против RETURNING.
+
+Поднимает приложение на временной SQLite-базе дважды - со старыми и с
+текущими репозиториями - и для каждого запроса печатает среднее время
+и число SQL-запросов к БД.
+
+Запуск: python -m scripts.benchmark_writes [--requests N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ["DB_ECHO"] = "false"
+os.environ.pop("DB_REPLICA_URLS", None)
+
+from litestar import Litestar  # noqa: E402
+from litestar.di import Provide  # noqa: E402
+from litestar.testing import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import main as app_main  # noqa: E402
+from app.controllers import (  # noqa: E402
+    OrderController,
+    ProductController,
+    UserController,
+)
+from app.database import engine, provide_session  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import Address, Order, OrderItem, Product, User  # noqa: E402
+from app.repositories import (  # noqa: E402
+    OrderRepository,
+    ProductRepository,
+    UserRepository,
+)
+
+
+class LegacyUserRepository(UserRepository):
+    async def create(self, session, user_data):
+        user = self.model(
+            username=user_data.username,
+            email=user_data.email,
+            description=user_data.description or "",
+        )
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        return user
+
+    async def update(self, session, user_id, user_data):
+        user = await self.get_by_id(session, user_id)
+        if not user:
+            return None
+        for k, v in user_data.model_dump(exclude_unset=True).items():
+            setattr(user, k, v)
+        await session.commit()
+        await session.refresh(user)
+        return user
+
+
+class LegacyProductRepository(ProductRepository):
+    async def update(self, session, product_id, product_data):
+        product = await self.get_by_id(session, product_id)
+        if not product:
+            return None
+        for k, v in product_data.model_dump(exclude_unset=True).items():
+            setattr(product, k, v)
+        await session.commit()
+        await session.refresh(product)
+        return product
+
+
+class LegacyOrderRepository(OrderRepository):
+    async def update_status(self, session, order_id, status):
+        order = await self.get(session, order_id)
+        if not order:
+            return None
+        order.status = status
+        await session.commit()
+        return await self.get(session, order_id)
+
+
+def build_app(user_repo, product_repo, order_repo) -> Litestar:
+    return Litestar(
+        route_handlers=[UserController, ProductController, OrderController],
+        dependencies={
+            "session": Provide(provide_session),
+            "redis_cache": Provide(lambda: None, sync_to_thread=False),
+            "user_repository": Provide(lambda: user_repo, sync_to_thread=False),
+            "product_repository": Provide(lambda: product_repo, sync_to_thread=False),
+            "order_repository": Provide(lambda: order_repo, sync_to_thread=False),
+            "user_service": Provide(
+                app_main.provide_user_service, sync_to_thread=False
+            ),
+            "product_service": Provide(
+                app_main.provide_product_service, sync_to_thread=False
+            ),
+            "order_service": Provide(
+                app_main.provide_order_service, sync_to_thread=False
+            ),
+        },
+    )
+
+
+async def seed() -> dict:
+    await run_migrations(engine)
+    async with engine.begin() as conn:
+        user_id = (
+            await conn.execute(
+                User.__table__.insert().values(
+                    username="bench", email="bench@example.com"
+                )
+            )
+        ).inserted_primary_key[0]
+        address_id = (
+            await conn.execute(
+                Address.__table__.insert().values(
+                    user_id=user_id, street="S", city="C", country="RU"
+                )
+            )
+        ).inserted_primary_key[0]
+        product_id = (
+            await conn.execute(
+                Product.__table__.insert().values(
+                    name="bench", price=10, stock_quantity=10**6
+                )
+            )
+        ).inserted_primary_key[0]
+        order_id = (
+            await conn.execute(
+                Order.__table__.insert().values(
+                    user_id=user_id, address_id=address_id, total_amount=30
+                )
+            )
+        ).inserted_primary_key[0]
+        await conn.execute(
+            OrderItem.__table__.insert(),
+            [
+                {
+                    "order_id": order_id,
+                    "product_id": product_id,
+                    "quantity": 1,
+                    "price_at_purchase": 10,
+                    "total_price": 10,
+                }
+            ]
+            * 3,
+        )
+    return {"user": user_id, "product": product_id, "order": order_id}
+
+
+def run(label: str, app: Litestar, ids: dict, requests: int) -> None:
+    statements = []
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+
+    scenarios = {
+        "POST /users": lambda c, i: c.post(
+            "/users",
+            json={"username": f"{label}{i}", "email": f"{label}{i}@example.com"},
+        ),
+        "PUT /users/{id}": lambda c, i: c.put(
+            f"/users/{ids['user']}", json={"description": f"d{i}"}
+        ),
+        "PUT /products/{id}": lambda c, i: c.put(
+            f"/products/{ids['product']}", json={"price": str(10 + i % 5)}
+        ),
+        "PUT /orders/{id}": lambda c, i: c.put(
+            f"/orders/{ids['order']}", json={"status": f"s{i % 3}"}
+        ),
+    }
+
+    print(f"\n=== {label} ===")
+    with TestClient(app) as client:
+        for name, call in scenarios.items():
+            call(client, -1)  # прогрев
+            timings = []
+            statements.clear()
+            for i in range(requests):
+                started = time.perf_counter()
+                response = call(client, i)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code < 300, response.text
+            print(
+                f"{name:20} mean {statistics.mean(timings):.2f} ms, "
+                f"p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms, "
+                f"{len(statements) / requests:.1f} SQL/request"
+            )
+    event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    ids = asyncio.run(seed())
+    run(
+        "legacy",
+        build_app(
+            LegacyUserRepository(), LegacyProductRepository(), LegacyOrderRepository()
+        ),
+        ids,
+        args.requests,
+    )
+    run(
+        "returning",
+        build_app(UserRepository(), ProductRepository(), OrderRepository()),
+        ids,
+        args.requests,
+    )
+    asyncio.run(engine.dispose())
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
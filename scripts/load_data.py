@@ -4,6 +4,7 @@ from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.migrations import migrate, schema_version
 from app.models import Address, Base, Order, OrderItem, Product, User
 
 DB_URL = "sqlite+aiosqlite:///./lab3.db"
@@ -15,7 +16,8 @@ async def load_data():
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)  # Очищаем перед заполнением
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(schema_version.drop, checkfirst=True)
+        await conn.run_sync(migrate)
 
     async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 
@@ -6,7 +7,9 @@ from litestar import Litestar
 from litestar.di import Provide
 from litestar.testing import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -16,6 +19,7 @@ from app.repositories import OrderRepository, ProductRepository, UserRepository
 from app.services import OrderService, UserService
 
 TEST_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_TEST_DATABASE_URL = "sqlite+aiosqlite://"
 
 
 @pytest.fixture(scope="session")
@@ -42,6 +46,31 @@ def session(engine) -> Session:
         connection.close()
 
 
+@pytest.fixture
+def run_with_async_session():
+    """Запускает корутину с AsyncSession на отдельной in-memory базе"""
+
+    def _run(callback):
+        async def _main():
+            engine = create_async_engine(
+                ASYNC_TEST_DATABASE_URL,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+            )
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            factory = async_sessionmaker(engine, expire_on_commit=False)
+            try:
+                async with factory() as async_session:
+                    return await callback(async_session)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(_main())
+
+    return _run
+
+
 @pytest.fixture
 def user_repository():
     return UserRepository()
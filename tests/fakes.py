@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aio_pika.exceptions import PublishError
+from aiormq.abc import DeliveredMessage
+from pamqp.commands import Basic
+from pamqp.header import ContentHeader
+
+
+class FakeRedis:
+    """Минимальная in-memory замена redis.asyncio.Redis для тестов"""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.calls = 0
+        self.published: List[Tuple[str, str]] = []
+
+    def _alive(self, key: str) -> bool:
+        if key not in self.data:
+            return False
+        _, expires_at = self.data[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return False
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        self.calls += 1
+        return self.data[key][0] if self._alive(key) else None
+
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        self.calls += 1
+        return [self.data[key][0] if self._alive(key) else None for key in keys]
+
+    async def set(
+        self,
+        key: str,
+        value,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+    ) -> Optional[bool]:
+        self.calls += 1
+        if nx and self._alive(key):
+            return None
+        ttl = ex if ex else (px / 1000 if px else None)
+        self.data[key] = (value, time.monotonic() + ttl if ttl else None)
+        return True
+
+    async def incr(self, key: str) -> int:
+        self.calls += 1
+        value = int(self.data[key][0]) + 1 if self._alive(key) else 1
+        self.data[key] = (str(value), None)
+        return value
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    async def delete(self, *keys: str) -> int:
+        self.calls += 1
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.calls += 1
+        self.published.append((channel, message))
+        return 1
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    def set(self, *args, **kwargs) -> None:
+        self.commands.append(("set", args, kwargs))
+
+    async def execute(self) -> list:
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.commands.clear()
+        return results
+
+
+class FakeExchange:
+    def __init__(self, channel) -> None:
+        self.channel = channel
+
+    async def publish(self, message, routing_key, timeout=None):
+        await asyncio.sleep(0)
+        if routing_key not in self.channel.connection.queues:
+            # Как RabbitMQ: сообщение без очереди возвращается basic.return
+            returned = Basic.Return(312, "NO_ROUTE", "", routing_key)
+            delivered = DeliveredMessage(returned, ContentHeader(), b"", None)
+            if self.channel.on_return_raises:
+                raise PublishError(delivered, returned)
+            return
+        self.channel.published.append((routing_key, message))
+
+
+class FakeChannel:
+    def __init__(self, connection, on_return_raises: bool) -> None:
+        self.connection = connection
+        self.on_return_raises = on_return_raises
+        self.published = []
+        self.is_closed = False
+        self.default_exchange = FakeExchange(self)
+
+    async def declare_queue(self, name, durable=False):
+        self.connection.queues[name] = durable
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class FakeConnection:
+    """Соединение aio-pika: каналы и объявленные очереди (имя -> durable)"""
+
+    def __init__(self) -> None:
+        self.connected = asyncio.Event()
+        self.connected.set()
+        self.channels = []
+        self.queues: Dict[str, bool] = {}
+
+    async def channel(self, publisher_confirms=True, on_return_raises=False):
+        channel = FakeChannel(self, on_return_raises)
+        self.channels.append(channel)
+        return channel
+
+
+class FakeBroker:
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.connect_calls = 0
+        self.stopped = False
+        self.connection = None
+
+    async def connect(self):
+        self.connect_calls += 1
+        await asyncio.sleep(0.01)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker down")
+        self.connection = FakeConnection()
+        return self.connection
+
+    async def stop(self) -> None:
+        self.stopped = True
@@ -0,0 +1,129 @@
+import asyncio
+
+import redis
+
+from app.cache.circuit_breaker import CircuitBreaker, CircuitState, Permit
+from app.cache.redis_client import RedisCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class BrokenRedis:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        raise redis.ConnectionError("redis is down")
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=2, recovery_timeout=10, clock=clock
+        )
+
+        breaker.record_failure()
+        assert breaker.state is CircuitState.CLOSED
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        assert not breaker.allow_request()
+
+        clock.now = 11
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow_request()
+        # Пока пробный запрос не завершён, остальные отбрасываются
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["times_opened"] == 1
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, recovery_timeout=5, clock=clock
+        )
+        breaker.record_failure()
+        clock.now = 6
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.stats()["times_opened"] == 2
+
+    def test_cache_skips_redis_when_open(self):
+        client = BrokenRedis()
+        cache = RedisCache(
+            client, CircuitBreaker("redis", failure_threshold=3, recovery_timeout=60)
+        )
+
+        async def _run():
+            for _ in range(10):
+                assert await cache.get("product:1") is None
+
+        asyncio.run(_run())
+        assert client.calls == 3
+        assert cache.stats()["circuit_breaker"]["short_circuited"] == 7
+
+    def test_cancelled_call_is_not_a_failure(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "redis", failure_threshold=1, recovery_timeout=5, clock=clock
+        )
+        breaker.record_failure()
+        clock.now = 6
+
+        class SlowRedis:
+            async def get(self, key):
+                await asyncio.sleep(10)
+
+        cache = RedisCache(SlowRedis(), breaker)
+
+        async def _run():
+            # Пробный запрос отменён - например, клиент закрыл соединение
+            task = asyncio.create_task(cache.get("product:1"))
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(_run())
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.stats()["times_opened"] == 1
+        # Слот пробы освобождён: следующий запрос может проверить Redis
+        assert breaker.allow_request()
+
+    def test_cancelled_non_probe_call_keeps_probe_slot(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "redis", failure_threshold=1, recovery_timeout=5, clock=clock
+        )
+        started = asyncio.Event()
+
+        class SlowRedis:
+            async def get(self, key):
+                started.set()
+                await asyncio.sleep(10)
+
+        cache = RedisCache(SlowRedis(), breaker)
+
+        async def _run():
+            # Запрос начат при CLOSED, пока он висит - breaker открылся
+            task = asyncio.create_task(cache.get("product:1"))
+            await started.wait()
+            breaker.record_failure()
+            clock.now = 6
+            assert breaker.allow_request() is Permit.PROBE
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(_run())
+        # Отменённый запрос не был пробным - чужую пробу не освобождает
+        assert breaker.allow_request() is Permit.DENIED
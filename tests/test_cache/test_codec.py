@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from app.cache.codec import CODEC_VERSION, FLAG_ZLIB, BinaryCodec, create_codec
+from app.cache.redis_client import RedisCache
+from tests.fakes import FakeRedis
+
+VALUE = json.dumps(
+    {
+        "id": 1,
+        "name": "Товар",
+        "description": "Описание " * 200,
+        "price": "12.50",
+        "stock_quantity": 3,
+        "created_at": "2026-01-02T03:04:05.123456",
+    },
+    ensure_ascii=False,
+    separators=(",", ":"),
+)
+
+
+class TestBinaryCodec:
+    @pytest.mark.parametrize("payload_format", ["json", "msgpack"])
+    def test_round_trip_is_exact(self, payload_format):
+        codec = BinaryCodec(payload_format, compress_threshold=0)
+        encoded = codec.encode(VALUE)
+
+        assert encoded[0] == CODEC_VERSION
+        assert not encoded[1] & FLAG_ZLIB
+        assert codec.decode(encoded) == VALUE
+
+    def test_large_values_are_compressed(self):
+        codec = BinaryCodec(compress_threshold=256)
+        encoded = codec.encode(VALUE)
+
+        assert encoded[1] & FLAG_ZLIB
+        assert len(encoded) < len(VALUE.encode()) / 4
+        assert codec.decode(encoded) == VALUE
+        assert not codec.encode('{"id":1}')[1] & FLAG_ZLIB
+
+    def test_foreign_formats_are_rejected(self):
+        codec = BinaryCodec()
+
+        assert codec.decode(VALUE.encode()) is None
+        assert codec.decode(bytes((CODEC_VERSION + 1, 0)) + b"{}") is None
+        assert codec.decode(bytes((CODEC_VERSION, FLAG_ZLIB)) + b"garbage") is None
+        assert codec.rejected == 3
+
+    def test_unknown_codec_name(self):
+        with pytest.raises(ValueError):
+            create_codec("pickle")
+
+
+class TestRedisCacheCodec:
+    def test_values_pass_through_codec(self):
+        fake = FakeRedis()
+        cache = RedisCache(fake, codec=BinaryCodec(compress_threshold=256))
+
+        async def _run():
+            await cache.set("product:1", VALUE, 60)
+            assert isinstance(fake.data["product:1"][0], bytes)
+            assert await cache.get("product:1") == VALUE
+
+            # Запись старого текстового формата - промах, значение перезагружается
+            fake.data["product:2"] = ('{"id": 2}', None)
+
+            async def loader():
+                return '{"id":2,"fresh":true}'
+
+            assert await cache.get_or_load("product:2", loader, 60) == (
+                '{"id":2,"fresh":true}'
+            )
+
+        asyncio.run(_run())
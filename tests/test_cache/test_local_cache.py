@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from app.cache.local_cache import LocalCache
+from app.cache.redis_client import RedisCache
+from tests.fakes import FakeRedis
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLocalCache:
+    def test_lru_eviction_by_entries(self):
+        cache = LocalCache(max_entries=2, max_bytes=1000, ttl=60)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        assert cache.evictions == 1
+
+    def test_eviction_by_bytes(self):
+        cache = LocalCache(max_entries=100, max_bytes=10, ttl=60)
+        cache.set("a", "x" * 6)
+        cache.set("b", "y" * 6)
+
+        assert cache.get("a") is None
+        assert cache.size_bytes == 6
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = LocalCache(max_entries=10, max_bytes=1000, ttl=30, clock=clock)
+        cache.set("a", "1", ttl=5)
+        clock.now = 6
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestTwoTierCache:
+    def test_local_tier_serves_hot_keys_and_invalidation_is_published(self):
+        fake = FakeRedis()
+        cache = RedisCache(fake, local=LocalCache(max_entries=10, ttl=60))
+
+        async def _run():
+            await fake.set("product:1", '{"id": 1}')
+            assert await cache.get("product:1") == '{"id": 1}'
+            calls = fake.calls
+            assert await cache.get("product:1") == '{"id": 1}'
+            assert fake.calls == calls
+
+            await cache.delete("product:1")
+            assert cache.local.get("product:1") is None
+            channel, message = fake.published[-1]
+            assert channel == cache.invalidation_channel
+            assert json.loads(message) == ["product:1"]
+
+        asyncio.run(_run())
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from app.cache.redis_client import RedisCache
+from app.cache.single_flight import SingleFlight
+from tests.fakes import FakeRedis
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_load(self):
+        flight = SingleFlight()
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def _run():
+            return await asyncio.gather(*(flight.do("k", loader) for _ in range(10)))
+
+        results = asyncio.run(_run())
+        assert results == ["value"] * 10
+        assert loads == 1
+        assert flight.stats()["coalesced"] == 9
+        assert flight.coalescing_ratio == 0.9
+
+    def test_errors_propagate_to_waiters(self):
+        flight = SingleFlight()
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def _run():
+            return await asyncio.gather(
+                *(flight.do("k", loader) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(_run())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        flight = SingleFlight()
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.02)
+            return "value"
+
+        async def _run():
+            leader = asyncio.create_task(flight.do("k", loader))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.do("k", loader)) for _ in range(3)]
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            return leader, results
+
+        leader, results = asyncio.run(_run())
+        assert leader.cancelled()
+        assert results == ["value"] * 3
+        # Один из ожидающих перезапустил загрузку, остальные дождались его
+        assert loads == 2
+        assert flight.stats()["coalesced"] == 2
+        assert flight.stats()["leader_cancellations"] == 1
+
+
+class TestGetOrLoad:
+    def test_miss_loads_once_and_caches(self):
+        fake = FakeRedis()
+        cache = RedisCache(fake)
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.01)
+            return '{"id": 1}'
+
+        async def _run():
+            results = await asyncio.gather(
+                *(cache.get_or_load("product:1", loader, 60) for _ in range(5))
+            )
+            assert results == ['{"id": 1}'] * 5
+            assert await cache.get_or_load("product:1", loader, 60) == '{"id": 1}'
+
+        asyncio.run(_run())
+        assert loads == 1
+        assert "lock:product:1" not in fake.data
+
+    def test_waits_for_other_process_holding_lock(self):
+        fake = FakeRedis()
+        cache = RedisCache(fake)
+
+        async def loader():
+            raise AssertionError("must not load while another process holds the lock")
+
+        async def other_process():
+            await asyncio.sleep(0.05)
+            await fake.set("product:2", "from-other-process", ex=60)
+
+        async def _run():
+            await fake.set("lock:product:2", "other-token", px=5000)
+            task = asyncio.create_task(other_process())
+            value = await cache.get_or_load("product:2", loader, 60)
+            await task
+            return value
+
+        assert asyncio.run(_run()) == "from-other-process"
+        assert cache.lock_wait_hits == 1
+
+    def test_stale_value_served_while_revalidating(self):
+        fake = FakeRedis()
+        cache = RedisCache(fake, stale_ttl=60)
+
+        async def loader():
+            return "fresh"
+
+        async def _run():
+            await fake.set("product:3", "stale", ex=60)
+            await fake.set("product:3:meta", f"{time.time() - 1}:0.01", ex=60)
+            # Лок держит другой процесс - получаем устаревшее значение сразу
+            await fake.set("lock:product:3", "other-token", px=5000)
+            assert await cache.get_or_load("product:3", loader, 60) == "stale"
+
+            await fake.delete("lock:product:3")
+            assert await cache.get_or_load("product:3", loader, 60) == "fresh"
+            assert await cache.get_or_load("product:3", loader, 60) == "fresh"
+
+        asyncio.run(_run())
+        assert cache.stale_served == 2
@@ -68,3 +68,55 @@ def test_create_user_validation(test_client):
     )
     # Должна быть ошибка валидации
     assert response.status_code == 400
+
+
+def test_get_users_with_cursor(test_client):
+    for i in range(3):
+        test_client.post(
+            "/users",
+            json={"username": f"cursor_user_{i}", "email": f"cursor{i}@example.com"},
+        )
+
+    first = test_client.get("/users?cursor=&count=2")
+    assert first.status_code == 200
+    first_page = first.json()
+    assert len(first_page["items"]) == 2
+    assert first_page["next_cursor"]
+
+    second = test_client.get(f"/users?count=2&cursor={first_page['next_cursor']}")
+    second_page = second.json()
+    first_ids = {user["id"] for user in first_page["items"]}
+    assert all(user["id"] not in first_ids for user in second_page["items"])
+    assert second_page["next_cursor"] is None
+
+
+def test_get_users_with_invalid_cursor(test_client):
+    response = test_client.get("/users?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_get_user_conditional(test_client):
+    created = test_client.post(
+        "/users",
+        json={"username": "api_user_etag", "email": "api_etag@example.com"},
+    ).json()
+    url = f"/users/{created['id']}"
+
+    first = test_client.get(url)
+    etag = first.headers["etag"]
+    last_modified = first.headers["last-modified"]
+    assert first.status_code == 200
+
+    cached = test_client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    since = test_client.get(url, headers={"If-Modified-Since": last_modified})
+    assert since.status_code == 304
+
+    test_client.put(url, json={"description": "changed"})
+    changed = test_client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["description"] == "changed"
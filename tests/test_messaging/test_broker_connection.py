@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from aio_pika.exceptions import PublishError
+
+from app.messaging.producer import BrokerConnection
+from tests.fakes import FakeBroker
+
+
+class TestBrokerConnection:
+    def test_concurrent_first_publishes_connect_once(self):
+        broker = FakeBroker()
+        connection = BrokerConnection(broker, channel_pool_size=3)
+
+        async def _run():
+            await asyncio.gather(*(connection.ensure_connected() for _ in range(20)))
+            events = [("order", {"order_id": i}) for i in range(6)]
+            results = await connection.publish_batch(
+                events, [f"outbox-{i}" for i in range(6)], persist=True
+            )
+            assert results == [None] * 6
+            await connection.close()
+
+        asyncio.run(_run())
+        assert broker.connect_calls == 1
+        # Публикации распределены по каналам пула по кругу
+        channels = broker.connection.channels
+        assert [len(channel.published) for channel in channels] == [2, 2, 2]
+        queue, message = channels[0].published[0]
+        assert queue == "order"
+        assert message.body == b'{"order_id":0}'
+        assert message.message_id == "outbox-0"
+        assert message.delivery_mode == 2
+        assert broker.stopped and all(channel.is_closed for channel in channels)
+
+    def test_reconnects_in_background_and_fails_fast_meanwhile(self):
+        broker = FakeBroker(failures=2)
+        connection = BrokerConnection(broker, channel_pool_size=1, reconnect_delay=0.01)
+
+        async def _run():
+            await connection.start()
+            assert connection.reconnecting
+            calls = broker.connect_calls
+            # Публикация не запускает своё подключение, пока идут повторы
+            with pytest.raises(ConnectionError):
+                await connection.publish_batch([("order", {})])
+            assert broker.connect_calls == calls
+
+            await asyncio.sleep(0.1)
+            assert connection.connected
+            assert broker.connect_calls == 3
+            assert await connection.publish_batch([("order", {})]) == [None]
+
+            # Обрыв: aio-pika восстанавливает соединение, публикации ждать не будут
+            broker.connection.connected.clear()
+            with pytest.raises(ConnectionError):
+                await connection.publish_batch([("order", {})])
+            await connection.close()
+
+        asyncio.run(_run())
+        assert connection.stats()["connect_failures"] == 2
+        assert connection.stats()["connects"] == 1
+
+    def test_closed_channel_is_reopened(self):
+        broker = FakeBroker()
+        connection = BrokerConnection(broker, channel_pool_size=1)
+
+        async def _run():
+            await connection.start()
+            broker.connection.channels[0].is_closed = True
+            assert await connection.publish_batch([("products", {})]) == [None]
+            await connection.close()
+
+        asyncio.run(_run())
+        assert len(broker.connection.channels) == 2
+        assert broker.connection.channels[1].published[0][0] == "products"
+
+    def test_returned_message_is_a_publish_error(self):
+        broker = FakeBroker()
+        connection = BrokerConnection(broker, channel_pool_size=2)
+
+        async def _run():
+            results = await connection.publish_batch(
+                [("order", {}), ("missing", {}), ("products", {})]
+            )
+            await connection.close()
+            return results
+
+        first, returned, last = asyncio.run(_run())
+        assert first is None and last is None
+        # Очереди нет - брокер вернул сообщение, а не подтвердил доставку
+        assert isinstance(returned, PublishError)
+        assert "NO_ROUTE" in str(returned)
+        assert broker.connection.queues == {"order": True, "products": True}
+        assert all(channel.on_return_raises for channel in broker.connection.channels)
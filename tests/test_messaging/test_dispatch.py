@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+from faststream.rabbit import TestRabbitBroker
+
+from app.messaging.dispatch import make_dispatcher
+
+
+class TestDispatch:
+    def test_limits_in_flight_handlers(self):
+        active = 0
+        peak = 0
+
+        async def handler(message):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        dispatch = make_dispatcher(handler, max_in_flight=3)
+
+        async def _run():
+            await asyncio.gather(*(dispatch(i) for i in range(10)))
+
+        asyncio.run(_run())
+        assert peak == 3
+
+    def test_batches_by_size_and_linger(self):
+        batches = []
+
+        async def batch_handler(messages):
+            batches.append(messages)
+
+        dispatch = make_dispatcher(
+            None, batch_handler, max_in_flight=2, batch_size=4, linger=0.02
+        )
+
+        async def _run():
+            # Каждое сообщение ждёт обработки своей пачки (подтверждение после неё)
+            await asyncio.gather(*(dispatch(i) for i in range(10)))
+
+        asyncio.run(_run())
+        assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+    def test_batch_error_fails_every_message(self):
+        async def batch_handler(messages):
+            raise RuntimeError("handler failed")
+
+        dispatch = make_dispatcher(None, batch_handler, batch_size=2, linger=0.01)
+
+        async def _run():
+            return await asyncio.gather(
+                dispatch(1), dispatch(2), dispatch(3), return_exceptions=True
+            )
+
+        results = asyncio.run(_run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_consumer_subscribers_accept_messages(self):
+        from app.messaging.consumer import CONSUMER_PREFETCH, broker, consume_order
+
+        async def _run():
+            async with TestRabbitBroker(broker):
+                await broker.publish(
+                    {
+                        "order_id": 1,
+                        "user_id": 2,
+                        "status": "pending",
+                        "total_amount": "10.00",
+                        "created_at": datetime.now().isoformat(),
+                    },
+                    queue="order",
+                )
+                consume_order.mock.assert_called_once()
+                assert Decimal(consume_order.mock.call_args[0][0]["total_amount"]) == (
+                    Decimal("10.00")
+                )
+
+        asyncio.run(_run())
+        assert [s.channel.prefetch_count for s in broker.subscribers] == [
+            CONSUMER_PREFETCH,
+            CONSUMER_PREFETCH,
+        ]
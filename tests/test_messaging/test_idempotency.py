@@ -0,0 +1,194 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from faststream.rabbit import TestRabbitBroker
+from faststream.rabbit.message import RabbitMessage
+
+from app.messaging.idempotency import (
+    DONE,
+    Idempotency,
+    InProgressError,
+    RedisDedupStore,
+    SqliteDedupStore,
+    dedup_key,
+)
+from tests.fakes import FakeRedis
+
+
+class FailingStore:
+    name = "failing"
+
+    async def claim(self, key, lease):
+        raise ConnectionError("store down")
+
+
+class TestIdempotency:
+    def test_duplicate_is_acknowledged_without_handler(self):
+        fake = FakeRedis()
+        idempotency = Idempotency(RedisDedupStore(fake))
+        handled = []
+
+        async def handler(message):
+            handled.append(message)
+
+        async def _run():
+            key = dedup_key("order", 1, "outbox-7")
+            assert await idempotency.run(key, handler, "first") is True
+            assert await idempotency.run(key, handler, "redelivered") is False
+            assert fake.data[key][0] == DONE
+
+            # Другой процесс без локального кеша узнаёт дубликат из Redis
+            other = Idempotency(RedisDedupStore(fake))
+            assert await other.run(key, handler, "other worker") is False
+            calls = fake.calls
+            assert await other.run(key, handler, "again") is False
+            assert fake.calls == calls  # отсеян in-process кешем
+
+        asyncio.run(_run())
+        assert handled == ["first"]
+        assert idempotency.stats()["duplicates"] == 1
+
+    def test_failed_handler_releases_key(self):
+        fake = FakeRedis()
+        idempotency = Idempotency(RedisDedupStore(fake))
+        attempts = []
+
+        async def handler(message):
+            attempts.append(message)
+            if len(attempts) == 1:
+                raise RuntimeError("handler failed")
+
+        async def _run():
+            key = dedup_key("products", 5)
+            with pytest.raises(RuntimeError):
+                await idempotency.run(key, handler, "first")
+            assert key not in fake.data
+            assert await idempotency.run(key, handler, "retry") is True
+
+        asyncio.run(_run())
+        assert attempts == ["first", "retry"]
+
+    def test_in_progress_duplicate_is_not_acknowledged(self):
+        fake = FakeRedis()
+        idempotency = Idempotency(RedisDedupStore(fake))
+
+        async def handler(message):
+            raise AssertionError("handler must not run")
+
+        async def _run():
+            key = dedup_key("order", 2, "outbox-9")
+            await fake.set(key, "processing", ex=60)
+            with pytest.raises(InProgressError):
+                await idempotency.run(key, handler, "copy")
+            assert idempotency.local.get(key) is None
+
+        asyncio.run(_run())
+        assert idempotency.stats()["in_progress"] == 1
+        assert idempotency.stats()["duplicates"] == 0
+
+    def test_crashed_handler_runs_on_redelivery_after_lease(self):
+        fake = FakeRedis()
+        store = RedisDedupStore(fake)
+        idempotency = Idempotency(store, lease=300)
+        handled = []
+
+        async def handler(message):
+            handled.append(message)
+
+        async def _run():
+            key = dedup_key("order", 4, "outbox-11")
+            # Воркер захватил ключ и упал, не завершив обработку
+            assert await store.claim(key, 300) is None
+
+            # Повторная доставка до истечения lease возвращается в очередь
+            with pytest.raises(InProgressError):
+                await idempotency.run(key, handler, "redelivered")
+            assert handled == []
+
+            # lease истёк - следующая доставка обрабатывается
+            value, _ = fake.data[key]
+            fake.data[key] = (value, time.monotonic() - 1)
+            assert await idempotency.run(key, handler, "redelivered") is True
+            assert fake.data[key][0] == DONE
+
+        asyncio.run(_run())
+        assert handled == ["redelivered"]
+
+    def test_unavailable_store_processes_message(self):
+        idempotency = Idempotency(FailingStore())
+        handled = []
+
+        async def handler(message):
+            handled.append(message)
+
+        async def _run():
+            assert await idempotency.run("dedup:order:3", handler, "m") is True
+
+        asyncio.run(_run())
+        assert handled == ["m"]
+        assert idempotency.stats()["unchecked"] == 1
+
+    def test_sqlite_store_survives_restart_and_expires(self, tmp_path):
+        path = str(tmp_path / "dedup.db")
+
+        async def handler(message):
+            pass
+
+        async def _run():
+            store = SqliteDedupStore(path)
+            assert await Idempotency(store).run("dedup:order:1", handler, "m")
+            assert await store.claim("dedup:order:2", lease=-1) is None
+            await store.close()
+
+            # Перезапуск: новый процесс, тот же файл
+            store = SqliteDedupStore(path)
+            assert await store.claim("dedup:order:1", lease=60) == DONE
+            # Истёкший захват упавшего воркера можно захватить снова
+            assert await store.claim("dedup:order:2", lease=60) is None
+            assert await store.claim("dedup:order:2", lease=60) == "processing"
+            await store.close()
+
+        asyncio.run(_run())
+
+    def test_consumer_skips_redelivered_event(self, monkeypatch):
+        from app.messaging import consumer
+
+        handled = []
+        nacks = []
+
+        async def dispatch(msg):
+            handled.append(msg.order_id)
+
+        real_nack = RabbitMessage.nack
+
+        async def nack(self, *args, **kwargs):
+            nacks.append(kwargs)
+            await real_nack(self, *args, **kwargs)
+
+        fake = FakeRedis()
+        monkeypatch.setattr(consumer, "idempotency", Idempotency(RedisDedupStore(fake)))
+        monkeypatch.setattr(consumer, "_dispatch_order", dispatch)
+        monkeypatch.setattr(consumer, "CONSUMER_DEDUP_REQUEUE_DELAY", 0)
+        monkeypatch.setattr(RabbitMessage, "nack", nack)
+        message = {
+            "order_id": 10,
+            "user_id": 2,
+            "status": "pending",
+            "total_amount": "10.00",
+            "created_at": datetime.now().isoformat(),
+        }
+
+        async def _run():
+            async with TestRabbitBroker(consumer.broker) as broker:
+                for message_id in ("outbox-1", "outbox-1", "outbox-2"):
+                    await broker.publish(message, queue="order", message_id=message_id)
+
+                # Ключ захвачен упавшим воркером - сообщение возвращается в очередь
+                await fake.set(dedup_key("order", 10, "outbox-3"), "processing", ex=60)
+                await broker.publish(message, queue="order", message_id="outbox-3")
+
+        asyncio.run(_run())
+        assert handled == [10, 10]
+        assert nacks == [{"requeue": True}]
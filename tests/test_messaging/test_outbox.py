@@ -0,0 +1,288 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.messaging.outbox import OutboxRelay
+from app.messaging.producer import BrokerConnection
+from app.models import Address, Base, OutboxEvent, Product, User
+from app.repositories import OrderRepository, ProductRepository
+from app.schemas import OrderCreate, OrderItemCreate, ProductCreate
+from tests.fakes import FakeBroker
+
+
+class RecordingSender:
+    def __init__(self, fail_ids=(), error=ValueError("message rejected")) -> None:
+        self.calls = []
+        self.fail_ids = set(fail_ids)
+        self.error = error
+
+    async def __call__(self, events, message_ids):
+        self.calls.append(list(zip(message_ids, events)))
+        return [
+            self.error if message_id in self.fail_ids else None
+            for message_id in message_ids
+        ]
+
+
+def _run_with_factory(callback):
+    async def _main():
+        engine = create_async_engine(
+            "sqlite+aiosqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            return await callback(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(_main())
+
+
+async def _events(session):
+    result = await session.execute(select(OutboxEvent).order_by(OutboxEvent.id))
+    return result.scalars().all()
+
+
+class TestTransactionalOutbox:
+    def test_events_are_written_with_the_change(self, run_with_async_session):
+        async def _run(session):
+            user = User(username="outbox", email="outbox@example.com")
+            session.add(user)
+            await session.flush()
+            address = Address(user_id=user.id, street="S", city="C", country="X")
+            session.add(address)
+            await session.commit()
+
+            product = await ProductRepository().create(
+                session,
+                ProductCreate(name="Boxed", price=Decimal("5.00"), stock_quantity=3),
+            )
+            order = await OrderRepository().create(
+                session,
+                OrderCreate(
+                    user_id=user.id,
+                    address_id=address.id,
+                    items=[OrderItemCreate(product_id=product.id, quantity=2)],
+                ),
+            )
+            created = await OrderRepository().create_many(
+                session,
+                [
+                    OrderCreate(
+                        user_id=user.id,
+                        address_id=address.id,
+                        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+                    ),
+                    # Отклонённый заказ события не создаёт
+                    OrderCreate(
+                        user_id=user.id,
+                        address_id=address.id,
+                        items=[OrderItemCreate(product_id=product.id, quantity=5)],
+                    ),
+                ],
+            )
+            with pytest.raises(ValueError):
+                await OrderRepository().create(
+                    session,
+                    OrderCreate(
+                        user_id=user.id,
+                        address_id=address.id,
+                        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+                    ),
+                )
+
+            events = await _events(session)
+            assert [(event.queue, event.sent_at) for event in events] == [
+                ("products", None),
+                ("order", None),
+                ("order", None),
+            ]
+            assert events[0].payload["product_id"] == product.id
+            assert events[0].payload["price"] == "5.00"
+            assert events[1].payload["order_id"] == order.id
+            assert events[1].payload["total_amount"] == "10.00"
+            assert events[2].payload["order_id"] == created[0].id
+            assert isinstance(created[1], ValueError)
+
+        run_with_async_session(_run)
+
+    def test_relay_marks_sent_and_retries_failed(self):
+        async def _run(factory):
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent),
+                    [{"queue": "order", "payload": {"order_id": i}} for i in range(5)],
+                )
+                await session.commit()
+
+            sender = RecordingSender(fail_ids={"outbox-2"})
+            relay = OutboxRelay(factory, sender, batch_size=3)
+
+            assert await relay.relay_once() == (3, 2)
+            assert [message_id for message_id, _ in sender.calls[0]] == [
+                "outbox-1",
+                "outbox-2",
+                "outbox-3",
+            ]
+            assert sender.calls[0][0][1] == ("order", {"order_id": 0})
+
+            sender.fail_ids.clear()
+            assert await relay.relay_once() == (3, 3)
+            # Неотправленное событие повторяется первым
+            assert [message_id for message_id, _ in sender.calls[1]] == [
+                "outbox-2",
+                "outbox-4",
+                "outbox-5",
+            ]
+            assert await relay.relay_once() == (0, 0)
+
+            async with factory() as session:
+                events = await _events(session)
+            assert all(event.sent_at is not None for event in events)
+            assert [event.attempts for event in events] == [0, 1, 0, 0, 0]
+            assert relay.stats()["published"] == 5
+            assert relay.stats()["failed"] == 1
+
+        _run_with_factory(_run)
+
+    def test_broker_outage_does_not_count_attempts(self):
+        async def _run(factory):
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent),
+                    [{"queue": "order", "payload": {"order_id": i}} for i in range(2)],
+                )
+                await session.commit()
+
+            sender = RecordingSender(
+                fail_ids={"outbox-1", "outbox-2"}, error=ConnectionError("down")
+            )
+            relay = OutboxRelay(factory, sender, max_attempts=1)
+            for _ in range(3):
+                assert await relay.relay_once() == (2, 0)
+                assert relay.broker_unavailable
+
+            async with factory() as session:
+                events = await _events(session)
+            assert [(event.attempts, event.dead_at) for event in events] == [
+                (0, None),
+                (0, None),
+            ]
+            assert relay.stats()["dead_lettered"] == 0
+
+        _run_with_factory(_run)
+
+    def test_rejected_event_is_parked_without_blocking_others(self):
+        async def _run(factory):
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent), [{"queue": "missing", "payload": {}}]
+                )
+                await session.commit()
+
+            sender = RecordingSender(fail_ids={"outbox-1"})
+            # Пауза после ошибки больше времени теста: отказ события её не вызывает
+            relay = OutboxRelay(
+                factory, sender, poll_interval=0.01, retry_delay=10, max_attempts=3
+            )
+            relay.start()
+            await asyncio.sleep(0.02)
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent),
+                    [{"queue": "order", "payload": {"order_id": i}} for i in range(2)],
+                )
+                await session.commit()
+            await asyncio.sleep(0.2)
+            await relay.stop()
+
+            async with factory() as session:
+                poison, *healthy = await _events(session)
+            assert all(event.sent_at is not None for event in healthy)
+            assert poison.sent_at is None and poison.dead_at is not None
+            assert poison.attempts == 3
+            assert "message rejected" in poison.last_error
+            assert relay.stats()["dead_lettered"] == 1
+            # Отложенное событие больше не выбирается
+            assert await relay.relay_once() == (0, 0)
+            assert len([call for call in sender.calls if call[0][0] == "outbox-1"]) == 3
+
+        _run_with_factory(_run)
+
+    def test_returned_message_is_retried_then_dead_lettered(self):
+        async def _run(factory):
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent),
+                    [
+                        {"queue": "missing", "payload": {}},
+                        {"queue": "order", "payload": {"order_id": 1}},
+                    ],
+                )
+                await session.commit()
+
+            connection = BrokerConnection(FakeBroker(), channel_pool_size=1)
+
+            async def sender(events, message_ids):
+                return await connection.publish_batch(events, message_ids, True)
+
+            relay = OutboxRelay(factory, sender, max_attempts=2)
+            # Возврат брокера - отказ события, а не успешная отправка
+            assert await relay.relay_once() == (2, 1)
+            assert not relay.broker_unavailable
+            assert await relay.relay_once() == (1, 0)
+            assert relay.stats()["dead_lettered"] == 1
+            assert await relay.relay_once() == (0, 0)
+            await connection.close()
+
+            async with factory() as session:
+                returned, delivered = await _events(session)
+            assert returned.sent_at is None and returned.dead_at is not None
+            assert returned.attempts == 2
+            assert "NO_ROUTE" in returned.last_error
+            assert delivered.sent_at is not None
+
+        _run_with_factory(_run)
+
+    def test_background_relay_and_purge(self):
+        async def _run(factory):
+            sender = RecordingSender()
+            relay = OutboxRelay(
+                factory,
+                sender,
+                poll_interval=10,
+                retention=timedelta(hours=1),
+            )
+            relay.start()
+            await asyncio.sleep(0.05)
+
+            async with factory() as session:
+                await session.execute(
+                    insert(OutboxEvent), [{"queue": "products", "payload": {}}]
+                )
+                await session.commit()
+            # notify() будит relay, не дожидаясь интервала опроса
+            relay.notify()
+            await asyncio.sleep(0.1)
+            assert [message_id for message_id, _ in sender.calls[-1]] == ["outbox-1"]
+            await relay.stop()
+            assert not relay.running
+
+            async with factory() as session:
+                await session.execute(
+                    update(OutboxEvent).values(
+                        sent_at=datetime.now() - timedelta(hours=2)
+                    )
+                )
+                await session.commit()
+            assert await relay.purge() == 1
+
+        _run_with_factory(_run)
@@ -0,0 +1,139 @@
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.models import Address, Product, User
+from app.repositories import OrderRepository, ProductRepository, UserRepository
+from app.schemas import (
+    OrderCreate,
+    OrderItemCreate,
+    ProductCreate,
+    ProductUpdate,
+    UserCreate,
+    UserUpdate,
+)
+
+
+def _record_statements(session) -> list:
+    statements = []
+    event.listen(
+        session.bind.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement.split()[0]),
+    )
+    return statements
+
+
+class TestAsyncRepositories:
+    def test_user_crud(self, run_with_async_session, user_repository: UserRepository):
+        async def _run(session):
+            user = await user_repository.create(
+                session, UserCreate(username="async_user", email="async@example.com")
+            )
+            found = await user_repository.get_by_id(session, user.id)
+            assert found.username == "async_user"
+
+            users = await user_repository.get_by_filter(session, username="async_user")
+            assert len(users) == 1
+
+            await user_repository.delete(session, user.id)
+            assert await user_repository.get_by_id(session, user.id) is None
+
+        run_with_async_session(_run)
+
+    def test_concurrent_reads(
+        self, run_with_async_session, product_repository: ProductRepository
+    ):
+        async def _run(session):
+            product = await product_repository.create(
+                session,
+                ProductCreate(name="Async Product", price=Decimal("10.00")),
+            )
+            results = await asyncio.gather(
+                product_repository.get_by_id(session, product.id),
+                product_repository.get_list(session, count=10, page=1),
+            )
+            assert results[0].name == "Async Product"
+            assert len(results[1]) == 1
+
+        run_with_async_session(_run)
+
+    def test_order_lifecycle(
+        self, run_with_async_session, order_repository: OrderRepository
+    ):
+        async def _run(session):
+            user = User(username="async_order_user", email="async_order@example.com")
+            session.add(user)
+            await session.flush()
+            address = Address(
+                user_id=user.id, street="Street", city="City", country="Country"
+            )
+            product = Product(
+                name="Async Order Product", price=Decimal("5.00"), stock_quantity=3
+            )
+            session.add_all([address, product])
+            await session.commit()
+
+            order = await order_repository.create(
+                session,
+                OrderCreate(
+                    user_id=user.id,
+                    address_id=address.id,
+                    items=[OrderItemCreate(product_id=product.id, quantity=2)],
+                ),
+            )
+            assert order.total_amount == Decimal("10.00")
+            assert len(order.items) == 1
+
+            updated = await order_repository.update_status(session, order.id, "shipped")
+            assert updated.status == "shipped"
+
+            assert await order_repository.delete(session, order.id)
+            await session.refresh(product)
+            assert product.stock_quantity == 3
+
+        run_with_async_session(_run)
+
+    def test_writes_use_returning(
+        self,
+        run_with_async_session,
+        user_repository: UserRepository,
+        product_repository: ProductRepository,
+    ):
+        async def _run(session):
+            statements = _record_statements(session)
+            user = await user_repository.create(
+                session, UserCreate(username="ret_user", email="ret@example.com")
+            )
+            assert user.id is not None and user.created_at is not None
+            assert statements == ["INSERT"]
+
+            statements.clear()
+            updated = await user_repository.update(
+                session, user.id, UserUpdate(description="updated")
+            )
+            assert updated.description == "updated"
+            assert updated.username == "ret_user"
+            assert statements == ["UPDATE"]
+
+            assert (
+                await user_repository.update(session, 999, UserUpdate(description="x"))
+                is None
+            )
+
+            product = await product_repository.create(
+                session,
+                ProductCreate(name="Ret", price=Decimal("1.00"), stock_quantity=5),
+            )
+            statements.clear()
+            product = await product_repository.update_stock(session, product.id, -2)
+            assert product.stock_quantity == 3
+            assert statements == ["UPDATE"]
+
+            unchanged = await product_repository.update(
+                session, product.id, ProductUpdate()
+            )
+            assert unchanged.updated_at == product.updated_at
+
+        run_with_async_session(_run)
@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import RoutingSession
+from app.db_metrics import PoolMetrics, metered_pool_class
+from app.models import Base, User
+
+
+def _engine(tmp_path, metrics: PoolMetrics):
+    url = f"sqlite:///{tmp_path / 'lazy.db'}"
+    engine = create_engine(url, poolclass=metered_pool_class(url, metrics))
+    metrics.attach(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+class TestLazySession:
+    def test_connection_checked_out_only_on_first_use(self, tmp_path):
+        metrics = PoolMetrics("test")
+        engine = _engine(tmp_path, metrics)
+        factory = sessionmaker(engine, class_=RoutingSession)
+        checkouts_before = metrics.checkouts
+
+        # Обработчик, обслуженный кешем: сессия создана, но к БД не обращалась
+        session = factory()
+        session.close()
+        assert metrics.checkouts == checkouts_before
+        assert "bind" not in session.info
+
+        session = factory()
+        session.execute(select(User)).all()
+        assert metrics.checkouts == checkouts_before + 1
+        assert metrics.in_use == 1
+        session.close()
+        assert metrics.in_use == 0
+
+        stats = metrics.stats()
+        assert stats["hold_max_ms"] > 0
+        assert stats["wait_max_ms"] > 0
+        engine.dispose()
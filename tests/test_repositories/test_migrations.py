@@ -0,0 +1,80 @@
+import asyncio
+
+from sqlalchemy import Column, MetaData, Table, create_engine, insert, inspect, select
+from sqlalchemy.schema import CreateTable
+
+from app.migrations import HEAD, current_version, run_migrations
+from app.models import Base, OutboxEvent, User
+
+
+def _index_names(engine, table: str) -> set:
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+class TestMigrations:
+    def test_upgrades_legacy_database_in_place(self):
+        engine = create_engine("sqlite://")
+        # База, созданная до миграций: таблицы без индексов и без версии
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                conn.execute(CreateTable(table))
+            conn.execute(insert(User).values(username="old", email="old@example.com"))
+
+        assert asyncio.run(run_migrations(engine)) == HEAD
+
+        assert "ix_orders_user_id" in _index_names(engine, "orders")
+        assert {"ix_order_items_order_id", "ix_order_items_product_id"} <= (
+            _index_names(engine, "order_items")
+        )
+        assert "ix_products_price" in _index_names(engine, "products")
+        assert "ix_outbox_events_sent_at_id" in _index_names(engine, "outbox_events")
+        columns = {
+            column["name"] for column in inspect(engine).get_columns("outbox_events")
+        }
+        assert {"dead_at", "last_error"} <= columns
+        with engine.connect() as conn:
+            assert conn.execute(select(User.username)).scalars().all() == ["old"]
+            assert current_version(conn) == HEAD
+        engine.dispose()
+
+    def test_migrations_are_incremental_and_idempotent(self):
+        engine = create_engine("sqlite://")
+
+        assert asyncio.run(run_migrations(engine, target=2)) == 2
+        assert "ix_orders_user_id" not in _index_names(engine, "orders")
+        assert "ix_products_name" in _index_names(engine, "products")
+
+        assert asyncio.run(run_migrations(engine)) == HEAD
+        assert asyncio.run(run_migrations(engine)) == HEAD
+        assert "ix_orders_status_created_at" in _index_names(engine, "orders")
+        engine.dispose()
+
+    def test_adds_outbox_dead_letter_columns(self):
+        engine = create_engine("sqlite://")
+        # outbox_events в схеме миграции 4 - без колонок dead letter
+        legacy = MetaData()
+        Table(
+            "outbox_events",
+            legacy,
+            *(
+                Column(column.name, column.type, primary_key=column.primary_key)
+                for column in OutboxEvent.__table__.columns
+                if column.name not in ("dead_at", "last_error")
+            ),
+        )
+        legacy.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                insert(legacy.tables["outbox_events"]).values(
+                    queue="order", payload={}, attempts=0
+                )
+            )
+
+        assert asyncio.run(run_migrations(engine)) == HEAD
+        columns = {
+            column["name"] for column in inspect(engine).get_columns("outbox_events")
+        }
+        assert {"dead_at", "last_error"} <= columns
+        with engine.connect() as conn:
+            assert conn.execute(select(OutboxEvent.dead_at)).scalars().all() == [None]
+        engine.dispose()
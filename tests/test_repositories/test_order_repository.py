@@ -1,9 +1,13 @@
 import asyncio
 from decimal import Decimal
 
+import msgspec
+import pytest
+
 from app.models import Address, Product, User
+from app.read_models import OrderRead
 from app.repositories.order_repository import OrderRepository
-from app.schemas import OrderCreate, OrderItemCreate
+from app.schemas import OrderCreate, OrderItemCreate, OrderResponse
 
 
 class TestOrderRepository:
@@ -141,3 +145,103 @@ class TestOrderRepository:
             assert updated.status == "completed"
 
         asyncio.run(_run())
+
+    def test_create_order_decrements_stock_atomically(
+        self, session, order_repository: OrderRepository
+    ):
+        async def _run():
+            user = User(username="order_user_4", email="order4@example.com")
+            session.add(user)
+            session.commit()
+
+            address = Address(
+                user_id=user.id, street="Street 4", city="City 4", country="Country 4"
+            )
+            first = Product(name="Batch A", price=Decimal("10.00"), stock_quantity=5)
+            second = Product(name="Batch B", price=Decimal("2.50"), stock_quantity=3)
+            session.add_all([address, first, second])
+            session.commit()
+
+            order = await order_repository.create(
+                session,
+                OrderCreate(
+                    user_id=user.id,
+                    address_id=address.id,
+                    items=[
+                        OrderItemCreate(product_id=first.id, quantity=2),
+                        OrderItemCreate(product_id=second.id, quantity=3),
+                        OrderItemCreate(product_id=first.id, quantity=1),
+                    ],
+                ),
+            )
+            assert order.total_amount == Decimal("37.50")
+            assert len(order.items) == 3
+
+            session.refresh(first)
+            session.refresh(second)
+            assert first.stock_quantity == 2
+            assert second.stock_quantity == 0
+
+            # Остатка не хватает - заказ не создаётся, остатки не меняются
+            with pytest.raises(ValueError, match="Insufficient stock"):
+                await order_repository.create(
+                    session,
+                    OrderCreate(
+                        user_id=user.id,
+                        address_id=address.id,
+                        items=[
+                            OrderItemCreate(product_id=first.id, quantity=1),
+                            OrderItemCreate(product_id=second.id, quantity=1),
+                        ],
+                    ),
+                )
+
+            session.refresh(first)
+            assert first.stock_quantity == 2
+
+        asyncio.run(_run())
+
+    def test_list_returns_read_models_matching_response(
+        self, session, order_repository: OrderRepository
+    ):
+        async def _run():
+            user = User(username="order_user_read", email="order_read@example.com")
+            session.add(user)
+            session.flush()
+            address = Address(
+                user_id=user.id, street="Street", city="City", country="Country"
+            )
+            products = [
+                Product(
+                    name=f"Read Product {i}", price=Decimal("3.25"), stock_quantity=5
+                )
+                for i in range(2)
+            ]
+            session.add_all([address, *products])
+            session.commit()
+
+            order = await order_repository.create(
+                session,
+                OrderCreate(
+                    user_id=user.id,
+                    address_id=address.id,
+                    items=[
+                        OrderItemCreate(product_id=product.id, quantity=2)
+                        for product in products
+                    ],
+                ),
+            )
+
+            orders = await order_repository.list(session, user_id=user.id)
+            assert len(orders) == 1
+            assert isinstance(orders[0], OrderRead)
+            assert len(orders[0].items) == 2
+
+            # Тот же JSON, что и у OrderResponse из ORM-объекта
+            expected = OrderResponse.model_validate(order).model_dump(mode="json")
+            assert msgspec.json.decode(msgspec.json.encode(orders[0])) == expected
+
+            page = await order_repository.get_page(session, count=1, user_id=user.id)
+            assert page.items == orders
+
+        asyncio.run(_run())
@@ -2,7 +2,7 @@ import asyncio
 from decimal import Decimal
 
 from app.repositories.product_repository import ProductRepository
-from app.schemas import ProductCreate, ProductUpdate
+from app.schemas import ProductCreate, ProductFilter, ProductUpdate
 
 
 class TestProductRepository:
@@ -90,3 +90,60 @@ class TestProductRepository:
             assert found is None
 
         asyncio.run(_run())
+
+    def test_get_page_keyset(self, session, product_repository: ProductRepository):
+        async def _run():
+            for i in range(5):
+                await product_repository.create(
+                    session,
+                    ProductCreate(name="Keyset Product", price=Decimal(10 + i)),
+                )
+
+            seen = []
+            cursor = ""
+            while cursor is not None:
+                page = await product_repository.get_page(
+                    session,
+                    count=2,
+                    cursor=cursor,
+                    filters=ProductFilter(name="Keyset Product"),
+                )
+                seen.extend(product.id for product in page.items)
+                cursor = page.next_cursor
+
+            assert len(seen) == 5
+            assert seen == sorted(seen)
+
+        asyncio.run(_run())
+
+    def test_price_range_and_sort_in_sql(
+        self, session, product_repository: ProductRepository
+    ):
+        async def _run():
+            for price in (5, 15, 25, 35, 45):
+                await product_repository.create(
+                    session,
+                    ProductCreate(name="Range Product", price=Decimal(price)),
+                )
+
+            filters = ProductFilter(
+                name="Range Product",
+                min_price=Decimal("10"),
+                max_price=Decimal("40"),
+                sort="-price",
+            )
+            products = await product_repository.get_list(
+                session, count=2, page=1, filters=filters
+            )
+            assert [p.price for p in products] == [Decimal("35"), Decimal("25")]
+
+            first = await product_repository.get_page(
+                session, count=2, cursor="", filters=filters
+            )
+            second = await product_repository.get_page(
+                session, count=2, cursor=first.next_cursor, filters=filters
+            )
+            assert [p.price for p in second.items] == [Decimal("15")]
+            assert second.next_cursor is None
+
+        asyncio.run(_run())
@@ -0,0 +1,186 @@
+import asyncio
+import shutil
+from decimal import Decimal
+
+import pytest
+from litestar import Litestar, get, post
+from litestar.testing import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.cache.redis_client import RedisCache
+from app.database import RoutingSession, primary_reads
+from app.models import Base, Product
+from app.replicas import (
+    LEAST_LOADED,
+    PRIMARY_PIN_COOKIE,
+    ReplicaRouter,
+    read_your_writes_middleware,
+)
+from app.repositories import ProductRepository
+from app.services import ProductService
+from tests.fakes import FakeRedis
+
+
+def _router(**kwargs) -> ReplicaRouter:
+    return ReplicaRouter(
+        [("r1", "engine-1"), ("r2", "engine-2")], recovery_timeout=60, **kwargs
+    )
+
+
+class TestReplicaRouter:
+    def test_reads_round_robin_and_writes_go_to_primary(self):
+        router = _router()
+
+        binds = []
+        for _ in range(4):
+            assert router.can_use_replica("GET", {}, {})
+            replica = router.acquire()
+            binds.append(replica.bind)
+            router.release(replica)
+        assert binds == ["engine-1", "engine-2", "engine-1", "engine-2"]
+
+        assert not router.can_use_replica("POST", {}, {})
+        assert not router.can_use_replica("DELETE", {}, {})
+
+    def test_read_your_writes_pins_to_primary(self):
+        router = _router()
+
+        assert not router.can_use_replica("GET", {PRIMARY_PIN_COOKIE: "1"}, {})
+        assert not router.can_use_replica("GET", {}, {"x-db-primary": "1"})
+        assert router.pinned_reads == 2
+
+    def test_unhealthy_replica_is_skipped_then_primary_fallback(self):
+        router = _router()
+
+        router.release(router.acquire(), ok=False)
+        # r1 выключен breaker'ом - чтение идёт на r2
+        for ok in (True, True, False):
+            replica = router.acquire()
+            assert replica.name == "r2"
+            router.release(replica, ok=ok)
+
+        assert router.acquire() is None
+        assert router.stats()["fallbacks"] == 1
+
+    def test_least_loaded_prefers_idle_replica(self):
+        router = _router(strategy=LEAST_LOADED)
+
+        busy = router.acquire()
+        assert busy.name == "r1"
+        assert router.acquire().name == "r2"
+        router.release(busy)
+        assert router.acquire().name == "r1"
+
+
+class TestRoutingSession:
+    """RoutingSession на настоящих SQLite-файлах: реплика - read-only копия"""
+
+    @pytest.fixture
+    def databases(self, tmp_path, monkeypatch):
+        primary_path = tmp_path / "primary.db"
+        primary = create_engine(f"sqlite:///{primary_path}")
+        Base.metadata.create_all(primary)
+        with primary.begin() as connection:
+            connection.execute(insert(Product), [_product("Copied")])
+
+        replica_path = tmp_path / "replica.db"
+        shutil.copy(primary_path, replica_path)
+        # Реплика отстаёт: этой строки в копии нет
+        with primary.begin() as connection:
+            connection.execute(insert(Product), [_product("Primary only")])
+
+        def route_to(path):
+            replica = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+            router = ReplicaRouter([("replica", replica)], recovery_timeout=60)
+            monkeypatch.setattr(database, "replica_router", router)
+            return router
+
+        factory = sessionmaker(primary, class_=RoutingSession, expire_on_commit=False)
+
+        def open_session(read_only=True):
+            session = factory()
+            session.info["read_only"] = read_only
+            return session
+
+        yield open_session, route_to, replica_path, tmp_path
+        primary.dispose()
+
+    @staticmethod
+    def _count(session) -> int:
+        return session.scalar(select(func.count()).select_from(Product))
+
+    def test_reads_hit_replica_and_writes_hit_primary(self, databases):
+        open_session, route_to, replica_path, _ = databases
+        router = route_to(replica_path)
+
+        with open_session() as session:
+            assert self._count(session) == 1
+            assert session.info["replica"].name == "replica"
+            # Чтение для кеша - с primary, даже внутри сессии реплики
+            with primary_reads(session):
+                assert self._count(session) == 2
+            assert self._count(session) == 1
+            session.info["bind"].close()
+            router.release(session.info["replica"])
+
+        with open_session(read_only=False) as session:
+            session.add(Product(**_product("Written")))
+            session.commit()
+            assert "replica" not in session.info
+            assert self._count(session) == 3
+
+        with open_session() as session:
+            assert self._count(session) == 1
+            session.info["bind"].close()
+        assert router.stats()["replicas"][0]["sessions"] == 2
+
+    def test_missing_replica_falls_back_to_primary(self, databases):
+        open_session, route_to, _, tmp_path = databases
+        router = route_to(tmp_path / "missing.db")
+
+        with open_session() as session:
+            assert self._count(session) == 2
+            assert "replica" not in session.info
+        assert router.fallbacks == 1
+        assert router.acquire() is None  # breaker реплики открыт
+
+    def test_cache_miss_is_loaded_from_primary(self, databases):
+        open_session, route_to, replica_path, _ = databases
+        route_to(replica_path)
+        service = ProductService(ProductRepository(), RedisCache(FakeRedis()))
+
+        async def _run(session):
+            # Продукт уже создан на primary, но реплика до него не доехала
+            body = await service.get_product_json(session, 2)
+            assert body is not None
+            # Повторный запрос - из кеша, а не 404 с отставшей реплики
+            assert await service.get_product_json(session, 2) == body
+
+        with open_session() as session:
+            asyncio.run(_run(session))
+            assert "replica" not in session.info
+
+
+def _product(name: str) -> dict:
+    return {"name": name, "price": Decimal("1.00"), "stock_quantity": 1}
+
+
+def test_read_your_writes_cookie_set_after_successful_write():
+    @get("/items", sync_to_thread=False)
+    def read_items() -> list:
+        return []
+
+    @post("/items", sync_to_thread=False)
+    def create_item() -> dict:
+        return {}
+
+    app = Litestar(
+        route_handlers=[read_items, create_item],
+        middleware=[read_your_writes_middleware(5)],
+    )
+    with TestClient(app) as client:
+        assert "set-cookie" not in client.get("/items").headers
+        cookie = client.post("/items").headers["set-cookie"]
+        assert cookie.startswith(f"{PRIMARY_PIN_COOKIE}=1; Max-Age=5")
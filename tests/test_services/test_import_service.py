@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models import Product, User
+from app.repositories import ProductRepository, UserRepository
+from app.services.import_service import ImportService
+
+
+async def _stream(data: bytes, chunk: int = 7):
+    # Маленькие чанки режут строки и многобайтовые символы посередине
+    for i in range(0, len(data), chunk):
+        yield data[i : i + chunk]
+
+
+def _service() -> ImportService:
+    return ImportService(ProductRepository(), UserRepository())
+
+
+class TestImportService:
+    def test_import_products_ndjson(self, run_with_async_session):
+        data = (
+            '{"name": "Чайник", "price": "10.50", "stock_quantity": 3}\n'
+            "not json\n"
+            '{"name": "No price"}\n'
+            "\n"
+            '{"name": "Кружка", "price": 2}\n'
+        ).encode()
+
+        async def _run(session):
+            result = await _service().import_products(
+                session, _stream(data), chunk_size=1
+            )
+            assert (result.total, result.inserted, result.failed) == (4, 2, 2)
+            assert [error.line for error in result.errors] == [2, 3]
+
+            rows = (
+                await session.execute(select(Product).order_by(Product.id))
+            ).scalars()
+            products = list(rows)
+            assert [p.name for p in products] == ["Чайник", "Кружка"]
+            assert products[0].price == Decimal("10.50")
+            assert products[1].stock_quantity == 0
+
+        run_with_async_session(_run)
+
+    def test_import_users_csv_with_duplicates(self, run_with_async_session):
+        data = (
+            "username,email,description\r\n"
+            'alice,alice@example.com,"line one\nline two"\r\n'
+            "bob,bob@example.com,\r\n"
+            "carol,alice@example.com,dup\r\n"
+            "broken,row\r\n"
+        ).encode()
+
+        async def _run(session):
+            result = await _service().import_users(session, _stream(data), fmt="csv")
+            assert (result.total, result.inserted, result.failed) == (4, 2, 2)
+            lines = sorted(error.line for error in result.errors)
+            assert lines == [5, 6]
+
+            users = list(
+                (await session.execute(select(User).order_by(User.id))).scalars()
+            )
+            assert [u.username for u in users] == ["alice", "bob"]
+            assert users[0].description == "line one\nline two"
+
+        run_with_async_session(_run)
+
+    def test_invalid_utf8_fails_only_its_line(self, run_with_async_session):
+        data = (
+            '{"name": "Чайник", "price": 1}\n'.encode()
+            + b'{"name": "Bad \xff\xfe", "price": 2}\n'
+            + '{"name": "Кружка", "price": 3}\n'.encode()
+        )
+        csv_data = (
+            b"username,email,description\n"
+            b"alice,alice@example.com,\xc3\n"
+            b"bob,bob@example.com,ok\n"
+        )
+
+        async def _run(session):
+            service = _service()
+            result = await service.import_products(session, _stream(data))
+            assert (result.total, result.inserted, result.failed) == (3, 2, 1)
+            assert result.errors[0].line == 2
+            assert "Invalid UTF-8" in result.errors[0].error
+
+            result = await service.import_users(session, _stream(csv_data), fmt="csv")
+            assert (result.total, result.inserted, result.failed) == (2, 1, 1)
+            assert result.errors[0].line == 2
+
+        run_with_async_session(_run)
+
+    def test_errors_are_truncated(self, run_with_async_session, monkeypatch):
+        monkeypatch.setattr("app.services.import_service.IMPORT_MAX_ERRORS", 2)
+        data = b"{}\n" * 5
+
+        async def _run(session):
+            result = await _service().import_products(session, _stream(data))
+            assert result.failed == 5
+            assert len(result.errors) == 2
+            assert result.errors_truncated
+            count = await session.scalar(select(func.count()).select_from(Product))
+            assert count == 0
+
+        run_with_async_session(_run)
+
+    def test_overlong_line_fails_without_buffering(
+        self, run_with_async_session, monkeypatch
+    ):
+        monkeypatch.setattr("app.services.import_service.IMPORT_MAX_LINE_BYTES", 64)
+        data = (
+            b'{"name": "A", "price": 1}\n'
+            + b'{"name": "'
+            + b"x" * 500
+            + b'", "price": 2}\n'
+            + b'{"name": "B", "price": 3}'
+        )
+        csv_data = (
+            b"username,email,description\n"
+            b'alice,alice@example.com,"' + b"long\n" * 40 + b'"\n'
+            b"bob,bob@example.com,ok\n"
+            b'carol,carol@example.com,"never closed\n'
+        )
+
+        async def _run(session):
+            service = _service()
+            result = await service.import_products(session, _stream(data))
+            assert (result.total, result.inserted, result.failed) == (3, 2, 1)
+            assert result.errors[0].line == 2
+            assert "exceeds 64 bytes" in result.errors[0].error
+
+            result = await service.import_users(session, _stream(csv_data), fmt="csv")
+            assert (result.total, result.inserted, result.failed) == (3, 1, 2)
+            errors = {error.line: error.error for error in result.errors}
+            assert "exceeds 64 bytes" in errors[2]
+            assert errors[44] == "Unterminated quoted field"
+
+        run_with_async_session(_run)
@@ -1,9 +1,14 @@
 import asyncio
+import json
 from decimal import Decimal
 
+from app.cache.keys import CATALOG_GENERATION_KEY
+from app.cache.redis_client import RedisCache
 from app.models import Address, Product, User
-from app.schemas import OrderCreate, OrderItemCreate
+from app.schemas import OrderCreate, OrderItemCreate, OrderResponse
 from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from tests.fakes import FakeRedis
 
 
 class TestOrderService:
@@ -160,3 +165,186 @@ class TestOrderService:
             assert found is None
 
         asyncio.run(_run())
+
+    def test_create_orders_batch(self, session, order_service: OrderService):
+        async def _run():
+            user = User(username="batch_user", email="batch@example.com")
+            session.add(user)
+            session.commit()
+            address = Address(
+                user_id=user.id, street="Street", city="City", country="Country"
+            )
+            product = Product(
+                name="Batch Product", price=Decimal("10.00"), stock_quantity=3
+            )
+            session.add_all([address, product])
+            session.commit()
+
+            def order(user_id, quantity):
+                return OrderCreate(
+                    user_id=user_id,
+                    address_id=address.id,
+                    items=[OrderItemCreate(product_id=product.id, quantity=quantity)],
+                )
+
+            results = await order_service.create_orders_batch(
+                session,
+                [
+                    order(user.id, 2),
+                    order(999999, 1),
+                    order(user.id, 2),
+                    order(user.id, 1),
+                ],
+                chunk_size=2,
+            )
+
+            assert results[0].total_amount == Decimal("20.00")
+            assert str(results[1]) == "User not found"
+            assert "Insufficient stock" in str(results[2])
+            assert results[3].total_amount == Decimal("10.00")
+            assert len(results[3].items) == 1
+
+            session.refresh(product)
+            assert product.stock_quantity == 0
+
+        asyncio.run(_run())
+
+    def test_order_cache_invalidation(
+        self, session, order_repository, product_repository, user_repository
+    ):
+        fake = FakeRedis()
+        order_service = OrderService(
+            order_repository, product_repository, user_repository, RedisCache(fake)
+        )
+
+        async def _run():
+            user = User(username="cached_orders", email="cached_orders@example.com")
+            session.add(user)
+            session.commit()
+            address = Address(
+                user_id=user.id, street="Street", city="City", country="Country"
+            )
+            product = Product(
+                name="Cached Order Product", price=Decimal("5.00"), stock_quantity=10
+            )
+            session.add_all([address, product])
+            session.commit()
+            order_data = OrderCreate(
+                user_id=user.id,
+                address_id=address.id,
+                items=[OrderItemCreate(product_id=product.id, quantity=1)],
+            )
+
+            def recent_orders():
+                return order_service.list_orders_json(
+                    session, user_id=user.id, sort="-id"
+                )
+
+            order = await order_service.create_order(session, order_data)
+            body = await order_service.get_order_json(session, order.id)
+            assert (
+                body == OrderResponse.model_validate(order).model_dump_json().encode()
+            )
+            assert order_service._cache_key(order.id) in fake.data
+
+            recent = await recent_orders()
+            assert [item["id"] for item in json.loads(recent)] == [order.id]
+
+            await order_service.update_status(session, order.id, "shipped")
+            assert order_service._cache_key(order.id) not in fake.data
+            body = await order_service.get_order_json(session, order.id)
+            assert json.loads(body)["status"] == "shipped"
+            recent = await recent_orders()
+            assert json.loads(recent)[0]["status"] == "shipped"
+
+            second = await order_service.create_order(session, order_data)
+            recent = await recent_orders()
+            # Последние заказы - от новых к старым
+            assert [item["id"] for item in json.loads(recent)] == [second.id, order.id]
+            # Курсорный режим соблюдает тот же порядок
+            page = await order_service.list_orders_json(
+                session, count=1, cursor="", user_id=user.id, sort="-id"
+            )
+            page = json.loads(page)
+            assert [item["id"] for item in page["items"]] == [second.id]
+            page = await order_service.list_orders_json(
+                session,
+                count=1,
+                cursor=page["next_cursor"],
+                user_id=user.id,
+                sort="-id",
+            )
+            assert [item["id"] for item in json.loads(page)["items"]] == [order.id]
+            # По возрастанию - без кеша последних заказов
+            cached = sum(key.startswith("order:recent:") for key in fake.data)
+            ascending = await order_service.list_orders_json(session, user_id=user.id)
+            assert [item["id"] for item in json.loads(ascending)] == [
+                order.id,
+                second.id,
+            ]
+            assert sum(key.startswith("order:recent:") for key in fake.data) == cached
+
+            assert await order_service.delete_order(session, order.id)
+            assert await order_service.get_order_json(session, order.id) is None
+            recent = await recent_orders()
+            assert [item["id"] for item in json.loads(recent)] == [second.id]
+
+        asyncio.run(_run())
+
+    def test_orders_invalidate_product_stock_cache(
+        self, session, order_repository, product_repository, user_repository
+    ):
+        fake = FakeRedis()
+        cache = RedisCache(fake)
+        order_service = OrderService(
+            order_repository, product_repository, user_repository, cache
+        )
+        product_service = ProductService(product_repository, cache)
+
+        async def _run():
+            user = User(username="stock_cache", email="stock_cache@example.com")
+            session.add(user)
+            session.commit()
+            address = Address(
+                user_id=user.id, street="Street", city="City", country="Country"
+            )
+            product = Product(
+                name="Stock Cache Product", price=Decimal("5.00"), stock_quantity=5
+            )
+            session.add_all([address, product])
+            session.commit()
+
+            async def cached_stock() -> int:
+                body = await product_service.get_product_json(session, product.id)
+                return json.loads(body)["stock_quantity"]
+
+            assert await cached_stock() == 5
+            await cache.bump_generation(CATALOG_GENERATION_KEY)
+            order = await order_service.create_order(
+                session,
+                OrderCreate(
+                    user_id=user.id,
+                    address_id=address.id,
+                    items=[OrderItemCreate(product_id=product.id, quantity=2)],
+                ),
+            )
+            assert await cached_stock() == 3
+            assert fake.data[CATALOG_GENERATION_KEY][0] == "2"
+
+            await order_service.create_orders_batch(
+                session,
+                [
+                    OrderCreate(
+                        user_id=user.id,
+                        address_id=address.id,
+                        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+                    )
+                ],
+            )
+            assert await cached_stock() == 2
+
+            assert await order_service.delete_order(session, order.id)
+            assert await cached_stock() == 4
+            assert fake.data[CATALOG_GENERATION_KEY][0] == "4"
+
+        asyncio.run(_run())
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from decimal import Decimal
+
+from app.cache.redis_client import RedisCache
+from app.schemas import ProductCreate, ProductFilter, ProductResponse, ProductUpdate
+from app.services.product_service import ProductService
+from tests.fakes import FakeRedis
+
+
+class TestProductServiceCache:
+    def test_get_product_uses_cache(self, session, product_repository):
+        fake = FakeRedis()
+        service = ProductService(product_repository, RedisCache(fake))
+
+        async def _run():
+            created = await product_repository.create(
+                session,
+                ProductCreate(name="Cached Product", price=Decimal("12.50")),
+            )
+            await service.get_product_json(session, created.id)
+            assert service._cache_key(created.id) in fake.data
+
+            cached = await service.get_product_json(session, created.id)
+            assert json.loads(cached)["name"] == "Cached Product"
+
+            await service.update_product(
+                session, created.id, ProductUpdate(name="Renamed")
+            )
+            assert service._cache_key(created.id) not in fake.data
+
+        asyncio.run(_run())
+
+    def test_cache_hit_returns_response_json(self, session, product_repository):
+        fake = FakeRedis()
+        service = ProductService(product_repository, RedisCache(fake))
+
+        async def _run():
+            created = await product_repository.create(
+                session,
+                ProductCreate(name="Raw Product", price=Decimal("7.25")),
+            )
+            expected = ProductResponse.model_validate(created).model_dump_json()
+            # Запись старого формата под неверсионированным ключом игнорируется
+            fake.data[f"product:{created.id}"] = ('{"id": 0}', None)
+
+            assert await service.get_product_json(session, created.id) == (
+                expected.encode()
+            )
+
+            async def _no_db(*args, **kwargs):
+                raise AssertionError("cache hit must not query the database")
+
+            product_repository.get_by_id = _no_db
+            assert await service.get_product_json(session, created.id) == (
+                expected.encode()
+            )
+
+        asyncio.run(_run())
+
+    def test_list_cache_follows_catalog_generation(
+        self, session, product_repository, monkeypatch
+    ):
+        monkeypatch.setattr(
+            "app.services.product_service.PRODUCT_LIST_CACHE_MAX_COUNT", 20
+        )
+        fake = FakeRedis()
+        service = ProductService(product_repository, RedisCache(fake))
+        filters = ProductFilter(min_price=Decimal("5.55"), max_price=Decimal("5.55"))
+
+        async def _run():
+            created = await service.create_product(
+                session, ProductCreate(name="Listed A", price=Decimal("5.55"))
+            )
+            first = await service.list_products_json(session, count=10, filters=filters)
+            assert [item["name"] for item in json.loads(first)] == ["Listed A"]
+            list_keys = [key for key in fake.data if key.startswith("product:list:")]
+            assert len(list_keys) == 1
+
+            # Повторный запрос с теми же параметрами не ходит в БД
+            real_get_list = product_repository.get_list
+
+            async def _no_db(*args, **kwargs):
+                raise AssertionError("cached list must not query the database")
+
+            product_repository.get_list = _no_db
+            cached = await service.list_products_json(
+                session, count=10, filters=filters
+            )
+            assert cached == first
+            product_repository.get_list = real_get_list
+
+            await service.update_product(
+                session, created.id, ProductUpdate(name="Listed B")
+            )
+            assert fake.data["product:catalog:generation"][0] == "2"
+            updated = await service.list_products_json(
+                session, count=10, filters=filters
+            )
+            assert [item["name"] for item in json.loads(updated)] == ["Listed B"]
+
+            # Страницы больше лимита не кешируются
+            await service.list_products_json(session, count=21, filters=filters)
+            list_keys = [key for key in fake.data if key.startswith("product:list:")]
+            assert len(list_keys) == 2
+
+        asyncio.run(_run())
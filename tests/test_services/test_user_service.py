@@ -62,7 +62,6 @@ class TestUserService:
             )
 
             await user_service.delete(session, created.id)
-            found = await user_service.get_by_id(session, created.id)
-            assert found is None
+            assert await user_service.get_by_id_json(session, created.id) is None
 
         asyncio.run(_run())